@@ -0,0 +1,11 @@
+"""Metrics of the blog sampled by `write_stats`, see `stats.metrics`."""
+from blog.models import Post
+from stats.metrics import Metric, register
+
+register(
+    Metric(
+        'blog_posts_count',
+        'Blog Posts',
+        count=lambda: Post.objects.filter(is_published=True).count(),
+    )
+)
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.9 on 2026-10-18 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_update_help_text_replace_float_classes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE blog_post SET like_count = likes.count
+            FROM (
+                SELECT post_id, COUNT(*) AS count FROM blog_like GROUP BY post_id
+            ) AS likes
+            WHERE blog_post.id = likes.post_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
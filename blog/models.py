@@ -29,6 +29,8 @@ class Post(mixins.CreatedUpdatedMixin, mixins.StaticThumbnailURLMixin, models.Mo
     date_published = models.DateTimeField(blank=True, null=True)
     legacy_id = models.CharField(max_length=256, blank=True)
     is_published = models.BooleanField(default=False)
+    # Number of likes, kept up to date by `common.likes.set_like`
+    like_count = models.PositiveIntegerField(default=0, editable=False)
 
     title = models.CharField(max_length=512)
     category = models.CharField(max_length=128, blank=True)
@@ -42,6 +44,8 @@ class Post(mixins.CreatedUpdatedMixin, mixins.StaticThumbnailURLMixin, models.Mo
     header = models.FileField(upload_to=get_upload_to_hashed_path, blank=True)
 
     comments = models.ManyToManyField(Comment, through='PostComment', related_name='post')
+    # Lookups that keep only the objects visible to everyone but staff
+    published_filters = {'is_published': True}
     attachments = models.ManyToManyField(models_static_assets.StaticAsset, blank=True)
 
     def __str__(self):
@@ -74,6 +78,10 @@ class Post(mixins.CreatedUpdatedMixin, mixins.StaticThumbnailURLMixin, models.Mo
     def comment_url(self) -> str:
         return reverse('api-post-comment', kwargs={'post_pk': self.pk})
 
+    @property
+    def comments_url(self) -> str:
+        return reverse('api-post-comments', kwargs={'post_pk': self.pk})
+
     @property
     def like_url(self) -> str:
         return reverse('api-post-like', kwargs={'post_pk': self.pk})
@@ -1,6 +1,6 @@
 from django.urls import path, include
 
-from blog.views.api.comment import comment
+from blog.views.api.comment import comment, comments
 from blog.views.api.like import post_like
 from blog.views.blog import PostList, PostDetail
 
@@ -10,6 +10,7 @@ urlpatterns = [
         include(
             [
                 path('comment/', comment, name='api-post-comment'),
+                path('comments/', comments, name='api-post-comments'),
                 path('like/', post_like, name='api-post-like'),
             ]
         ),
@@ -1,11 +1,15 @@
 """Implements blog post comments API."""
 from django.contrib.auth.decorators import login_required
 from django.http.request import HttpRequest
-from django.http.response import JsonResponse
-from django.views.decorators.http import require_POST
+from django.http.response import HttpResponse, JsonResponse
+from django.views.decorators.http import require_POST, require_safe
 
-from blog.models import PostComment
-from comments.views.common import comment_response
+from blog.models import Post, PostComment
+from comments.views.common import (
+    comment_response,
+    comments_page_response,
+    get_commented_object_or_404,
+)
 from common.decorators import subscription_required
 
 
@@ -15,3 +19,10 @@ from common.decorators import subscription_required
 def comment(request: HttpRequest, *, post_pk: int) -> JsonResponse:
     """Add a top-level comment under a blog post or a reply to another comment."""
     return comment_response(request, PostComment, 'post_id', post_pk)
+
+
+@require_safe
+def comments(request: HttpRequest, *, post_pk: int) -> HttpResponse:
+    """Return a page of top-level comments under a blog post."""
+    post = get_commented_object_or_404(Post, request.user, post_pk)
+    return comments_page_response(request, post)
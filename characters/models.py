@@ -91,6 +91,8 @@ class CharacterVersion(mixins.CreatedUpdatedMixin, models.Model):
     comments = models.ManyToManyField(
         Comment, through='CharacterVersionComment', related_name='character_version'
     )
+    # Lookups that keep only the objects visible to everyone but staff
+    published_filters = {'is_published': True, 'character__is_published': True}
 
     def __str__(self) -> str:
         return f'{self.character_id and self.character.name or "Character"} v{self.number or "?"}'
@@ -112,6 +114,13 @@ class CharacterVersion(mixins.CreatedUpdatedMixin, models.Model):
             kwargs={'character_version_pk': self.pk},
         )
 
+    @property
+    def comments_url(self) -> str:
+        return reverse(
+            'api-character-version-comments',
+            kwargs={'character_version_pk': self.pk},
+        )
+
 
 class CharacterShowcase(mixins.CreatedUpdatedMixin, models.Model):
     class Meta:
@@ -143,6 +152,8 @@ class CharacterShowcase(mixins.CreatedUpdatedMixin, models.Model):
     comments = models.ManyToManyField(
         Comment, through='CharacterShowcaseComment', related_name='character_showcase'
     )
+    # Lookups that keep only the objects visible to everyone but staff
+    published_filters = {'is_published': True, 'character__is_published': True}
 
     def __str__(self) -> str:
         return f'Showcase "{self.title}" for {self.character_id and self.character.name}'
@@ -164,6 +175,13 @@ class CharacterShowcase(mixins.CreatedUpdatedMixin, models.Model):
             kwargs={'character_showcase_pk': self.pk},
         )
 
+    @property
+    def comments_url(self) -> str:
+        return reverse(
+            'api-character-showcase-comments',
+            kwargs={'character_showcase_pk': self.pk},
+        )
+
 
 class CharacterVersionComment(models.Model):
     """This is an intermediary model between CharacterVersion and Comment.
@@ -1,6 +1,11 @@
 from django.urls import path
 
-from characters.views.api.comment import comment_version, comment_showcase
+from characters.views.api.comment import (
+    comment_showcase,
+    comment_version,
+    comments_showcase,
+    comments_version,
+)
 from characters.views.api.like import character_like
 from characters.views.characters import (
     CharacterList,
@@ -16,11 +21,21 @@ urlpatterns = [
         comment_version,
         name='api-character-version-comment',
     ),
+    path(
+        'api/characters/v/<int:character_version_pk>/comments/',
+        comments_version,
+        name='api-character-version-comments',
+    ),
     path(
         'api/characters/showcase/<int:character_showcase_pk>/comment/',
         comment_showcase,
         name='api-character-showcase-comment',
     ),
+    path(
+        'api/characters/showcase/<int:character_showcase_pk>/comments/',
+        comments_showcase,
+        name='api-character-showcase-comments',
+    ),
     path('api/characters/<int:character_pk>/like/', character_like, name='api-character-like'),
     path('characters/', CharacterList.as_view(), name='character-list'),
     path('characters/<slug:slug>/', CharacterDetail.as_view(), name='character-detail'),
@@ -1,11 +1,20 @@
 """Comments API for characters."""
 from django.contrib.auth.decorators import login_required
 from django.http.request import HttpRequest
-from django.http.response import JsonResponse
-from django.views.decorators.http import require_POST
+from django.http.response import HttpResponse, JsonResponse
+from django.views.decorators.http import require_POST, require_safe
 
-from characters.models import CharacterVersionComment, CharacterShowcaseComment
-from comments.views.common import comment_response
+from characters.models import (
+    CharacterShowcase,
+    CharacterShowcaseComment,
+    CharacterVersion,
+    CharacterVersionComment,
+)
+from comments.views.common import (
+    comment_response,
+    comments_page_response,
+    get_commented_object_or_404,
+)
 from common.decorators import subscription_required
 
 
@@ -27,3 +36,21 @@ def comment_showcase(request: HttpRequest, *, character_showcase_pk: int) -> Jso
     return comment_response(
         request, CharacterShowcaseComment, 'character_showcase_id', character_showcase_pk
     )
+
+
+@require_safe
+def comments_version(request: HttpRequest, *, character_version_pk: int) -> HttpResponse:
+    """Return a page of top-level comments under a character version."""
+    character_version = get_commented_object_or_404(
+        CharacterVersion, request.user, character_version_pk
+    )
+    return comments_page_response(request, character_version)
+
+
+@require_safe
+def comments_showcase(request: HttpRequest, *, character_showcase_pk: int) -> HttpResponse:
+    """Return a page of top-level comments under a character showcase."""
+    character_showcase = get_commented_object_or_404(
+        CharacterShowcase, request.user, character_showcase_pk
+    )
+    return comments_page_response(request, character_showcase)
@@ -1,5 +1,5 @@
 """Characters and character version views."""
-from typing import Optional, List
+from typing import Optional
 
 from django.contrib.redirects.models import Redirect
 from django.db import models
@@ -15,9 +15,7 @@ from characters.queries import (
     get_character_version,
     get_character_showcase,
 )
-from comments.models import Comment
-from comments.queries import get_annotated_comments
-from comments.views.common import comments_to_template_type
+from comments.views.common import comments_page_to_template_type
 from stats.models import StaticAssetView
 
 
@@ -81,7 +79,7 @@ class CharacterVersionDetail(_CharacterViewMixin, DetailView):
     def get_object(self, queryset: Optional[models.query.QuerySet] = ...) -> CharacterVersion:
         """Get character version of the given slug and number."""
         filter_published = (
-            {'is_published': True, 'character__is_published': True}
+            CharacterVersion.published_filters
             if not self.request.user.is_staff and not self.request.user.is_superuser
             else {}
         )
@@ -111,10 +109,7 @@ class CharacterVersionDetail(_CharacterViewMixin, DetailView):
         ] = self.request.user.is_staff and self.request.user.has_perm('character.change_character')
 
         # Comment threads
-        comments: List[Comment] = get_annotated_comments(character_version, self.request.user.pk)
-        context['comments'] = comments_to_template_type(
-            comments, character_version.comment_url, self.request.user
-        )
+        context['comments'] = comments_page_to_template_type(character_version, self.request.user)
 
         return context
 
@@ -143,9 +138,6 @@ class CharacterShowcaseDetail(_CharacterViewMixin, DetailView):
         ] = self.request.user.is_staff and self.request.user.has_perm('character.change_character')
 
         # Comment threads
-        comments: List[Comment] = get_annotated_comments(showcase, self.request.user.pk)
-        context['comments'] = comments_to_template_type(
-            comments, showcase.comment_url, self.request.user
-        )
+        context['comments'] = comments_page_to_template_type(showcase, self.request.user)
 
         return context
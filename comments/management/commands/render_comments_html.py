@@ -0,0 +1,62 @@
+# noqa: D100
+from multiprocessing import Pool
+from typing import Any, Tuple
+import logging
+
+from django.core.management.base import BaseCommand
+
+from comments.models import Comment
+from common import markdown
+
+logger = logging.getLogger(__name__)
+
+
+def _render(pk_and_message: Tuple[int, str]) -> Tuple[int, str]:
+    pk, message = pk_and_message
+    return pk, markdown.render(markdown.sanitize(message))
+
+
+class Command(BaseCommand):  # noqa: D101
+    help = (
+        'Render the HTML of comments that have none, e.g. comments imported without it, '
+        'so that it is never rendered when comments are displayed.'
+    )
+
+    def add_arguments(self, parser):  # noqa: D102
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=None,
+            help='Number of processes rendering comments, the number of CPUs by default.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of comments rendered and saved at a time.',
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: D102
+        batch_size = options['batch_size']
+        comments = Comment.objects.filter(message_html='').exclude(message='').order_by('pk')
+        rendered = 0
+        last_pk = 0
+        with Pool(options['processes']) as pool:
+            while True:
+                batch = list(
+                    comments.filter(pk__gt=last_pk).values_list('pk', 'message')[:batch_size]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1][0]
+                # Unlike save(), bulk_update leaves date_updated as is: comments don't look edited
+                Comment.objects.bulk_update(
+                    [
+                        Comment(pk=pk, message_html=message_html)
+                        for pk, message_html in pool.imap_unordered(_render, batch, chunksize=50)
+                    ],
+                    ['message_html'],
+                )
+                rendered += len(batch)
+                logger.info('Rendered %s comments, up to pk=%s', rendered, last_pk)
+        self.stdout.write(f'Rendered the HTML of {rendered} comments')
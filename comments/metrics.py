@@ -0,0 +1,17 @@
+"""Metrics of comments sampled by `write_stats`, see `stats.metrics`."""
+from comments.models import Comment
+from stats.metrics import DeltaMetric, register
+
+register(
+    DeltaMetric(
+        'comments_count',
+        'Comments',
+        count=lambda: Comment.objects.filter(date_deleted__isnull=True).count(),
+        added=lambda since, until: Comment.objects.filter(
+            date_created__gt=since, date_created__lte=until, date_deleted__isnull=True
+        ).count(),
+        removed=lambda since, until: Comment.objects.filter(
+            date_created__lte=since, date_deleted__gt=since, date_deleted__lte=until
+        ).count(),
+    )
+)
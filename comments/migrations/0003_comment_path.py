@@ -0,0 +1,37 @@
+# Generated by Django 3.2.9 on 2026-10-18 16:05
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0002_auto_20201218_1135'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.PositiveIntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.RunSQL(
+            """
+            WITH RECURSIVE tree (id, path) AS (
+                SELECT id, ARRAY[]::integer[] FROM comments_comment WHERE reply_to_id IS NULL
+                UNION ALL
+                SELECT reply.id, tree.path || reply.reply_to_id
+                FROM comments_comment reply JOIN tree ON reply.reply_to_id = tree.id
+            )
+            UPDATE comments_comment SET path = tree.path
+            FROM tree WHERE comments_comment.id = tree.id AND tree.path != '{}'
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['path'], name='comments_co_path_8624b6_gin'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.9 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0003_comment_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE comments_comment SET like_count = likes.count
+            FROM (
+                SELECT comment_id, COUNT(*) AS count FROM comments_like GROUP BY comment_id
+            ) AS likes
+            WHERE comments_comment.id = likes.comment_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,8 +1,13 @@
-from typing import Optional, List, Dict, Any
+from datetime import datetime
+from typing import Optional, Dict, Any, Iterable
 
 from actstream import action
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.core.cache import caches
+from django.db import connection, models, transaction
+from django.db.models import Q
 from django.urls.base import reverse
 from django.utils import timezone
 
@@ -11,9 +16,23 @@ from common import mixins
 User = get_user_model()
 
 
+class CommentQuerySet(models.QuerySet):
+    def subtree(self, comment_pk: int) -> 'CommentQuerySet':
+        """Filter the given comment, its replies, the replies to its replies, and so on."""
+        return self.filter(Q(pk=comment_pk) | Q(path__contains=[comment_pk]))
+
+    def soft_delete(self, now: Optional[datetime] = None) -> int:
+        """Mark the comments that aren't yet as deleted, with a single UPDATE."""
+        now = now or timezone.now()
+        return self.filter(date_deleted__isnull=True).update(date_deleted=now, date_updated=now)
+
+
 class Comment(mixins.CreatedUpdatedMixin, models.Model):
     class Meta:
         permissions = [('moderate_comment', 'Can moderate comments')]
+        indexes = [GinIndex(fields=['path'])]
+
+    objects = CommentQuerySet.as_manager()
 
     # Whenever a User is deleted their Comment lives on to ensure integrity of the conversation.
     # Instead, we remove the reference to the User to honor the deletion request as much as
@@ -32,6 +51,9 @@ class Comment(mixins.CreatedUpdatedMixin, models.Model):
         on_delete=models.CASCADE,
         related_name='replies',
     )
+    # IDs of the comments this one replies to, starting with the top-level one: a materialized
+    # path, so that all the replies to a comment can be found with a single indexed query.
+    path = ArrayField(models.PositiveIntegerField(), blank=True, default=list, editable=False)
     # Markdown formatted message
     message = models.TextField(blank=True)
     # HTML rendered in the backend (on save)
@@ -45,6 +67,8 @@ class Comment(mixins.CreatedUpdatedMixin, models.Model):
     slug = models.SlugField(blank=True)
 
     likes = models.ManyToManyField(User, through='Like', related_name='liked_comments')
+    # Number of likes, kept up to date by `common.likes.set_like`
+    like_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self) -> str:
         return f'Comment by {self.username} @ {self.date_updated:%d %B %Y %H:%M:%S}'
@@ -80,6 +104,10 @@ class Comment(mixins.CreatedUpdatedMixin, models.Model):
     def like_url(self) -> str:
         return reverse('comment-like', kwargs={'comment_pk': self.pk})
 
+    @property
+    def replies_url(self) -> str:
+        return reverse('comment-replies', kwargs={'comment_pk': self.pk})
+
     @property
     def edit_url(self) -> str:
         return reverse('comment-edit', kwargs={'comment_pk': self.pk})
@@ -118,30 +146,19 @@ class Comment(mixins.CreatedUpdatedMixin, models.Model):
 
     def soft_delete_tree(self) -> None:
         """Soft-deletes (i.e. mark as deleted) the comment and all its replies."""
-        for reply in self.replies.all():
-            reply.soft_delete_tree()
-        self.soft_delete()
-
-    def _get_tree_comments_pks(self) -> List[int]:
-        """Returns the pks of all the comments in the `self` comment tree."""
-        root = self
-        while root.reply_to is not None:
-            root = root.reply_to
-
-        tree = [root]
-        replies = list(root.replies.all())
-
-        def add_replies_to_tree_comments(
-            tree: List['Comment'], replies: List['Comment']
-        ) -> List['Comment']:
-            tree.extend(replies)
-            for comment in replies:
-                tree = add_replies_to_tree_comments(tree, list(comment.replies.all()))
-            return tree
+        now = timezone.now()
+        Comment.objects.subtree(self.pk).soft_delete(now)
+        if not self.is_deleted:
+            self.date_deleted = self.date_updated = now
 
-        tree = add_replies_to_tree_comments(tree, replies)
+    @property
+    def root_pk(self) -> int:
+        """Return the ID of the top-level comment of this comment's tree."""
+        return self.path[0] if self.path else self.pk
 
-        return [comment.pk for comment in tree]
+    def get_tree_comments(self) -> CommentQuerySet:
+        """Return all the comments in the `self` comment tree, from the top-level one down."""
+        return Comment.objects.subtree(self.root_pk)
 
     def archive_tree(self) -> bool:
         """Switches the 'is_archived' status of the comment and the entire comment tree.
@@ -150,25 +167,95 @@ class Comment(mixins.CreatedUpdatedMixin, models.Model):
         also affects the comment's parents and replies - the entire tree.
         """
         new_archived_status = not self.is_archived
-        tree_pks = self._get_tree_comments_pks()
-        Comment.objects.filter(pk__in=tree_pks).update(is_archived=new_archived_status)
+        self.get_tree_comments().update(is_archived=new_archived_status)
 
         return new_archived_status
 
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        """Keep the path in sync with the comment this one replies to.
+
+        When a saved comment is made to reply to another one, which only happens when
+        comments are imported, the paths of its replies are updated as well.
+        """
+        if (self.path[-1] if self.path else None) == self.reply_to_id:
+            super().save(*args, **kwargs)
+            return
+
+        old_path = self.path
+        self.path = [*self.reply_to.path, self.reply_to_id] if self.reply_to_id else []
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'path'}
+        is_new = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                return
+            table = connection.ops.quote_name(Comment._meta.db_table)
+            with connection.cursor() as cursor:
+                # Replace the old path of this comment at the start of the paths of its replies
+                cursor.execute(
+                    f"""
+                    UPDATE {table} SET path = %s::integer[] || path[%s:]
+                    WHERE path @> ARRAY[%s]::integer[]
+                    """,
+                    [[*self.path, self.pk], len(old_path) + 2, self.pk],
+                )
+
+    @property
+    def message_html_depends_on_viewer(self) -> bool:
+        """Check if the shortcodes in the message have to be rendered for each viewer."""
+        from common.shortcodes import depends_on_viewer
+
+        return depends_on_viewer(self.message_html)
+
+    def get_message_html(self) -> str:
+        """Return the HTML of the message with its shortcodes rendered, as an anonymous viewer.
+
+        Messages with shortcodes are rendered once per version of the comment, and the result
+        is kept in the cache shared by all workers.
+        """
+        return self.get_messages_html([self])[self.pk]
+
+    @classmethod
+    def get_messages_html(cls, comments: Iterable['Comment']) -> Dict[int, str]:
+        """Return `get_message_html` of each of the comments by pk, looking up the cache once."""
+        from common.shortcodes import has_shortcodes, render as with_shortcodes
+
+        messages_html: Dict[int, str] = {}
+        comments_by_key: Dict[str, Comment] = {}
+        for comment in comments:
+            if has_shortcodes(comment.message_html):
+                key = f'comments:message_html:{comment.pk}:{comment.date_updated.timestamp()}'
+                comments_by_key[key] = comment
+            else:
+                messages_html[comment.pk] = comment.message_html
+        if not comments_by_key:
+            return messages_html
+
+        cache = caches['fragments']
+        cached = cache.get_many(comments_by_key)
+        rendered = {}
+        for key, comment in comments_by_key.items():
+            message_html = cached.get(key)
+            if message_html is None:
+                message_html = rendered[key] = with_shortcodes(comment.message_html)
+            messages_html[comment.pk] = message_html
+        if rendered:
+            cache.set_many(rendered)
+        return messages_html
+
     def to_dict(self) -> Dict[str, Any]:
         """Return comment data as a dict, useful for preparing JSON API responses."""
-        from common.shortcodes import render as with_shortcodes
-
         return {
             'id': self.pk,
             'full_name': self.full_name or self.username,
             'profile_image_url': self.profile_image_url,
             'date_string': self.date_created.strftime('%d %B %Y - %H:%M'),
             'message': self.message,
-            'message_html': with_shortcodes(self.message_html),
+            'message_html': self.get_message_html(),
             'like_url': self.like_url,
             'liked': False,
-            'likes': self.like_set.count(),
+            'likes': self.like_count,
             'edit_url': self.edit_url,
             'delete_url': self.delete_url,
         }
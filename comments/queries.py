@@ -1,14 +1,40 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
 import logging
-from typing import List
-
-from django.db.models import Model, Exists, OuterRef, Case, Value, When, Count, QuerySet
-from django.db.models.fields import BooleanField
 
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import (
+    Case,
+    Exists,
+    F,
+    Func,
+    Model,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.fields import BooleanField, PositiveIntegerField
+from django.utils.dateparse import parse_datetime
+
+from common.likes import set_like
 import comments.models as models
 
 
 log = logging.getLogger(__name__)
 
+# Number of top-level comments in a page of a comment section
+COMMENTS_PAGE_SIZE = 20
+
+
+class _Array(Func):
+    """An array of the given values, to compare with comment paths."""
+
+    template = 'ARRAY[%(expressions)s]'
+    output_field = ArrayField(PositiveIntegerField())
+
 
 def get_annotated_comments(obj: Model, user_pk: int) -> List[models.Comment]:
     """Return a list of annotated comments associated with the model instance `obj`.
@@ -27,36 +53,137 @@ def get_annotated_comments(obj: Model, user_pk: int) -> List[models.Comment]:
         - owned_by_current_user: bool.
     """
     comments: 'QuerySet[models.Comment]' = getattr(obj, 'comments')
+    return list(_annotate_comments(comments, user_pk))
+
 
-    return list(
-        comments.exclude(date_deleted__isnull=False, replies__isnull=True)
-        .exclude(date_deleted__isnull=False, replies__date_deleted__isnull=False)
-        .prefetch_related('user', 'reply_to', 'like_set')
+def _annotate_comments(
+    comments: 'QuerySet[models.Comment]', user_pk: Optional[int]
+) -> 'QuerySet[models.Comment]':
+    # Deleted comments are only kept when some of their replies, at any depth, are not deleted
+    has_replies_left = Exists(
+        models.Comment.objects.filter(
+            path__contains=_Array(OuterRef('pk')), date_deleted__isnull=True
+        )
+    )
+    return (
+        comments.annotate(has_replies_left=has_replies_left)
+        .filter(Q(date_deleted__isnull=True) | Q(has_replies_left=True))
+        .prefetch_related('user')
         .annotate(
             liked=Exists(models.Like.objects.filter(comment_id=OuterRef('pk'), user_id=user_pk)),
-            # This excludes likes from deleted users:
+            # Includes likes from deleted users, unlike Count('likes'):
             #    see https://code.djangoproject.com/ticket/15183
-            # number_of_likes=Count('likes'),
-            number_of_likes=Count('like__id'),
+            number_of_likes=F('like_count'),
             owned_by_current_user=Case(
                 When(user_id=user_pk, then=Value(True)),
                 default=Value(False),
                 output_field=BooleanField(),
             ),
         )
-        .all()
     )
 
 
-def set_comment_like(*, comment_pk: int, user_pk: int, like: bool) -> int:
-    if like:
-        models.Like.objects.update_or_create(
-            comment_id=comment_pk, user_id=user_pk,
+def encode_cursor(comment: models.Comment) -> str:
+    """Return the position of a top-level comment in the order of a comment section."""
+    return f'{comment.like_count},{comment.pk},{comment.date_created.isoformat()}'
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int, datetime]:
+    """Return the number of likes, ID and creation date encoded by `encode_cursor`.
+
+    Raises:
+        ValueError: when the cursor is malformed.
+    """
+    like_count, pk, date_created = cursor.split(',', 2)
+    parsed_date_created = parse_datetime(date_created)
+    if parsed_date_created is None:
+        raise ValueError(f'Invalid date in comments cursor: {date_created}')
+    return int(like_count), int(pk), parsed_date_created
+
+
+def count_comments(obj: Model) -> int:
+    """Return the number of comments displayed under the model instance `obj`."""
+    comments: 'QuerySet[models.Comment]' = getattr(obj, 'comments')
+    return _annotate_comments(comments, user_pk=None).count()
+
+
+def get_comments_page(
+    obj: Model,
+    user_pk: Optional[int],
+    after: Optional[str] = None,
+    page_size: Optional[int] = None,
+) -> Tuple[List[models.Comment], Optional[str]]:
+    """Return a page of annotated top-level comments under the model instance `obj`.
+
+    Top-level comments are ordered by number of likes, most liked first, and then by date.
+    Pages are found by keyset pagination on this order, so that loading any page costs
+    the same, no matter how many comments come before it. Replies aren't included: they are
+    loaded per thread with `get_comment_replies`.
+
+    Args:
+        obj: a model instance with comments under the attribute 'comments';
+        user_pk: the pk of the currently logged-in user, if any;
+        after: the cursor of the last comment of the previous page, if any;
+        page_size: the maximum number of comments in the page, COMMENTS_PAGE_SIZE by default.
+
+    Returns:
+        The comments of the page, annotated like `get_annotated_comments` does and with their
+        `number_of_replies`, and the cursor of the next page, if there is one.
+
+    Raises:
+        ValueError: when the `after` cursor is malformed.
+    """
+    page_size = page_size or COMMENTS_PAGE_SIZE
+    comments: 'QuerySet[models.Comment]' = getattr(obj, 'comments')
+    comments = comments.filter(reply_to__isnull=True)
+    if after:
+        like_count, pk, date_created = decode_cursor(after)
+        comments = comments.filter(
+            Q(like_count__lt=like_count)
+            | Q(like_count=like_count, date_created__gt=date_created)
+            | Q(like_count=like_count, date_created=date_created, pk__gt=pk)
+        )
+    # Not an aggregate, so that the subquery isn't grouped and always returns a single count
+    number_of_replies = Subquery(
+        models.Comment.objects.filter(
+            path__contains=_Array(OuterRef('pk')), date_deleted__isnull=True
         )
-    else:
-        models.Like.objects.filter(comment_id=comment_pk, user_id=user_pk).delete()
+        .order_by()
+        .annotate(count=Func(F('pk'), function='COUNT'))
+        .values('count')
+    )
+    page = list(
+        _annotate_comments(comments, user_pk)
+        .annotate(number_of_replies=number_of_replies)
+        .order_by('-like_count', 'date_created', 'pk')[: page_size + 1]
+    )
+    if len(page) <= page_size:
+        return page, None
+    page = page[:page_size]
+    return page, encode_cursor(page[-1])
+
 
-    return models.Like.objects.filter(comment_id=comment_pk).count()
+def get_comment_replies(*, comment_pk: int, user_pk: Optional[int]) -> List[models.Comment]:
+    """Return all the annotated replies, at any depth, to the given comment.
+
+    Replies are annotated like `get_annotated_comments` does, and deleted replies are
+    excluded unless some of their own replies are not deleted.
+    """
+    replies = models.Comment.objects.filter(path__contains=[comment_pk])
+    return list(_annotate_comments(replies, user_pk))
+
+
+def get_comment_thread(*, root_pk: int, user_pk: Optional[int]) -> List[models.Comment]:
+    """Return the given top-level comment and all its replies, annotated.
+
+    Comments are annotated and filtered like `get_comment_replies` does.
+    """
+    thread = models.Comment.objects.filter(Q(pk=root_pk) | Q(path__contains=[root_pk]))
+    return list(_annotate_comments(thread, user_pk))
+
+
+def set_comment_like(*, comment_pk: int, user_pk: int, like: bool) -> int:
+    return set_like(models.Like, 'comment', comment_pk, user_pk, like)
 
 
 def edit_comment(*, comment_pk: int, user_pk: int, message: str) -> models.Comment:
@@ -93,8 +220,7 @@ def moderator_delete_comment(*, comment_pk: int) -> None:
 
 def delete_comment_tree(*, comment_pk: int) -> None:
     """Soft-deletes (i.e. mark sas deleted) the comment and all its replies."""
-    comment: models.Comment = models.Comment.objects.get(id=comment_pk)
-    comment.soft_delete_tree()
+    models.Comment.objects.subtree(comment_pk).soft_delete()
 
 
 def hard_delete_comment_tree(*, comment_pk: int) -> None:
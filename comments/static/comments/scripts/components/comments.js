@@ -2,8 +2,17 @@
 /* global ajax:false */
 
 window.comments = (function comments() {
+  // Parse the HTML of comments loaded from the API, and activate them before they are inserted.
+  function createCommentsFragment(html) {
+    const fragment = document.createRange().createContextualFragment(html);
+    // eslint-disable-next-line no-use-before-define
+    fragment.querySelectorAll(`.${Comment.className}`).forEach(Comment.getOrWrap);
+    return fragment;
+  }
+
   class Comment {
     constructor(element) {
+      Comment.instances.set(element, this);
       this.id = element.dataset.commentId;
       this.likeUrl = element.dataset.commentLikeUrl;
       this.editUrl = element.dataset.editUrl;
@@ -46,6 +55,10 @@ window.comments = (function comments() {
       return this.element.querySelector('.checkbox-like');
     }
 
+    get loadRepliesButton() {
+      return this.element.querySelector(':scope > .replies > .comment-load-replies');
+    }
+
     get commentLikesCountElement() {
       return this.element.querySelector('.likes-count');
     }
@@ -109,6 +122,25 @@ window.comments = (function comments() {
         });
 
       this.likeButton && this.likeButton.addEventListener('click', this._postLike.bind(this));
+
+      this.loadRepliesButton &&
+        this.loadRepliesButton.addEventListener('click', (event) => {
+          event.preventDefault();
+          this._loadReplies();
+        });
+    }
+
+    _loadReplies() {
+      const { loadRepliesButton } = this;
+      loadRepliesButton.disabled = true;
+
+      ajax.jsonRequest('GET', loadRepliesButton.dataset.repliesUrl).then((data) => {
+        // Replies posted before the replies were loaded are part of the response
+        this.element
+          .querySelector(':scope > .replies > .comments')
+          .replaceChildren(createCommentsFragment(data.html));
+        loadRepliesButton.remove();
+      });
     }
 
     get replyInputsElement() {
@@ -674,7 +706,73 @@ window.comments = (function comments() {
       Section.instances.set(element, this);
       this.element = element;
       this.commentUrl = element.dataset.commentUrl;
+      this.commentsUrl = element.dataset.commentsUrl;
       this.profileImageUrl = element.dataset.profileImageUrl;
+      this._setupEventListeners();
+      this._showLinkedComment();
+    }
+
+    get loadMoreButton() {
+      return this.element.querySelector('.comment-load-more');
+    }
+
+    _setupEventListeners() {
+      this.loadMoreButton &&
+        this.loadMoreButton.addEventListener('click', (event) => {
+          event.preventDefault();
+          this._loadMore();
+        });
+    }
+
+    _loadMore() {
+      const { loadMoreButton } = this;
+      loadMoreButton.disabled = true;
+
+      ajax.jsonRequest('GET', loadMoreButton.dataset.nextPageUrl).then((data) => {
+        // Skip the comments that were posted after the first page was loaded
+        const fragment = createCommentsFragment(data.html);
+        fragment.querySelectorAll(':scope > .top-level-comment').forEach((element) => {
+          if (this.element.querySelector(`#${element.id}`)) {
+            element.remove();
+          }
+        });
+        this.element.querySelector('.comments').append(fragment);
+
+        if (data.next_page_url) {
+          loadMoreButton.dataset.nextPageUrl = data.next_page_url;
+          loadMoreButton.disabled = false;
+        } else {
+          loadMoreButton.remove();
+        }
+      });
+    }
+
+    // Comments linked to by the URL's anchor may be in a page or a thread that isn't loaded yet
+    _showLinkedComment() {
+      const match = window.location.hash.match(/^#(comment-(\d+))$/);
+      if (!match || !this.commentsUrl || document.getElementById(match[1])) {
+        return;
+      }
+      const [, anchor, commentId] = match;
+
+      const url = `${this.commentsUrl}?${new URLSearchParams({ thread: commentId })}`;
+      ajax.jsonRequest('GET', url).then((data) => {
+        const fragment = createCommentsFragment(data.html);
+        const thread = fragment.querySelector(':scope > .top-level-comment');
+        if (!thread) {
+          return;
+        }
+        // The whole thread replaces its top-level comment, if it was loaded without its replies
+        const loadedComment = this.element.querySelector(`#${thread.id}`);
+        if (loadedComment) {
+          loadedComment.replaceWith(thread);
+        } else {
+          this.element.querySelector('.comments').prepend(thread);
+        }
+
+        const linkedComment = document.getElementById(anchor);
+        linkedComment && linkedComment.scrollIntoView();
+      });
     }
 
     prependComment(comment) {
@@ -40,7 +40,8 @@ class TestCommentTreeConstruction(TestCase):
             comment_trees[0].id, self.comment_with_replies.id, [str(_) for _ in comment_trees]
         )
         self.assertEqual(comment_trees[0].message, '[deleted]')
-        self.assertEqual(len(comment_trees[0].replies), 2)
+        self.assertEqual(comment_trees[0].number_of_replies, 2)
+        self.assertEqual(comment_trees[0].replies_url, self.comment_with_replies.replies_url)
 
     def test_deleted_comments_without_replies_are_not_included_in_tree(self):
         self.comment_no_replies.soft_delete()
@@ -50,7 +51,7 @@ class TestCommentTreeConstruction(TestCase):
         comment_trees = response.context['comments'].comment_trees
         self.assertEqual(len(comment_trees), 1)
         self.assertEqual(comment_trees[0].id, self.comment_with_replies.id)
-        self.assertEqual(len(comment_trees[0].replies), 2)
+        self.assertEqual(comment_trees[0].number_of_replies, 2)
 
     def test_deleted_comments_with_deleted_replies_not_included_in_tree(self):
         self.comment_with_replies.soft_delete_tree()
@@ -0,0 +1,66 @@
+from django.test.testcases import TestCase
+
+from comments.models import Comment
+from comments.queries import archive_comment, delete_comment_tree, get_annotated_comments
+from common.tests.factories.blog import PostFactory
+from common.tests.factories.comments import CommentFactory, CommentUnderPostFactory
+
+
+class TestCommentPath(TestCase):
+    def setUp(self) -> None:
+        self.root = CommentFactory()
+        self.reply = CommentFactory(reply_to=self.root)
+        self.reply_to_reply = CommentFactory(reply_to=self.reply)
+        self.other_root = CommentFactory()
+
+    def test_path_is_set_on_insert(self):
+        self.assertEqual(self.root.path, [])
+        self.assertEqual(self.reply.path, [self.root.pk])
+        self.assertEqual(self.reply_to_reply.path, [self.root.pk, self.reply.pk])
+        self.assertEqual(self.reply_to_reply.root_pk, self.root.pk)
+
+    def test_paths_of_replies_are_updated_when_comment_replies_to_another_one(self):
+        self.reply.reply_to = self.other_root
+        self.reply.save()
+
+        self.reply_to_reply.refresh_from_db()
+        self.assertEqual(self.reply.path, [self.other_root.pk])
+        self.assertEqual(self.reply_to_reply.path, [self.other_root.pk, self.reply.pk])
+
+    def test_get_tree_comments(self):
+        with self.assertNumQueries(1):
+            tree_pks = {comment.pk for comment in self.reply_to_reply.get_tree_comments()}
+
+        self.assertEqual(tree_pks, {self.root.pk, self.reply.pk, self.reply_to_reply.pk})
+
+    def test_delete_comment_tree_is_a_single_update(self):
+        with self.assertNumQueries(1):
+            delete_comment_tree(comment_pk=self.reply.pk)
+
+        deleted = Comment.objects.filter(date_deleted__isnull=False)
+        self.assertEqual(
+            set(deleted.values_list('pk', flat=True)), {self.reply.pk, self.reply_to_reply.pk}
+        )
+
+    def test_archive_comment(self):
+        with self.assertNumQueries(2):
+            is_archived = archive_comment(comment_pk=self.reply_to_reply.pk)
+
+        self.assertTrue(is_archived)
+        archived = Comment.objects.filter(is_archived=True)
+        self.assertEqual(
+            set(archived.values_list('pk', flat=True)),
+            {self.root.pk, self.reply.pk, self.reply_to_reply.pk},
+        )
+
+    def test_deleted_comments_with_replies_left_at_any_depth_are_kept(self):
+        post = PostFactory()
+        root = CommentUnderPostFactory(comment_post__post=post)
+        reply = CommentUnderPostFactory(comment_post__post=post, reply_to=root)
+        CommentUnderPostFactory(comment_post__post=post, reply_to=reply)
+        root.soft_delete()
+        reply.soft_delete()
+
+        comments = get_annotated_comments(post, user_pk=None)
+
+        self.assertEqual(len(comments), 3)
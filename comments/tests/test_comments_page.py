@@ -0,0 +1,120 @@
+from unittest.mock import patch, Mock
+
+from django.test.testcases import TestCase
+from django.urls import reverse
+
+from blog.models import Post
+from comments.models import Comment
+from comments.queries import get_comments_page
+from common.tests.factories.blog import PostFactory
+from common.tests.factories.comments import CommentUnderPostFactory, CommentUnderSectionFactory
+from common.tests.factories.users import UserFactory
+from training.models import Training
+
+
+@patch('sorl.thumbnail.base.ThumbnailBackend.get_thumbnail', Mock(url=''))
+class TestCommentsPage(TestCase):
+    def setUp(self) -> None:
+        self.post = PostFactory()
+        self.comments = [CommentUnderPostFactory(comment_post__post=self.post) for _ in range(5)]
+        Comment.objects.filter(pk=self.comments[3].pk).update(like_count=2)
+        Comment.objects.filter(pk=self.comments[1].pk).update(like_count=1)
+        self.reply = CommentUnderPostFactory(
+            comment_post__post=self.post, reply_to=self.comments[1]
+        )
+        CommentUnderPostFactory(comment_post__post=self.post, reply_to=self.reply)
+
+    def test_pages_follow_likes_and_dates(self):
+        pages = []
+        cursor = None
+        while True:
+            page, cursor = get_comments_page(self.post, user_pk=None, after=cursor, page_size=2)
+            pages.append([comment.pk for comment in page])
+            if cursor is None:
+                break
+
+        c = [comment.pk for comment in self.comments]
+        self.assertEqual(pages, [[c[3], c[1]], [c[0], c[2]], [c[4]]])
+
+    def test_page_counts_replies_at_any_depth(self):
+        with self.assertNumQueries(2):
+            page, _ = get_comments_page(self.post, user_pk=None)
+
+        number_of_replies = {comment.pk: comment.number_of_replies for comment in page}
+        self.assertEqual(number_of_replies[self.comments[1].pk], 2)
+        self.assertEqual(number_of_replies[self.comments[0].pk], 0)
+
+    def test_post_detail_embeds_only_the_first_page(self):
+        with patch('comments.queries.COMMENTS_PAGE_SIZE', 2):
+            response = self.client.get(reverse('post-detail', kwargs={'slug': self.post.slug}))
+
+        self.assertEqual(response.status_code, 200)
+        comments = response.context['comments']
+        self.assertEqual(comments.number_of_comments, 7)
+        self.assertEqual(len(comments.comment_trees), 2)
+        self.assertEqual(comments.comment_trees[1].replies, [])
+        self.assertIsNotNone(comments.next_page_url)
+
+        response = self.client.get(comments.next_page_url)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertIn(f'id="{self.comments[0].anchor}"', data['html'])
+        self.assertIsNotNone(data['next_page_url'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(self.post.comments_url, {'after': 'invalid'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_replies_are_loaded_per_thread(self):
+        response = self.client.get(self.comments[1].replies_url)
+
+        self.assertEqual(response.status_code, 200)
+        html = response.json()['html']
+        self.assertIn(f'id="{self.reply.anchor}"', html)
+        self.assertNotIn(f'id="{self.comments[1].anchor}"', html)
+
+    def test_thread_of_a_reply_is_loaded_whole(self):
+        response = self.client.get(self.post.comments_url, {'thread': self.reply.pk})
+
+        self.assertEqual(response.status_code, 200)
+        html = response.json()['html']
+        self.assertIn(f'id="{self.comments[1].anchor}"', html)
+        self.assertIn(f'id="{self.reply.anchor}"', html)
+        self.assertNotIn(f'id="{self.comments[0].anchor}"', html)
+
+    def test_thread_must_be_under_the_same_object(self):
+        other_comment = CommentUnderPostFactory()
+
+        response = self.client.get(self.post.comments_url, {'thread': other_comment.pk})
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get(self.post.comments_url, {'thread': 'invalid'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_comments_of_unpublished_objects_are_only_visible_to_staff(self):
+        Post.objects.filter(pk=self.post.pk).update(is_published=False)
+
+        self.assertEqual(self.client.get(self.post.comments_url).status_code, 404)
+        self.assertEqual(self.client.get(self.comments[1].replies_url).status_code, 404)
+
+        self.client.force_login(UserFactory(is_staff=True))
+
+        self.assertEqual(self.client.get(self.post.comments_url).status_code, 200)
+        self.assertEqual(self.client.get(self.comments[1].replies_url).status_code, 200)
+
+    def test_comments_of_sections_of_unpublished_trainings_are_hidden(self):
+        comment = CommentUnderSectionFactory(
+            comment_section__section__is_published=True,
+            comment_section__section__chapter__is_published=True,
+        )
+        section = comment.section.get()
+
+        self.assertEqual(self.client.get(section.comments_url).status_code, 404)
+        self.assertEqual(self.client.get(comment.replies_url).status_code, 404)
+
+        Training.objects.filter(pk=section.chapter.training_id).update(is_published=True)
+
+        self.assertEqual(self.client.get(section.comments_url).status_code, 200)
+        self.assertEqual(self.client.get(comment.replies_url).status_code, 200)
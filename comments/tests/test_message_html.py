@@ -0,0 +1,62 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test.testcases import TestCase
+
+from comments.models import Comment
+from common.tests.factories.comments import CommentFactory
+
+
+class TestMessageHtml(TestCase):
+    def tearDown(self) -> None:
+        caches['fragments'].clear()
+
+    def test_render_comments_html(self):
+        comment = CommentFactory(message='**Hello**')
+        Comment.objects.filter(pk=comment.pk).update(message_html='')
+
+        call_command('render_comments_html', '--processes', '1', stdout=StringIO())
+
+        updated_comment = Comment.objects.get(pk=comment.pk)
+        self.assertEqual(updated_comment.message_html, '<p><strong>Hello</strong></p>\n')
+        self.assertEqual(updated_comment.date_updated, comment.date_updated)
+
+    def test_message_without_shortcodes_is_not_parsed(self):
+        comment = CommentFactory(message='Hello')
+
+        with patch('common.shortcodes.render') as render:
+            self.assertEqual(comment.get_message_html(), comment.message_html)
+
+        render.assert_not_called()
+
+    def test_message_with_shortcodes_is_rendered_once_per_version(self):
+        comment = CommentFactory(message="{test abc='def'}")
+        message_html = comment.get_message_html()
+        self.assertIn('<dd>def</dd>', message_html)
+
+        with patch('common.shortcodes.render') as render:
+            self.assertEqual(comment.get_message_html(), message_html)
+        render.assert_not_called()
+
+        comment.message = "{test abc='ghi'}"
+        comment.save()
+        self.assertIn('<dd>ghi</dd>', comment.get_message_html())
+
+    def test_messages_with_shortcodes_are_looked_up_at_once(self):
+        comments = [CommentFactory(message=f"{{test abc='{i}'}}") for i in range(3)]
+        messages_html = Comment.get_messages_html(comments)
+
+        with self.assertNumQueries(1), patch('common.shortcodes.render') as render:
+            self.assertEqual(Comment.get_messages_html(comments), messages_html)
+        render.assert_not_called()
+        for i, comment in enumerate(comments):
+            self.assertIn(f'<dd>{i}</dd>', messages_html[comment.pk])
+
+    def test_shortcodes_depending_on_viewer_are_detected(self):
+        comment = CommentFactory(message="{iframe src='https://example.com' group='subscriber'}")
+        other_comment = CommentFactory(message="{iframe src='https://example.com'}")
+
+        self.assertTrue(comment.message_html_depends_on_viewer)
+        self.assertFalse(other_comment.message_html_depends_on_viewer)
@@ -8,9 +8,13 @@ from typing import List, Optional, Literal, Dict
 @dc.dataclass
 class Comments:
     comment_url: str
-    number_of_comments: int
+    number_of_comments: Optional[int]
     comment_trees: List[CommentTree]
     profile_image_url: str
+    # URL of the next page of top-level comments, if they are not all in `comment_trees`
+    next_page_url: Optional[str] = None
+    # URL of the pages of top-level comments, and of the thread of any comment
+    comments_url: Optional[str] = None
 
 
 @dc.dataclass
@@ -26,6 +30,8 @@ class CommentTree:
     badges: Optional[Dict]
     message: str
     message_html: str
+    # Whether shortcodes in `message_html` are left for the template to render, for the viewer
+    render_shortcodes: bool
     like_url: Optional[str]
     liked: bool
     likes: int
@@ -37,6 +43,9 @@ class CommentTree:
     delete_tree_url: Optional[str]
     hard_delete_tree_url: Optional[str]
     edited: bool
+    number_of_replies: int = 0
+    # URL of the replies, if they are not in `replies` and have to be loaded separately
+    replies_url: Optional[str] = None
 
 
 @dc.dataclass
@@ -44,6 +53,7 @@ class DeletedCommentTree(CommentTree):
     full_name: Literal['[deleted]'] = '[deleted]'
     message: Literal['[deleted]'] = '[deleted]'
     message_html: Literal['[deleted]'] = '[deleted]'
+    render_shortcodes: Literal[False] = False
     profile_image_url: Literal[None] = None
     badges: Literal[None] = None
     like_url: Literal[None] = None
@@ -4,6 +4,7 @@ from comments.views.api.archive import comment_archive_tree
 from comments.views.api.delete import comment_delete, comment_delete_tree, comment_hard_delete_tree
 from comments.views.api.edit import comment_edit
 from comments.views.api.like import comment_like
+from comments.views.api.replies import comment_replies
 
 urlpatterns = [
     path(
@@ -11,6 +12,7 @@ urlpatterns = [
         include(
             [
                 path('like/', comment_like, name='comment-like'),
+                path('replies/', comment_replies, name='comment-replies'),
                 path('edit/', comment_edit, name='comment-edit'),
                 path('archive/', comment_archive_tree, name='comment-archive-tree'),
                 path('delete/', comment_delete, name='comment-delete'),
@@ -0,0 +1,24 @@
+"""Comment API used to load the replies that aren't embedded in a comment section."""
+from django.http.request import HttpRequest
+from django.http.response import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from comments.models import Comment
+from comments.queries import get_comment_replies
+from comments.views.common import (
+    comment_trees_to_template_type,
+    get_comment_target_or_404,
+    render_comment_trees,
+)
+
+
+@require_safe
+def comment_replies(request: HttpRequest, *, comment_pk: int) -> JsonResponse:
+    """Return the rendered replies, at any depth, to a comment."""
+    comment = get_object_or_404(Comment, pk=comment_pk)
+    get_comment_target_or_404(comment, request.user)
+
+    replies = get_comment_replies(comment_pk=comment_pk, user_pk=request.user.pk)
+    comment_trees = comment_trees_to_template_type(replies, request.user, reply_to_pk=comment_pk)
+    return JsonResponse({'html': render_comment_trees(request, comment_trees)})
@@ -1,49 +1,103 @@
 # noqa: D100
-from typing import Dict, List, Optional, Sequence
+from typing import Dict, List, Optional, Sequence, Type, TypeVar
+from urllib.parse import urlencode
 import json
 
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.http import JsonResponse
+from django.db.models import Model, QuerySet
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
+from django.http.request import HttpRequest
+from django.http.response import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
 
 from comments import typed_templates
 from comments.models import Comment
-from common import markdown
+from comments.queries import count_comments, get_comment_thread, get_comments_page
 from common.types import assert_cast
 
 User = get_user_model()
+M = TypeVar('M', bound=Model)
 
 
-def comments_to_template_type(
-    comments: Sequence[Comment], comment_url: str, user: User
-) -> typed_templates.Comments:
-    # noqa: D103
+def get_commented_object_or_404(model: Type[M], user: User, pk: int) -> M:
+    """Return the object with comments, unless it's unpublished and the user isn't staff.
+
+    The object is looked up with the `published_filters` of its model, the same lookups
+    its detail view uses to hide unpublished objects.
+
+    Raises:
+        Http404: when no such object is visible to the user.
+    """
+    filters = (
+        getattr(model, 'published_filters') if not user.is_staff and not user.is_superuser else {}
+    )
+    return get_object_or_404(model, pk=pk, **filters)
+
+
+def get_comment_target_or_404(comment: Comment, user: User) -> Model:
+    """Return the object under which the comment is shown, if it's visible to the user.
+
+    Raises:
+        Http404: when the comment isn't under any object visible to the user.
+    """
+    target = comment.get_action_target()
+    if target is None:
+        raise Http404('Comment is not under any page')
+    return get_commented_object_or_404(type(target), user, target.pk)
+
+
+def comment_trees_to_template_type(
+    comments: Sequence[Comment], user: User, reply_to_pk: Optional[int] = None
+) -> List[typed_templates.CommentTree]:
+    """Build the trees of the comments replying to `reply_to_pk`, top-level ones by default.
+
+    Top-level comments annotated with their `number_of_replies` are expected to come without
+    their replies, which are then loaded from their `replies_url`.
+    """
     user_is_moderator = user.has_perm('comments.moderate_comment')
     lookup: Dict[Optional[int], List[Comment]] = {}
     # Sort all comments chronologically, oldest first
     for comment in sorted(comments, key=lambda c: c.date_created):
-        reply_to_pk = None if comment.reply_to is None else comment.reply_to.pk
+        lookup.setdefault(comment.reply_to_id, []).append(comment)
+    # Shortcodes depending on the viewer are left for the template to render
+    messages_html = Comment.get_messages_html(
+        comment
+        for comment in comments
+        if not comment.is_deleted and not comment.message_html_depends_on_viewer
+    )
 
-        lookup.setdefault(reply_to_pk, []).append(comment)
+    def build_replies(comment: Comment) -> Dict:
+        replies = [build_tree(reply) for reply in lookup.get(comment.pk, [])]
+        number_of_replies = getattr(comment, 'number_of_replies', None)
+        if number_of_replies is None:
+            number_of_replies = sum(1 + reply.number_of_replies for reply in replies)
+            replies_url = None
+        else:
+            replies_url = comment.replies_url if number_of_replies else None
+        return {
+            'replies': replies,
+            'number_of_replies': number_of_replies,
+            'replies_url': replies_url,
+        }
 
     def build_tree(comment: Comment) -> typed_templates.CommentTree:
         if comment.is_deleted:
             return build_deleted_tree(comment)
-        # FIXME(anna) remove when all comments have message_html
-        comment.message_html = comment.message_html or markdown.render(
-            markdown.sanitize(comment.message)
-        )
+        render_shortcodes = comment.pk not in messages_html
         return typed_templates.CommentTree(
             id=comment.pk,
             anchor=comment.anchor,
             full_name=comment.full_name or comment.username,
             date=comment.date_created,
             message=assert_cast(str, comment.message),
-            message_html=assert_cast(str, comment.message_html),
+            message_html=assert_cast(str, messages_html.get(comment.pk, comment.message_html)),
+            render_shortcodes=render_shortcodes,
             like_url=comment.like_url,
             liked=assert_cast(bool, getattr(comment, 'liked')),
             likes=assert_cast(int, getattr(comment, 'number_of_likes')),
-            replies=[build_tree(reply) for reply in lookup.get(comment.pk, [])],
+            **build_replies(comment),
             profile_image_url=comment.profile_image_url,
             badges=comment.badges,
             edit_url=(
@@ -63,7 +117,7 @@ def comments_to_template_type(
             hard_delete_tree_url=comment.hard_delete_tree_url if user_is_moderator else None,
             edited=(comment.date_updated != comment.date_created),
             is_archived=comment.is_archived,
-            is_top_level=True if comment.reply_to is None else False,
+            is_top_level=comment.reply_to_id is None,
         )
 
     def build_deleted_tree(comment: Comment) -> typed_templates.DeletedCommentTree:
@@ -78,25 +132,102 @@ def comments_to_template_type(
             id=comment.pk,
             anchor=comment.anchor,
             date=comment.date_created,
-            replies=[build_tree(reply) for reply in lookup.get(comment.pk, [])],
+            **build_replies(comment),
             is_archived=comment.is_archived,
-            is_top_level=True if comment.reply_to is None else False,
+            is_top_level=comment.reply_to_id is None,
         )
 
+    if reply_to_pk is not None:
+        return [build_tree(comment) for comment in lookup.get(reply_to_pk, [])]
+
     # Top-level comments are ordered by number of likes and date
     top_level_comments = sorted(
         (comment for comment in lookup.get(None, [])),
-        key=lambda c: (-c.number_of_likes, c.date_created),
+        key=lambda c: (-c.number_of_likes, c.date_created, c.pk),
     )
+    return [build_tree(comment) for comment in top_level_comments]
+
 
+def comments_to_template_type(
+    comments: Sequence[Comment], comment_url: str, user: User
+) -> typed_templates.Comments:
+    # noqa: D103
     return typed_templates.Comments(
         comment_url=comment_url,
         number_of_comments=len(comments),
-        comment_trees=[build_tree(comment) for comment in top_level_comments],
+        comment_trees=comment_trees_to_template_type(comments, user),
+        profile_image_url=user.image_url if getattr(user, 'image', None) else None,
+    )
+
+
+def comments_page_to_template_type(
+    obj: Model, user: User, after: Optional[str] = None
+) -> typed_templates.Comments:
+    """Return a page of the top-level comments under `obj`, the first one by default.
+
+    `obj` is expected to have a `comment_url`, to which comments are posted, and
+    a `comments_url`, which serves the pages of its comments with `comments_page_response`.
+    Comments are only counted for the first page.
+
+    Raises:
+        ValueError: when the `after` cursor is malformed.
+    """
+    comments, next_cursor = get_comments_page(obj, user.pk, after=after)
+    comments_url: str = getattr(obj, 'comments_url')
+    return typed_templates.Comments(
+        comment_url=getattr(obj, 'comment_url'),
+        number_of_comments=count_comments(obj) if after is None else None,
+        comment_trees=comment_trees_to_template_type(comments, user),
         profile_image_url=user.image_url if getattr(user, 'image', None) else None,
+        next_page_url=(
+            f'{comments_url}?{urlencode({"after": next_cursor})}' if next_cursor else None
+        ),
+        comments_url=comments_url,
     )
 
 
+def render_comment_trees(
+    request: HttpRequest, comment_trees: List[typed_templates.CommentTree]
+) -> str:
+    """Render comment trees the same way they are rendered in a comment section."""
+    return render_to_string(
+        'comments/components/comment_tree.html', {'comment_trees': comment_trees}, request
+    )
+
+
+def comments_page_response(request: HttpRequest, obj: Model) -> HttpResponse:
+    """Return the HTML of a page of top-level comments under `obj`, and the next page's URL.
+
+    With a `thread` parameter, the HTML of the whole thread containing that comment is returned
+    instead, so that comments can be linked to by their anchor, wherever they are.
+    """
+    if 'thread' in request.GET:
+        return comment_thread_response(request, obj)
+    try:
+        comments = comments_page_to_template_type(obj, request.user, request.GET.get('after'))
+    except ValueError:
+        return HttpResponseBadRequest('Invalid cursor')
+    return JsonResponse(
+        {
+            'html': render_comment_trees(request, comments.comment_trees),
+            'next_page_url': comments.next_page_url,
+        }
+    )
+
+
+def comment_thread_response(request: HttpRequest, obj: Model) -> HttpResponse:
+    """Return the HTML of the thread, replies included, of a comment under `obj`."""
+    try:
+        comment_pk = int(request.GET['thread'])
+    except ValueError:
+        return HttpResponseBadRequest('Invalid comment ID')
+    comments: 'QuerySet[Comment]' = getattr(obj, 'comments')
+    comment = get_object_or_404(comments, pk=comment_pk)
+    thread = get_comment_thread(root_pk=comment.root_pk, user_pk=request.user.pk)
+    comment_trees = comment_trees_to_template_type(thread, request.user)
+    return JsonResponse({'html': render_comment_trees(request, comment_trees)})
+
+
 def comment_response(request, comment_model, to_field, field_pk):
     """Add a comment linked to a specific model and pk."""
     parsed_body = json.loads(request.body)
@@ -3,13 +3,18 @@ from typing import Dict
 
 from django.conf import settings
 from django.http.request import HttpRequest
+from django.urls import reverse
 
 
 def search_client_config(request: HttpRequest) -> Dict[str, Dict[str, str]]:
-    """Inject the MeiliSearch client configuration data into the template context."""
+    """Inject the MeiliSearch client configuration data into the template context.
+
+    The JS client doesn't query MeiliSearch directly, but the caching proxy in the search app,
+    which exposes the same `indexes/<index_uid>/search` endpoints.
+    """
     return {
         'search_client_config': {
-            'hostUrl': settings.MEILISEARCH_API_ADDRESS,
+            'hostUrl': request.build_absolute_uri(reverse('search') + 'api/'),
             'apiKey': settings.MEILISEARCH_PUBLIC_KEY,
         },
     }
@@ -0,0 +1,61 @@
+"""Likes of comments, film assets and blog posts, and their denormalized counts."""
+from typing import Type
+
+from django.db import models, transaction
+from django.db.models import Count, Expression, F, OuterRef, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+
+
+def set_like(
+    like_model: Type[models.Model], liked_field: str, liked_pk: int, user_pk: int, like: bool
+) -> int:
+    """Like or unlike an object, and update its `like_count` in the same transaction.
+
+    Args:
+        like_model: the model of the likes, e.g. `blog.models.Like`.
+        liked_field: the name of the foreign key to the liked object, e.g. 'post'.
+        liked_pk: the ID of the liked object.
+        user_pk: the ID of the user who likes or no longer likes the object.
+        like: whether the user likes the object.
+
+    Returns:
+        The updated number of likes of the object.
+    """
+    liked_model = like_model._meta.get_field(liked_field).related_model
+    liked = liked_model.objects.filter(pk=liked_pk)
+    lookup = {f'{liked_field}_id': liked_pk, 'user_id': user_pk}
+    with transaction.atomic():
+        if like:
+            _, created = like_model.objects.get_or_create(**lookup)
+            delta = 1 if created else 0
+        else:
+            _, deleted = like_model.objects.filter(**lookup).delete()
+            delta = -deleted.get(like_model._meta.label, 0)
+        if delta:
+            liked.update(like_count=F('like_count') + delta)
+        return liked.values_list('like_count', flat=True).first() or 0
+
+
+def get_actual_like_count(like_model: Type[models.Model], liked_field: str) -> Expression:
+    """Return an expression counting the likes of a liked object, for annotations and updates."""
+    return Coalesce(
+        Subquery(
+            like_model.objects.filter(**{liked_field: OuterRef('pk')})
+            .order_by()
+            .values(liked_field)
+            .annotate(count=Count('pk'))
+            .values('count')
+        ),
+        0,
+    )
+
+
+def get_like_count_mismatches(like_model: Type[models.Model], liked_field: str) -> QuerySet:
+    """Return the liked objects whose `like_count` differs from their number of likes.
+
+    Objects are annotated with their `actual_like_count`.
+    """
+    liked_model = like_model._meta.get_field(liked_field).related_model
+    return liked_model.objects.annotate(
+        actual_like_count=get_actual_like_count(like_model, liked_field)
+    ).exclude(like_count=F('actual_like_count'))
@@ -0,0 +1,55 @@
+# noqa: D100
+from typing import Any
+import logging
+
+from django.core.management.base import BaseCommand
+
+from common.likes import get_actual_like_count, get_like_count_mismatches
+import blog.models
+import comments.models
+import films.models
+
+logger = logging.getLogger(__name__)
+LIKE_MODELS = (
+    (comments.models.Like, 'comment'),
+    (films.models.Like, 'asset'),
+    (blog.models.Like, 'post'),
+)
+
+
+class Command(BaseCommand):  # noqa: D101
+    help = (
+        'Recount the likes of comments, film assets and blog posts, and fix their like_count '
+        'where it differs from the number of likes.'
+    )
+
+    def add_arguments(self, parser):  # noqa: D102
+        parser.add_argument(
+            '--dry-run', action='store_true', help='Only report the like counts to fix.'
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: D102
+        for like_model, liked_field in LIKE_MODELS:
+            liked_model = like_model._meta.get_field(liked_field).related_model
+            mismatches = list(
+                get_like_count_mismatches(like_model, liked_field).values_list(
+                    'pk', 'like_count', 'actual_like_count'
+                )
+            )
+            for pk, like_count, actual_like_count in mismatches:
+                logger.warning(
+                    '%s pk=%s has like_count %s instead of %s',
+                    liked_model.__name__,
+                    pk,
+                    like_count,
+                    actual_like_count,
+                )
+            if mismatches and not options['dry_run']:
+                # Counted again by the UPDATE, in case likes were added in the meantime
+                liked_model.objects.filter(pk__in=[pk for pk, *_ in mismatches]).update(
+                    like_count=get_actual_like_count(like_model, liked_field)
+                )
+            self.stdout.write(
+                f'{liked_model.__name__}: {len(mismatches)} like counts '
+                f'{"to fix" if options["dry_run"] else "fixed"}'
+            )
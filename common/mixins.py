@@ -1,6 +1,6 @@
 """Commonly used model and admin mixins."""
 from functools import lru_cache
-from typing import Optional, Any, Union, List, Tuple
+from typing import Iterable, Optional, Any, Union, List, Tuple
 import logging
 
 from django.conf import settings
@@ -13,7 +13,11 @@ from django.utils.safestring import mark_safe
 import looper.model_mixins
 import looper.admin_log
 
-from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import settings as sorl_settings, defaults as sorl_defaults
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
 
 log = logging.getLogger(__name__)
 
@@ -83,11 +87,60 @@ class ViewOnSiteMixin:
     view_link.short_description = "View on site"
 
 
+CACHED_DB_KVSTORE = 'sorl.thumbnail.kvstores.cached_db_kvstore.KVStore'
+
+
 @lru_cache(maxsize=1024)
 def _cacheable_get_thumnbnail(thumbnail, size_settings):
     return get_thumbnail(thumbnail, size_settings, crop=settings.THUMBNAIL_CROP_MODE).url
 
 
+def get_thumbnail_file(file_: Any, geometry_string: str, **options: Any) -> ImageFile:
+    """Return the thumbnail `get_thumbnail` would look up, without looking it up.
+
+    Mirrors how sorl-thumbnail's backend names thumbnails after their source and options.
+    """
+    backend = default.backend
+    source = ImageFile(file_)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry_string, options)
+    return ImageFile(name, default.storage)
+
+
+def prefetch_image_files(image_files: Iterable[ImageFile]) -> None:
+    """Load what sorl-thumbnail knows about many images and thumbnails with a single query.
+
+    `get_thumbnail` and the `is_portrait` filter look up each image in sorl's key-value store,
+    which costs a query per image whenever it isn't cached yet. This puts the stored entries of
+    all given images in the cache, so that only the images never seen before are queried again.
+    """
+    if sorl_settings.THUMBNAIL_KVSTORE != CACHED_DB_KVSTORE:
+        return
+    keys = {add_prefix(image_file.key, 'image') for image_file in image_files}
+    kvstore_cache = default.kvstore.cache
+    missing_keys = keys - set(kvstore_cache.get_many(keys))
+    if not missing_keys:
+        return
+    values = KVStore.objects.filter(key__in=missing_keys).values_list('key', 'value')
+    kvstore_cache.set_many(dict(values), sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+
+
+def prefetch_thumbnails(thumbnails: Iterable[Any], size_settings: str) -> None:
+    """Load the thumbnails `thumbnail_<size>_url` returns for the given images at once."""
+    prefetch_image_files(
+        get_thumbnail_file(thumbnail, size_settings, crop=settings.THUMBNAIL_CROP_MODE)
+        for thumbnail in thumbnails
+        if thumbnail
+    )
+
+
 class StaticThumbnailURLMixin:
     """Add `thumbnail_<size>_url` properties generating static cacheable thumbnail URLs."""
 
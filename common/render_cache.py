@@ -0,0 +1,76 @@
+"""A cache of rendered markdown, keyed by the kind of rendering and a hash of the text.
+
+Rendered text is looked up first in a small in-process LRU cache, then in the cache shared by
+all processes, where old entries are culled once it holds more than its MAX_ENTRIES, and only
+rendered when neither has it. Since keys are derived from the text itself, entries never have
+to be invalidated: edited text simply gets a new key. VERSION is part of every key, and has to
+be incremented when renderers change how they render the same text.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+import hashlib
+import threading
+
+from django.core.cache import caches
+
+VERSION = 1
+LOCAL_SIZE = 1000  # entries
+SHARED_CACHE = 'fragments'
+
+
+class RenderCache:
+    """Two tiers of rendered text: an in-process LRU cache and a shared cache."""
+
+    def __init__(self, local_size: int = LOCAL_SIZE, shared_cache: str = SHARED_CACHE):
+        """Configure the cache, `shared_cache` is an alias in the CACHES setting."""
+        self.local_size = local_size
+        self.shared_cache = shared_cache
+        self._local: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    def get_or_render(self, kind: str, text: str, render: Callable[[str], str]) -> str:
+        """Return the text rendered by `render`, which is only called if it isn't cached.
+
+        `kind` tells apart the renderers that can be given the same text.
+        """
+        if not text:
+            return render(text)
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        key = f'render:{VERSION}:{kind}:{digest}'
+        with self._lock:
+            rendered = self._local.get(key)
+            if rendered is not None:
+                self._local.move_to_end(key)
+                self.counters['local_hits'] += 1
+                return rendered
+
+        shared_cache = caches[self.shared_cache]
+        rendered = shared_cache.get(key)
+        if rendered is None:
+            rendered = str(render(text))
+            shared_cache.set(key, rendered)
+            counter = 'misses'
+        else:
+            counter = 'shared_hits'
+
+        with self._lock:
+            self.counters[counter] += 1
+            self._local[key] = rendered
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+        return rendered
+
+    def clear(self) -> None:
+        """Empty the in-process cache, the shared one is left as is."""
+        with self._lock:
+            self._local.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the size of the in-process cache and the hit and miss counters."""
+        with self._lock:
+            return {'local_size': len(self._local), **self.counters}
+
+
+render_cache = RenderCache()
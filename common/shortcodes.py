@@ -17,20 +17,37 @@ pass them though Markdown unscathed.
 NOTE: The reason this is not implemented as a markdown plugin is that
 shortcodes are often applied after markdown has been rendered and stored as HTML.
 """
+import contextvars
 import html as html_module  # I want to be able to use the name 'html' in local scope.
 import logging
 import re
 import typing
 import urllib.parse
 import shortcodes
+from django.db.models import Prefetch
 from django.template.loader import render_to_string
+from sorl.thumbnail.images import ImageFile
 
 from common import queries
+from common.mixins import get_thumbnail_file, prefetch_image_files
 import static_assets.models as models_static_assets
 
 _parser: shortcodes.Parser = None
 _commented_parser: shortcodes.Parser = None
 log = logging.getLogger(__name__)
+_ATTACHMENT_ID_PATTERN = re.compile(r'{\s*attachment\s+[\'"]?(\d+)')
+# Thumbnail widths used by the attachment templates
+_ATTACHMENT_IMAGE_WIDTHS = ('600', '740', '940')
+_ATTACHMENT_VIDEO_WIDTH = '940'
+Attachments = typing.Dict[int, typing.Optional[models_static_assets.StaticAsset]]
+# Static assets of the attachments in the text being rendered, loaded at once by `render`
+_attachments: 'contextvars.ContextVar[typing.Optional[Attachments]]' = contextvars.ContextVar(
+    'attachments', default=None
+)
+# Shortcodes rendered differently depending on who views them, see `group_check`
+_VIEWER_DEPENDENT_PATTERN = re.compile(
+    r'{\s*subscribe_banner\b|{[^}]*\b(?:group|nogroup|cap|nocap)\s*='
+)
 
 
 def shortcode(name: str):
@@ -258,9 +275,12 @@ class Attachment:
         except ValueError:
             return '{attachment Invalid slug %s - should be a static_asset id}' % slug
 
-        try:
-            attachment = models_static_assets.StaticAsset.objects.get(pk=static_asset_id)
-        except models_static_assets.StaticAsset.DoesNotExist:
+        attachments = _attachments.get() or {}
+        if static_asset_id in attachments:
+            attachment = attachments[static_asset_id]
+        else:
+            attachment = models_static_assets.StaticAsset.objects.filter(pk=static_asset_id).first()
+        if attachment is None:
             return html_module.escape('{attachment %r does not exist}' % slug)
 
         return self.render(attachment, pargs, kwargs)
@@ -368,12 +388,72 @@ def _get_parser() -> typing.Tuple[shortcodes.Parser, shortcodes.Parser]:
     return _parser
 
 
+def get_attachments(text: str) -> Attachments:
+    """Load the static assets of all the attachments in the given text, with 4 queries at most.
+
+    Related objects used by the attachment templates are loaded as well, and so are the images
+    and thumbnails they look up in sorl-thumbnail's key-value store.
+    IDs of static assets that don't exist are mapped to None.
+    """
+    static_asset_ids = {int(pk) for pk in _ATTACHMENT_ID_PATTERN.findall(text)}
+    if not static_asset_ids:
+        return {}
+    static_assets = (
+        models_static_assets.StaticAsset.objects.filter(pk__in=static_asset_ids)
+        .select_related('video')
+        .prefetch_related(
+            # Ordered like Video.default_variation orders them, so that it doesn't query again
+            Prefetch(
+                'video__variations',
+                queryset=models_static_assets.VideoVariation.objects.order_by('pk'),
+            ),
+            'video__tracks',
+        )
+    )
+    attachments: Attachments = dict.fromkeys(static_asset_ids)
+    attachments.update((static_asset.pk, static_asset) for static_asset in static_assets)
+    prefetch_image_files(_get_attachment_image_files(attachments.values()))
+    return attachments
+
+
+def _get_attachment_image_files(
+    static_assets: typing.Iterable[typing.Optional[models_static_assets.StaticAsset]],
+) -> typing.Iterator[ImageFile]:
+    """Yield the images and thumbnails that the attachment templates look up in sorl-thumbnail."""
+    for static_asset in static_assets:
+        if static_asset is None:
+            continue
+        if static_asset.source_type == 'image' and static_asset.source:
+            # Sizes of the image and its thumbnails, see file_image.html and image_set.html
+            yield ImageFile(static_asset.source)
+            for width in _ATTACHMENT_IMAGE_WIDTHS:
+                yield get_thumbnail_file(static_asset.source, width)
+        elif static_asset.source_type == 'video' and static_asset.thumbnail:
+            yield get_thumbnail_file(static_asset.thumbnail, _ATTACHMENT_VIDEO_WIDTH)
+
+
+def has_shortcodes(text: str) -> bool:
+    """Check if the given text may contain shortcodes, without parsing it."""
+    return '{' in text
+
+
+def depends_on_viewer(text: str) -> bool:
+    """Check if shortcodes in the given text are rendered differently for different users."""
+    return bool(_VIEWER_DEPENDENT_PATTERN.search(text))
+
+
 def render(text: str, context: typing.Any = None) -> str:
     """Parse and render shortcodes."""
+    if not has_shortcodes(text):
+        return text
     parser = _get_parser()
 
+    # Attachments are loaded at once instead of one by one, when their shortcodes are rendered
+    token = _attachments.set(get_attachments(text))
     try:
         return parser.parse(text, context)
     except shortcodes.ShortcodeError as e:
         log.exception('Error rendering tag: %s', e)
         return text
+    finally:
+        _attachments.reset(token)
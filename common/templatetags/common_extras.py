@@ -15,6 +15,7 @@ from common.markdown import (
 )
 from characters.queries import get_published_characters
 from common.queries import get_latest_trainings_and_production_lessons
+from common.render_cache import render_cache
 from common.shortcodes import render
 from films.models import Film
 from markupsafe import Markup
@@ -61,14 +62,14 @@ def with_shortcodes(context, text: str) -> str:
 @register.filter(name='markdown')
 def markdown(text: str) -> Markup:
     """Render markdown."""
-    return render_markdown(text)
+    return Markup(render_cache.get_or_render('markdown', text, render_markdown))
 
 
 @register.filter(name='unmarkdown')
 def unmarkdown(text: str) -> str:
     """Remove markdown from markdown, leave text."""
     try:
-        return render_markdown_as_text(text)
+        return render_cache.get_or_render('unmarkdown', text, render_markdown_as_text)
     except Exception:
         logger.exception('Failed to render markdown "as text"')
         return text
@@ -77,7 +78,7 @@ def unmarkdown(text: str) -> str:
 @register.filter(name='markdown_unsafe')
 def markdown_unsafe(text: str) -> Markup:
     """Render unsafe markdown with HTML tags."""
-    return render_markdown_unsafe(text)
+    return Markup(render_cache.get_or_render('markdown_unsafe', text, render_markdown_unsafe))
 
 
 @register.filter(name='has_group')
@@ -0,0 +1,53 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test.testcases import TestCase
+
+from blog.models import Like as PostLike
+from common.likes import set_like
+from common.tests.factories.blog import PostFactory
+from common.tests.factories.comments import CommentFactory
+from common.tests.factories.users import UserFactory
+from comments.models import Comment, Like as CommentLike
+
+
+class TestLikeCount(TestCase):
+    def setUp(self) -> None:
+        self.comment = CommentFactory()
+        self.users = [UserFactory() for _ in range(2)]
+
+    def _set_like(self, user, like):
+        return set_like(CommentLike, 'comment', self.comment.pk, user.pk, like)
+
+    def test_set_like_updates_like_count(self):
+        self.assertEqual(self._set_like(self.users[0], True), 1)
+        # Liking twice is counted once
+        self.assertEqual(self._set_like(self.users[0], True), 1)
+        self.assertEqual(self._set_like(self.users[1], True), 2)
+        self.assertEqual(self._set_like(self.users[1], False), 1)
+        # Unliking twice is counted once
+        self.assertEqual(self._set_like(self.users[1], False), 1)
+
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.like_count, 1)
+        self.assertEqual(self.comment.to_dict()['likes'], 1)
+
+    def test_reconcile_like_counts(self):
+        post = PostFactory()
+        PostLike.objects.create(post=post, user=self.users[0])
+        CommentLike.objects.create(comment=self.comment, user=self.users[0])
+        Comment.objects.filter(pk=self.comment.pk).update(like_count=5)
+        other_comment = CommentFactory()
+
+        call_command('reconcile_like_counts', '--dry-run', stdout=StringIO())
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.like_count, 5)
+
+        call_command('reconcile_like_counts', stdout=StringIO())
+
+        self.comment.refresh_from_db()
+        other_comment.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(self.comment.like_count, 1)
+        self.assertEqual(other_comment.like_count, 0)
+        self.assertEqual(post.like_count, 1)
@@ -0,0 +1,59 @@
+from unittest.mock import Mock, patch
+
+from django.template import engines
+from django.test import TestCase
+
+from common.render_cache import RenderCache
+
+template_engine = engines['django']
+
+
+class RenderCacheTest(TestCase):
+    def setUp(self):
+        self.render_cache = RenderCache(local_size=2)
+        self.render = Mock(side_effect=lambda text: f'<p>{text}</p>')
+
+    def test_text_is_rendered_once(self):
+        for _ in range(2):
+            self.assertEqual(
+                self.render_cache.get_or_render('test', 'text', self.render), '<p>text</p>'
+            )
+        # Other processes only have the shared tier
+        self.render_cache.clear()
+        self.assertEqual(
+            self.render_cache.get_or_render('test', 'text', self.render), '<p>text</p>'
+        )
+
+        self.render.assert_called_once_with('text')
+        self.assertEqual(
+            self.render_cache.get_stats(),
+            {'local_size': 1, 'local_hits': 1, 'shared_hits': 1, 'misses': 1},
+        )
+
+    def test_kinds_of_rendering_are_cached_separately(self):
+        self.render_cache.get_or_render('test', 'text', self.render)
+        self.render_cache.get_or_render('other_test', 'text', self.render)
+
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_least_recently_used_text_is_evicted_from_local_tier(self):
+        for text in ('a', 'b', 'a', 'c', 'b'):
+            self.render_cache.get_or_render('test', text, self.render)
+
+        self.assertEqual(
+            self.render_cache.get_stats(),
+            {'local_size': 2, 'local_hits': 1, 'shared_hits': 1, 'misses': 3},
+        )
+
+    def test_markdown_filter_is_cached(self):
+        template = template_engine.from_string('{{ text|markdown }}')
+
+        with patch(
+            'common.templatetags.common_extras.render_markdown', return_value='<p>cached</p>'
+        ) as render_markdown:
+            for _ in range(2):
+                self.assertEqual(
+                    template.render({'text': 'Rendered once per process'}), '<p>cached</p>'
+                )
+
+        render_markdown.assert_called_once_with('Rendered once per process')
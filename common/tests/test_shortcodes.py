@@ -1,11 +1,21 @@
+from typing import Tuple
 import unittest
 
 from django.contrib.auth.models import Group, AnonymousUser
+from django.db import connection
 from django.test import TestCase
 from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile, serialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
 
+from common.mixins import get_thumbnail_file
 from common.shortcodes import render
+from common.tests.factories.static_assets import StaticAssetFactory
 from common.tests.factories.users import UserFactory
+from static_assets.models import StaticAsset
 
 
 class TestCaseWithRequest(TestCase):
@@ -214,3 +224,54 @@ class IFrameTest(TestCaseWithRequest):
         self.request.user = user
         context = {'request': self.request}
         self.assertEqual(expect, render(md, context=context))
+
+
+class AttachmentTest(TestCase):
+    def _create_attachment(self, source_type: str, original_filename: str) -> StaticAsset:
+        static_asset = StaticAssetFactory(source_type=source_type)
+        # Saving derives both from the name of the uploaded file
+        StaticAsset.objects.filter(pk=static_asset.pk).update(
+            source_type=source_type, original_filename=original_filename
+        )
+        static_asset.refresh_from_db()
+        # Record the image and its thumbnails as generated, as viewing it before would
+        image_files = [ImageFile(static_asset.source)]
+        for width in ('600', '740', '940'):
+            image_files.append(get_thumbnail_file(static_asset.source, width))
+            image_files.append(get_thumbnail_file(static_asset.thumbnail, width))
+        for image_file in image_files:
+            image_file.set_size((1920, 1080))
+            KVStore.objects.get_or_create(
+                key=add_prefix(image_file.key, 'image'),
+                defaults={'value': serialize_image_file(image_file)},
+            )
+        return static_asset
+
+    def _render_attachments(self, number_of_attachments: int) -> Tuple[str, int]:
+        static_assets = [
+            self._create_attachment(source_type, f'{source_type}-{i}.{extension}')
+            for i in range(number_of_attachments)
+            for source_type, extension in (('file', 'zip'), ('image', 'png'), ('video', 'mp4'))
+        ]
+        text = ' '.join(f'{{attachment {static_asset.pk}}}' for static_asset in static_assets)
+        default.kvstore.cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            html = render(text)
+        return html, len(context.captured_queries)
+
+    def test_number_of_queries_does_not_depend_on_number_of_attachments(self):
+        html, small_queries = self._render_attachments(1)
+        for name in ('file-0.zip', 'image-0.png', '<video'):
+            self.assertIn(name, html)
+
+        html, large_queries = self._render_attachments(5)
+        self.assertEqual(html.count('file-'), 5)
+        self.assertEqual(html.count('<img'), 5)
+        self.assertEqual(html.count('<video'), 5)
+        self.assertEqual(small_queries, large_queries)
+
+    def test_missing_attachment(self):
+        with self.assertNumQueries(1):
+            html = render('{attachment 0}')
+
+        self.assertEqual('{attachment &#x27;0&#x27; does not exist}', html)
@@ -2,7 +2,11 @@ from django.test.testcases import TestCase
 from pathlib import PosixPath
 from unittest.mock import patch
 
-from common.upload_paths import generate_hash_from_filename, get_upload_to_hashed_path
+from common.upload_paths import (
+    generate_hash_from_filename,
+    get_source_hash,
+    get_upload_to_hashed_path,
+)
 
 
 class TestUploadPaths(TestCase):
@@ -39,3 +43,11 @@ class TestUploadPaths(TestCase):
         self.assertFalse(
             str(get_upload_to_hashed_path(None, 'barbar-123.mov')).startswith('ad'),
         )
+
+    def test_get_source_hash(self):
+        source_hash = '60aaaae7629fdb4d40621e677c029cc0'
+        self.assertEqual(get_source_hash(f'60/{source_hash}/{source_hash}.mov'), source_hash)
+        self.assertEqual(get_source_hash(f'60/{source_hash}/{source_hash}-1080p.mp4'), source_hash)
+        self.assertEqual(get_source_hash('legacy/file.mov'), '')
+        self.assertEqual(get_source_hash(f'61/{source_hash}/{source_hash}.mov'), '')
+        self.assertEqual(get_source_hash(''), '')
@@ -1,5 +1,5 @@
 """Implements utilities related to media uploads."""
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 from time import time
 import hashlib
 import logging
@@ -56,6 +56,19 @@ def get_upload_to_hashed_path(_: ModelWithFile, filename: str) -> Path:
     return path
 
 
+def get_source_hash(name: str) -> str:
+    """Return the hash in a path generated by `get_upload_to_hashed_path`, or an empty string.
+
+    E.g. "bd2b5b1cd81333ed2d8db03971f91200" for
+    "bd/bd2b5b1cd81333ed2d8db03971f91200/bd2b5b1cd81333ed2d8db03971f91200.mp4" and its
+    video variations, such as "bd/bd2b5b1cd81333ed2d8db03971f91200/bd2b5b1c...-1080p.mp4".
+    """
+    parts = PurePosixPath(name or '').parts
+    if len(parts) != 3 or not parts[1].startswith(parts[0]) or len(parts[0]) != 2:
+        return ''
+    return parts[1]
+
+
 def shortuid() -> str:
     """Generate a 14-characters long string ID based on time."""
     return hex(int(time() * 10000000))[2:]
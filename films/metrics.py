@@ -0,0 +1,12 @@
+"""Metrics of films sampled by `write_stats`, see `stats.metrics`."""
+from films.models import Asset
+from stats.metrics import Metric, register
+
+# Assets don't record when they were published: they are counted from scratch
+register(
+    Metric(
+        'film_assets_count',
+        'Film Assets',
+        count=lambda: Asset.objects.filter(is_published=True).count(),
+    )
+)
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.9 on 2026-10-18 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('films', '0012_alter_film_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE films_asset SET like_count = likes.count
+            FROM (
+                SELECT asset_id, COUNT(*) AS count FROM films_like GROUP BY asset_id
+            ) AS likes
+            WHERE films_asset.id = likes.asset_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -49,6 +49,8 @@ class Asset(mixins.CreatedUpdatedMixin, models.Model):
     description = models.TextField(blank=True, help_text=common.help_texts.markdown_with_html)
     category = models.CharField(choices=AssetCategory.choices, max_length=17, db_index=True)
     view_count = models.PositiveIntegerField(default=0, editable=False)
+    # Number of likes, kept up to date by `common.likes.set_like`
+    like_count = models.PositiveIntegerField(default=0, editable=False)
     is_published = models.BooleanField(default=False)
     is_featured = models.BooleanField(default=False)
     is_free = models.BooleanField(default=False)
@@ -61,6 +63,8 @@ class Asset(mixins.CreatedUpdatedMixin, models.Model):
     )
 
     comments = models.ManyToManyField(Comment, through='AssetComment', related_name='asset')
+    # Lookups that keep only the objects visible to everyone but staff
+    published_filters = {'is_published': True}
     tags = TaggableManager(blank=True)
 
     def clean(self) -> None:
@@ -116,6 +120,10 @@ class Asset(mixins.CreatedUpdatedMixin, models.Model):
     def comment_url(self) -> str:
         return reverse('api-asset-comment', kwargs={'asset_pk': self.pk})
 
+    @property
+    def comments_url(self) -> str:
+        return reverse('api-asset-comments', kwargs={'asset_pk': self.pk})
+
     @property
     def admin_url(self) -> str:
         return reverse('admin:films_asset_change', args=[self.pk])
@@ -9,9 +9,8 @@ from django.db.models.query import Prefetch, QuerySet
 from django.http.request import HttpRequest
 
 from comments import typed_templates
-from comments.models import Comment
-from comments.queries import get_annotated_comments
-from comments.views.common import comments_to_template_type
+from comments.views.common import comments_page_to_template_type
+from common.likes import set_like
 from films.models import Asset, Collection, Film, ProductionLogEntryAsset, Like, ProductionLog
 import common.queries
 
@@ -161,14 +160,12 @@ def get_asset_context(
     else:
         previous_asset = next_asset = None
 
-    comments: List[Comment] = get_annotated_comments(asset, request.user.pk)
-
     context = {
         'asset': asset,
         'previous_asset': previous_asset,
         'next_asset': next_asset,
         'site_context': site_context,
-        'comments': comments_to_template_type(comments, asset.comment_url, request.user),
+        'comments': comments_page_to_template_type(asset, request.user),
         'user_can_edit_asset': (
             request.user.is_staff and request.user.has_perm('films.change_asset')
         ),
@@ -368,12 +365,7 @@ def get_current_asset(request: HttpRequest) -> Dict[str, Asset]:
 
 def set_asset_like(*, asset_pk: int, user_pk: int, like: bool) -> int:
     """Like or unlike an asset."""
-    if like:
-        Like.objects.update_or_create(asset_id=asset_pk, user_id=user_pk)
-    else:
-        Like.objects.filter(asset_id=asset_pk, user_id=user_pk).delete()
-
-    return Like.objects.filter(asset_id=asset_pk).count()
+    return set_like(Like, 'asset', asset_pk, user_pk, like)
 
 
 def should_show_landing_page(request: HttpRequest, film: Film) -> bool:
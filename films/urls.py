@@ -2,7 +2,7 @@ from django.urls import path, include
 
 from films.views import film, gallery, production_log
 from films.views.api.asset import asset as api_asset, asset_zoom, asset_like
-from films.views.api.comment import comment
+from films.views.api.comment import comment, comments
 
 urlpatterns = [
     path(
@@ -12,6 +12,7 @@ urlpatterns = [
                 path('', api_asset, name='api-asset'),
                 path('zoom/', asset_zoom, name='api-asset-zoom'),
                 path('comment/', comment, name='api-asset-comment'),
+                path('comments/', comments, name='api-asset-comments'),
                 path('like/', asset_like, name='api-asset-like'),
             ]
         ),
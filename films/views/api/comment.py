@@ -1,12 +1,16 @@
 """Comment API used in content gallery."""
 from django.contrib.auth.decorators import login_required
 from django.http.request import HttpRequest
-from django.http.response import JsonResponse
-from django.views.decorators.http import require_POST
+from django.http.response import HttpResponse, JsonResponse
+from django.views.decorators.http import require_POST, require_safe
 
-from comments.views.common import comment_response
+from comments.views.common import (
+    comment_response,
+    comments_page_response,
+    get_commented_object_or_404,
+)
 from common.decorators import subscription_required
-from films.models import AssetComment
+from films.models import Asset, AssetComment
 
 
 @require_POST
@@ -15,3 +19,10 @@ from films.models import AssetComment
 def comment(request: HttpRequest, *, asset_pk: int) -> JsonResponse:
     """Add a top-level comment or a reply to another comment under an asset in content gallery."""
     return comment_response(request, AssetComment, 'asset_id', asset_pk)
+
+
+@require_safe
+def comments(request: HttpRequest, *, asset_pk: int) -> HttpResponse:
+    """Return a page of top-level comments under an asset in content gallery."""
+    asset = get_commented_object_or_404(Asset, request.user, asset_pk)
+    return comments_page_response(request, asset)
@@ -1,4 +1,4 @@
-from typing import Tuple, Optional, Dict, List
+from typing import Any, Tuple, Optional, Dict, List
 import logging
 import time
 
@@ -18,6 +18,19 @@ TRAINING_INDEX_UIDS: List[str] = list(
 ALL_INDEX_UIDS = [*MAIN_INDEX_UIDS, *TRAINING_INDEX_UIDS]
 
 
+def get_index_settings(index_uid: str) -> Dict[str, Any]:
+    """Return the MeiliSearch settings of the index with the given UID from the settings."""
+    search_settings = (
+        settings.TRAINING_SEARCH if index_uid in TRAINING_INDEX_UIDS else settings.MAIN_SEARCH
+    )
+    return {
+        'rankingRules': search_settings['RANKING_RULES'][index_uid],
+        'searchableAttributes': search_settings['SEARCHABLE_ATTRIBUTES'],
+        'filterableAttributes': search_settings['FACETING_ATTRIBUTES'],
+        'sortableAttributes': search_settings['SORTABLE_ATTRIBUTES'],
+    }
+
+
 def _wait_for_task(
     task: Dict[str, str], timeout: int = DEFAULT_TASK_TIMEOUT
 ) -> Tuple[Optional[str], Optional[str]]:
@@ -0,0 +1,98 @@
+"""Resolve index UIDs from the settings to the MeiliSearch indexes serving them.
+
+See `search.models.IndexAlias` and `index_documents --rebuild`.
+"""
+from typing import Dict, Iterable, List
+import datetime
+
+from django.db import transaction
+
+from search.models import IndexAlias
+
+
+def _get_aliases(aliases: Iterable[str]) -> Dict[str, IndexAlias]:
+    return {a.alias: a for a in IndexAlias.objects.filter(alias__in=list(aliases))}
+
+
+def get_index_uid(alias: str) -> str:
+    """Return the UID of the index to read from."""
+    return get_index_uids([alias])[0]
+
+
+def get_index_uids(aliases: List[str]) -> List[str]:
+    """Return the UIDs of the indexes to read from, in the same order as the given aliases."""
+    found = _get_aliases(aliases)
+    return [found[alias].index_uid if alias in found else alias for alias in aliases]
+
+
+def get_write_index_uids(aliases: List[str]) -> List[str]:
+    """Return the UIDs of the indexes to write to, including the ones being rebuilt."""
+    found = _get_aliases(aliases)
+    index_uids = []
+    for alias in aliases:
+        if alias not in found:
+            index_uids.append(alias)
+            continue
+        index_uids.append(found[alias].index_uid)
+        if found[alias].shadow_index_uid:
+            index_uids.append(found[alias].shadow_index_uid)
+    return index_uids
+
+
+def get_new_index_uid(alias: str) -> str:
+    """Return a UID for a new index to be served under the given alias."""
+    return f'{alias}__{datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S")}'
+
+
+@transaction.atomic
+def start_rebuild(shadow_index_uids: Dict[str, str]) -> None:
+    """Start writing to the given new indexes, as well as to the current ones.
+
+    The new indexes must already exist: otherwise MeiliSearch would create them on the first
+    write, with none of the expected settings.
+    """
+    for alias, shadow_index_uid in shadow_index_uids.items():
+        index_alias, _ = IndexAlias.objects.select_for_update().get_or_create(
+            alias=alias, defaults={'index_uid': alias}
+        )
+        if index_alias.shadow_index_uid:
+            raise ValueError(
+                f'Index {alias} is already being rebuilt into {index_alias.shadow_index_uid}'
+            )
+        index_alias.shadow_index_uid = shadow_index_uid
+        index_alias.save(update_fields=['shadow_index_uid', 'date_updated'])
+
+
+@transaction.atomic
+def finish_rebuild(aliases: List[str]) -> List[str]:
+    """Point all the given aliases to their rebuilt indexes at once.
+
+    Returns:
+        The UIDs of the indexes that are no longer used.
+    """
+    old_index_uids = []
+    for index_alias in IndexAlias.objects.select_for_update().filter(alias__in=aliases):
+        if not index_alias.shadow_index_uid:
+            continue
+        old_index_uids.append(index_alias.index_uid)
+        index_alias.index_uid = index_alias.shadow_index_uid
+        index_alias.shadow_index_uid = ''
+        index_alias.save(update_fields=['index_uid', 'shadow_index_uid', 'date_updated'])
+    return old_index_uids
+
+
+@transaction.atomic
+def abort_rebuild(aliases: List[str]) -> List[str]:
+    """Stop writing to the indexes being rebuilt.
+
+    Returns:
+        The UIDs of the abandoned indexes.
+    """
+    shadow_index_uids = []
+    for index_alias in IndexAlias.objects.select_for_update().filter(alias__in=aliases):
+        if not index_alias.shadow_index_uid:
+            continue
+        shadow_index_uids.append(index_alias.shadow_index_uid)
+        index_alias.shadow_index_uid = ''
+        index_alias.save(update_fields=['shadow_index_uid', 'date_updated'])
+    return shadow_index_uids
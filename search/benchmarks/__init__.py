@@ -0,0 +1 @@
+"""Search indexing benchmarks, see the `benchmark_search_indexing` command."""
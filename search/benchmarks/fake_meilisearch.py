@@ -0,0 +1,172 @@
+"""A minimal in-memory stand-in for the MeiliSearch HTTP API, for benchmarks.
+
+Only the endpoints used by Studio's indexing code are implemented. Every task succeeds
+immediately, so that the benchmarks measure Studio's side of indexing, not MeiliSearch's.
+Requests are counted per endpoint.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Counter, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+import collections
+import json
+import re
+import threading
+
+TIMESTAMP = '2022-01-01T00:00:00.000000Z'
+
+
+class _Index:
+    def __init__(self, uid: str, primary_key: Optional[str]):
+        self.uid = uid
+        self.primary_key = primary_key
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.settings: Dict[str, Any] = {}
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'uid': self.uid,
+            'primaryKey': self.primary_key,
+            'createdAt': TIMESTAMP,
+            'updatedAt': TIMESTAMP,
+        }
+
+
+class FakeMeiliSearch:
+    """Serves a fake MeiliSearch API from a background thread.
+
+    Usage:
+        with FakeMeiliSearch() as server:
+            client = meilisearch.Client(server.url)
+    """
+
+    def __init__(self) -> None:
+        """Bind to a free local port, without serving requests yet."""
+        self.indexes: Dict[str, _Index] = {}
+        self.tasks: Dict[int, Dict[str, Any]] = {}
+        self.requests: Counter[str] = collections.Counter()
+        self.documents_received = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _make_handler(self))
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """The base URL of the API, to be given to `meilisearch.Client`."""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self) -> 'FakeMeiliSearch':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counters(self) -> None:
+        """Forget about the requests handled so far, keeping the indexes."""
+        with self._lock:
+            self.requests.clear()
+            self.documents_received = 0
+
+    def _task(self, index_uid: Optional[str], task_type: str) -> Dict[str, Any]:
+        task = {
+            'uid': len(self.tasks),
+            'indexUid': index_uid,
+            'status': 'succeeded',
+            'type': task_type,
+            'enqueuedAt': TIMESTAMP,
+            'finishedAt': TIMESTAMP,
+        }
+        self.tasks[task['uid']] = task
+        return {**task, 'status': 'enqueued'}
+
+    def handle(
+        self, method: str, path: str, query: Dict[str, List[str]], body: Any
+    ) -> Tuple[int, Any]:
+        """Return the status code and the JSON response to a request."""
+        parts = path.strip('/').split('/')
+        # Count requests per endpoint, e.g. "POST indexes/*/documents"
+        route = re.sub(r'^(indexes|tasks)/[^/]+', r'\1/*', '/'.join(parts))
+        self.requests[f'{method} {route}'] += 1
+
+        if parts == ['health']:
+            return 200, {'status': 'available'}
+        if parts[0] == 'tasks' and len(parts) == 2:
+            return 200, self.tasks[int(parts[1])]
+        if parts == ['indexes']:
+            if method == 'GET':
+                return 200, [index.as_dict() for index in self.indexes.values()]
+            if body['uid'] in self.indexes:
+                task = self._task(body['uid'], 'indexCreation')
+                self.tasks[task['uid']].update(
+                    status='failed', error={'code': 'index_already_exists'}
+                )
+                return 202, task
+            self.indexes[body['uid']] = _Index(body['uid'], body.get('primaryKey'))
+            return 202, self._task(body['uid'], 'indexCreation')
+
+        index_uid = parts[1]
+        index = self.indexes.get(index_uid)
+        if index is None:
+            if method == 'POST' and parts[2:] == ['documents']:
+                # Like MeiliSearch, create the index on the first write
+                index = self.indexes[index_uid] = _Index(index_uid, None)
+            else:
+                return 404, {'message': f'Index {index_uid} not found', 'code': 'index_not_found'}
+        rest = parts[2:]
+        if not rest:
+            if method == 'DELETE':
+                del self.indexes[index_uid]
+                return 202, self._task(index_uid, 'indexDeletion')
+            return 200, index.as_dict()
+        if rest == ['stats']:
+            return 200, {'numberOfDocuments': len(index.documents), 'isIndexing': False}
+        if rest == ['documents']:
+            if method == 'GET':
+                offset = int(query.get('offset', ['0'])[0])
+                limit = int(query.get('limit', ['20'])[0])
+                return 200, list(index.documents.values())[offset : offset + limit]
+            primary_key = index.primary_key or 'id'
+            for document in body:
+                index.documents[str(document[primary_key])] = document
+            self.documents_received += len(body)
+            return 202, self._task(index_uid, 'documentAddition')
+        if rest == ['documents', 'delete-batch']:
+            for document_id in body:
+                index.documents.pop(str(document_id), None)
+            return 202, self._task(index_uid, 'documentDeletion')
+        if rest[0] == 'settings':
+            if method == 'GET':
+                return 200, index.settings
+            index.settings[rest[1] if len(rest) > 1 else 'all'] = body
+            return 202, self._task(index_uid, 'settingsUpdate')
+        if rest == ['search']:
+            hits = list(index.documents.values())[: body.get('limit', 20)]
+            return 200, {'hits': hits, 'query': body.get('q', ''), 'nbHits': len(hits)}
+        return 404, {'message': f'Unknown route {path}', 'code': 'not_found'}
+
+
+def _make_handler(fake: FakeMeiliSearch) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep connections alive, like MeiliSearch
+
+        def _respond(self) -> None:
+            url = urlparse(self.path)
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or 'null') if length else None
+            with fake._lock:
+                status, response = fake.handle(self.command, url.path, parse_qs(url.query), body)
+            content = json.dumps(response).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = _respond
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
@@ -0,0 +1,293 @@
+"""A shared, failure-aware wrapper around the MeiliSearch client.
+
+Indexing code talks to MeiliSearch through `search_client` instead of `settings.SEARCH_CLIENT`
+directly, so that an outage costs one timeout instead of one per call:
+ - a successful health check is remembered for `HEALTH_TTL` seconds;
+ - the set of existing indexes is remembered for `INDEXES_TTL` seconds, so that index
+   handles can be created without fetching the index first;
+ - after `FAILURE_THRESHOLD` consecutive failed calls the circuit breaker trips, and calls
+   fail immediately with `CircuitOpenError` until a single probe call is let through after
+   a backoff, which doubles with each failed probe, up to `MAX_BACKOFF` seconds.
+
+Tripped and blocked calls are counted in `search_client.counters`.
+
+Writes to several indexes, e.g. to the replicas of the main index, are sent concurrently with
+`fan_out`, over a pool of keep-alive connections, and their tasks are awaited together with
+`wait_for_tasks`, so that they take as long as the slowest index, not the sum of all of them.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Counter, Dict, Iterable, List, Optional, Set, Tuple, TypeVar
+import collections
+import logging
+import threading
+import time
+
+from django.conf import settings
+from meilisearch._httprequests import HttpRequests
+from meilisearch.config import Config
+from meilisearch.errors import MeiliSearchCommunicationError, MeiliSearchTimeoutError
+import meilisearch
+import requests
+import requests.adapters
+
+from search import ALL_INDEX_UIDS, DEFAULT_TASK_TIMEOUT
+from search.aliases import get_write_index_uids
+from search.health_check import MeiliSearchServiceError
+
+log = logging.getLogger(__name__)
+FAILURE_THRESHOLD = 3
+HEALTH_TTL = 10  # seconds
+INDEXES_TTL = 300  # seconds
+MIN_BACKOFF = 1  # seconds
+MAX_BACKOFF = 300  # seconds
+# Enough to write to all the indexes at once, including the ones being rebuilt
+FAN_OUT_WORKERS = 2 * len(ALL_INDEX_UIDS)
+T = TypeVar('T')
+K = TypeVar('K')
+
+
+class CircuitOpenError(MeiliSearchServiceError):
+    """Raised instead of calling MeiliSearch while the circuit breaker is open."""
+
+
+def _is_outage(err: Exception) -> bool:
+    """Tell apart errors meaning that MeiliSearch is unreachable or broken from bad requests."""
+    if isinstance(err, (MeiliSearchCommunicationError, MeiliSearchTimeoutError)):
+        return True
+    if isinstance(err, meilisearch.errors.MeiliSearchApiError):
+        return getattr(err, 'status_code', 500) >= 500
+    return False
+
+
+class _PooledHttpRequests(HttpRequests):
+    """Sends the MeiliSearch client's requests through a shared `requests.Session`.
+
+    Otherwise the client uses `requests.get`, `requests.post` etc., which open a new
+    connection for every request.
+    """
+
+    def __init__(self, config: Config, session: requests.Session):
+        super().__init__(config)
+        self.session = session
+
+    def send_request(self, http_method: Callable, path: str, *args: Any, **kwargs: Any) -> Any:
+        method = getattr(self.session, http_method.__name__)
+        return super().send_request(method, path, *args, **kwargs)
+
+
+class SearchClient:
+    """Wraps `settings.SEARCH_CLIENT` with a circuit breaker and cached health state."""
+
+    def __init__(
+        self,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        health_ttl: float = HEALTH_TTL,
+        indexes_ttl: float = INDEXES_TTL,
+        min_backoff: float = MIN_BACKOFF,
+        max_backoff: float = MAX_BACKOFF,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Configure the circuit breaker, a clock can be given for testing."""
+        self.failure_threshold = failure_threshold
+        self.health_ttl = health_ttl
+        self.indexes_ttl = indexes_ttl
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.counters: Counter[str] = collections.Counter()
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.reset()
+
+    def reset(self) -> None:
+        """Close the circuit and forget all the cached state."""
+        with self._lock:
+            self._consecutive_failures = 0
+            self._is_open = False
+            self._is_probing = False
+            self._backoff = 0.0
+            self._retry_at = 0.0
+            self._healthy_until = 0.0
+            self._indexes_until = 0.0
+            self._existing_index_uids: Set[str] = set()
+
+    @property
+    def client(self) -> meilisearch.Client:
+        """The wrapped client, looked up on each use so that it can be patched in tests."""
+        return settings.SEARCH_CLIENT
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are currently blocked."""
+        return self._is_open
+
+    @property
+    def session(self) -> requests.Session:
+        """A session keeping connections to MeiliSearch alive, shared by all the threads."""
+        if self._session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=FAN_OUT_WORKERS)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session = session
+        return self._session
+
+    def _before_call(self) -> None:
+        with self._lock:
+            if not self._is_open:
+                return
+            if self._is_probing or self.clock() < self._retry_at:
+                self.counters['blocked'] += 1
+                raise CircuitOpenError(
+                    f'Not calling MeiliSearch at {settings.MEILISEARCH_API_ADDRESS}: '
+                    f'too many failures, retrying in {max(self._retry_at - self.clock(), 0):.0f}s'
+                )
+            # Half-open: let this single call through to probe the server
+            self._is_probing = True
+            self.counters['probes'] += 1
+
+    def _on_success(self) -> None:
+        with self._lock:
+            if self._is_open:
+                log.warning('MeiliSearch is reachable again, closing the circuit breaker')
+            self._consecutive_failures = 0
+            self._is_open = False
+            self._is_probing = False
+            self._backoff = 0.0
+
+    def _on_failure(self) -> None:
+        with self._lock:
+            self.counters['failures'] += 1
+            self._consecutive_failures += 1
+            self._healthy_until = 0.0
+            if self._is_probing:
+                self._backoff = min(self._backoff * 2, self.max_backoff)
+            elif not self._is_open and self._consecutive_failures >= self.failure_threshold:
+                self._backoff = self.min_backoff
+                self.counters['tripped'] += 1
+            else:
+                return
+            self._is_open = True
+            self._is_probing = False
+            self._retry_at = self.clock() + self._backoff
+            log.error(
+                'MeiliSearch calls failed %s times in a row, blocking them for %ss',
+                self._consecutive_failures,
+                self._backoff,
+            )
+
+    def call(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Call a MeiliSearch client method, unless the circuit breaker is open.
+
+        Raises:
+            CircuitOpenError if the call was not made because of previous failures.
+        """
+        self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as err:
+            if _is_outage(err):
+                self._on_failure()
+            else:
+                self._on_success()
+            raise
+        self._on_success()
+        return result
+
+    def get_missing_indexes(self) -> List[str]:
+        """Return the expected indexes that don't exist, using the cached list if fresh."""
+        if self.clock() >= self._indexes_until:
+            indexes = self.call(self.client.get_indexes)
+            self._existing_index_uids = {index.uid for index in indexes}
+            self._indexes_until = self.clock() + self.indexes_ttl
+        index_uids = get_write_index_uids(ALL_INDEX_UIDS)
+        return [uid for uid in index_uids if uid not in self._existing_index_uids]
+
+    def is_available(self) -> bool:
+        """Check that MeiliSearch is running and has all the indexes, at most every HEALTH_TTL."""
+        if self.clock() < self._healthy_until:
+            return True
+        try:
+            self.call(self.client.health)
+            missing_uids = self.get_missing_indexes()
+        except Exception as err:
+            if not isinstance(err, MeiliSearchServiceError) and not _is_outage(err):
+                raise
+            log.error(f'Search service unavailable: {err}')
+            return False
+        if missing_uids:
+            log.error(f'Search service unavailable, indexes do not exist: {missing_uids}')
+            self._indexes_until = 0.0
+            return False
+        self._healthy_until = self.clock() + self.health_ttl
+        return True
+
+    def index(self, index_uid: str) -> meilisearch.index.Index:
+        """Return an index handle without fetching the index from MeiliSearch."""
+        index = self.client.index(index_uid)
+        index.http = _PooledHttpRequests(index.config, self.session)
+        return index
+
+    def get_task(self, task_uid: int) -> Dict[str, Any]:
+        """Fetch a task, like `Client.get_task` but reusing a pooled connection."""
+        config = self.client.config
+        http = _PooledHttpRequests(config, self.session)
+        task: Dict[str, Any] = http.get(f'{config.paths.task}/{task_uid}')
+        return task
+
+    def fan_out(self, calls: Dict[K, Callable[[], T]]) -> Dict[K, T]:
+        """Make the given calls concurrently, e.g. one for each replica of an index.
+
+        Raises:
+            The first error, once all the calls are finished.
+        """
+        if len(calls) <= 1:
+            return {key: self.call(func) for key, func in calls.items()}
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=FAN_OUT_WORKERS, thread_name_prefix='search-fan-out'
+            )
+        futures = {key: self._executor.submit(self.call, func) for key, func in calls.items()}
+        errors = [future.exception() for future in futures.values()]
+        for error in errors:
+            if error is not None:
+                raise error
+        return {key: future.result() for key, future in futures.items()}
+
+    def wait_for_tasks(
+        self, tasks: Iterable[Dict[str, Any]], timeout: float = DEFAULT_TASK_TIMEOUT
+    ) -> Dict[int, Tuple[str, str]]:
+        """Wait for several tasks at once.
+
+        MeiliSearch processes tasks one at a time, in the order of their UIDs, so only the
+        newest unfinished task is polled: once it is finished, all the older ones usually
+        are too, and they are fetched once each, concurrently.
+
+        Returns:
+            Status and error code of each task by its UID, both empty if it timed out.
+        """
+        pending = sorted({task['uid'] for task in tasks}, reverse=True)
+        results: Dict[int, Tuple[str, str]] = {}
+        deadline = self.clock() + timeout
+        attempts = 0
+        while pending:
+            newest = self.call(self.get_task, pending[0])
+            if newest['status'] not in {'succeeded', 'failed'}:
+                if self.clock() >= deadline:
+                    log.error('Tasks %s took too long to finish, giving up', pending)
+                    results.update({uid: ('', '') for uid in pending})
+                    break
+                time.sleep(0.05 + attempts * 0.1)
+                attempts += 1
+                continue
+            fetched = self.fan_out({uid: partial(self.get_task, uid) for uid in pending[1:]})
+            for task in [newest, *fetched.values()]:
+                if task['status'] in {'succeeded', 'failed'}:
+                    results[task['uid']] = (task['status'], task.get('error', {}).get('code', ''))
+            pending = [uid for uid in pending if uid not in results]
+        return results
+
+
+search_client = SearchClient()
@@ -0,0 +1,66 @@
+"""Content fingerprints of indexed documents.
+
+Many saves produce a search document identical to the one already indexed. Each document
+sent to an index is hashed, and the hash is stored per (index, search_id), so that sending
+an unchanged document again can be skipped entirely.
+"""
+from typing import Any, Dict, Iterable, List, Tuple
+import hashlib
+import json
+
+from django.db import transaction
+
+from search.models import DocumentFingerprint
+
+
+def get_fingerprint(document: Dict[str, Any], exclude_fields: Iterable[str] = ()) -> str:
+    """Return a hash of the given serialized document, ignoring the excluded fields."""
+    exclude_fields = set(exclude_fields)
+    content = {key: value for key, value in document.items() if key not in exclude_fields}
+    return hashlib.sha1(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def get_changed_documents(
+    index_uid: str, documents: List[Dict[str, Any]], exclude_fields: Iterable[str] = ()
+) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """Leave only the documents that differ from the ones last sent to the given index.
+
+    Returns:
+        A list of changed documents, and a dict of their new fingerprints by search ID,
+        to be stored with `save_fingerprints` once the documents have been sent.
+    """
+    fingerprints = {
+        document['search_id']: get_fingerprint(document, exclude_fields) for document in documents
+    }
+    stored = dict(
+        DocumentFingerprint.objects.filter(
+            index_uid=index_uid, search_id__in=fingerprints.keys()
+        ).values_list('search_id', 'fingerprint')
+    )
+    changed_fingerprints = {
+        search_id: fingerprint
+        for search_id, fingerprint in fingerprints.items()
+        if stored.get(search_id) != fingerprint
+    }
+    changed = [document for document in documents if document['search_id'] in changed_fingerprints]
+    return changed, changed_fingerprints
+
+
+@transaction.atomic
+def save_fingerprints(index_uid: str, fingerprints: Dict[str, str]) -> None:
+    """Store fingerprints of documents sent to the given index."""
+    if not fingerprints:
+        return
+    delete_fingerprints(index_uid, fingerprints.keys())
+    DocumentFingerprint.objects.bulk_create(
+        [
+            DocumentFingerprint(index_uid=index_uid, search_id=search_id, fingerprint=fingerprint)
+            for search_id, fingerprint in fingerprints.items()
+        ],
+        batch_size=1000,
+    )
+
+
+def delete_fingerprints(index_uid: str, search_ids: Iterable[str]) -> None:
+    """Forget fingerprints of documents removed from the given index."""
+    DocumentFingerprint.objects.filter(index_uid=index_uid, search_id__in=list(search_ids)).delete()
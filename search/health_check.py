@@ -4,6 +4,7 @@ import meilisearch
 from django.conf import settings
 
 from search import ALL_INDEX_UIDS
+from search.aliases import get_write_index_uids
 
 
 class MeiliSearchServiceError(Exception):
@@ -28,7 +29,7 @@ def check_meilisearch(check_indexes: Optional[bool] = False) -> None:
         )
     if check_indexes:
         index_uids = [i.uid for i in indexes]
-        missing_uids = [i for i in ALL_INDEX_UIDS if i not in index_uids]
+        missing_uids = [i for i in get_write_index_uids(ALL_INDEX_UIDS) if i not in index_uids]
         if missing_uids:
             raise MeiliSearchServiceError(
                 f'Some of the expected indexes do not exist: {missing_uids}. Run the '
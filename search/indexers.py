@@ -0,0 +1,146 @@
+"""Write documents to the search indexes in batches."""
+from abc import ABC
+from functools import partial
+from typing import Any, Dict, Iterable, List, Set, Tuple, Type
+import logging
+
+from django.conf import settings
+
+from common.types import assert_cast
+from search import MAIN_INDEX_UIDS, TRAINING_INDEX_UIDS
+from search.aliases import get_write_index_uids
+from search.client import search_client
+from search.fingerprints import get_changed_documents, save_fingerprints, delete_fingerprints
+from search.health_check import MeiliSearchServiceError
+from search.serializers.base import SearchableModel, BaseSearchSerializer
+from search.serializers.main_search import MainSearchSerializer
+from search.serializers.training_search import TrainingSearchSerializer
+
+log = logging.getLogger(__name__)
+
+
+def _search_id(model: Type[SearchableModel], pk: int) -> str:
+    return f'{model._meta.model_name}_{pk}'
+
+
+class BaseSearchIndexer(ABC):
+    """A base class for writing documents to a search index and its replicas.
+
+    Attributes:
+        index_uids: A list of index uids to which documents should be added.
+        serializer: A BaseSearchSerializer instance, used to prepare the objects to be
+            added to the indexes from the index_uids list.
+    """
+
+    index_uids: List[str]
+    searchable_attributes: List[str]
+    sortable_attributes: List[str]
+    serializer: BaseSearchSerializer
+
+    def add_documents(self, documents: List[Dict[str, Any]]) -> None:
+        """Adds documents to the appropriate search index and its replicas.
+
+        Documents identical to the ones already sent to an index are skipped.
+        Indexes being rebuilt also receive the documents, see `search.aliases`.
+
+        Raises:
+            MeiliSearchServiceError: when the documents could not be added to some index.
+        """
+        if not documents:
+            return
+        to_send = {}
+        for index_uid in get_write_index_uids(self.index_uids):
+            changed, fingerprints = get_changed_documents(
+                index_uid, documents, self.serializer.fingerprint_exclude_fields
+            )
+            if changed:
+                to_send[index_uid] = (changed, fingerprints)
+
+        # All the indexes are written to at once, see `SearchClient.fan_out`
+        tasks = search_client.fan_out(
+            {
+                index_uid: partial(self._send_documents, index_uid, changed)
+                for index_uid, (changed, _) in to_send.items()
+            }
+        )
+        # Fingerprints are only saved once the documents are in the index: otherwise documents
+        # of a task that failed would be considered as sent, and never be sent again.
+        results = search_client.wait_for_tasks(tasks.values())
+        errors = []
+        for index_uid, (changed, fingerprints) in to_send.items():
+            status, error_code = results.get(tasks[index_uid]['uid'], ('', ''))
+            if status != 'succeeded':
+                errors.append(f'{index_uid}: {status or "timed out"} {error_code}'.strip())
+                continue
+            save_fingerprints(index_uid, fingerprints)
+            log.debug(
+                f'Sent {len(changed)} documents to {index_uid}, '
+                f'{len(documents) - len(changed)} unchanged'
+            )
+        if errors:
+            raise MeiliSearchServiceError(f'Failed to add documents: {", ".join(errors)}')
+
+    def _send_documents(self, index_uid: str, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        index = search_client.index(index_uid)
+        task: Dict[str, Any] = index.add_documents(documents)
+
+        # There seems to be no way in MeiliSearch v0.13.0 to disable adding new document
+        # fields automatically to searchable attrs, so we update the settings to set them:
+        index.update_searchable_attributes(self.searchable_attributes)
+        index.update_sortable_attributes(self.sortable_attributes)
+        return task
+
+    def remove_documents(self, search_ids: List[str]) -> None:
+        """Removes documents from the search index and its replicas.
+
+        Documents that are not in an index are ignored by it.
+        """
+        if not search_ids:
+            return
+        index_uids = get_write_index_uids(self.index_uids)
+        search_client.fan_out(
+            {
+                index_uid: partial(search_client.index(index_uid).delete_documents, search_ids)
+                for index_uid in index_uids
+            }
+        )
+        for index_uid in index_uids:
+            delete_fingerprints(index_uid, search_ids)
+            log.info(f'Removed {len(search_ids)} documents from the {index_uid} index.')
+
+    def prepare_changes(
+        self, model: Type[SearchableModel], pks: Iterable[int]
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Serializes the given objects, telling apart the ones that must not be in the index.
+
+        Returns:
+            A list of documents to add, and a list of search IDs of documents to remove.
+        """
+        if model not in self.serializer.models_to_index:
+            return [], []
+        pks = set(pks)
+        queryset = self.serializer.get_searchable_queryset(model, id__in=pks)
+        documents = self.serializer.prepare_data_for_indexing(queryset)
+        found: Set[int] = {document['id'] for document in documents}
+        return documents, [_search_id(model, pk) for pk in sorted(pks - found)]
+
+
+class MainSearchIndexer(BaseSearchIndexer):
+    """Adds documents to the main index and its replicas."""
+
+    index_uids = MAIN_INDEX_UIDS
+    searchable_attributes = assert_cast(list, settings.MAIN_SEARCH['SEARCHABLE_ATTRIBUTES'])
+    sortable_attributes = assert_cast(list, settings.MAIN_SEARCH['SORTABLE_ATTRIBUTES'])
+    serializer = MainSearchSerializer()
+
+
+class TrainingSearchIndexer(BaseSearchIndexer):
+    """Adds documents to the training index and its replicas."""
+
+    index_uids = TRAINING_INDEX_UIDS
+    searchable_attributes = assert_cast(list, settings.TRAINING_SEARCH['SEARCHABLE_ATTRIBUTES'])
+    sortable_attributes = assert_cast(list, settings.TRAINING_SEARCH['SORTABLE_ATTRIBUTES'])
+    serializer = TrainingSearchSerializer()
+
+
+INDEXERS: List[BaseSearchIndexer] = [MainSearchIndexer(), TrainingSearchIndexer()]
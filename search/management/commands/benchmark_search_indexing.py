@@ -0,0 +1,216 @@
+# noqa: D100
+from contextlib import contextmanager
+from io import StringIO
+from typing import Any, Dict, Iterator, List
+from unittest.mock import Mock, patch
+import argparse
+import datetime
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings
+import meilisearch
+
+from films.models import AssetCategory
+from search.benchmarks.fake_meilisearch import FakeMeiliSearch
+from search.client import search_client
+from search.serializers.base import BaseSearchSerializer
+from search.serializers.main_search import MainSearchSerializer
+from search.serializers.training_search import TrainingSearchSerializer
+
+ASSETS_PER_FILM = 5
+SECTIONS_PER_TRAINING = 4
+TAGS = ['animation', 'rigging', 'modeling', 'sculpting', 'uv_mapping', 'lighting']
+
+
+def _peak_rss_kb() -> int:
+    """Return the peak resident set size of this process so far, in kilobytes.
+
+    Each run has its own process, so this is the peak of the current run.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+class Command(BaseCommand):  # noqa: D101
+    help = (
+        'Benchmark search indexing: seed a test database with N films (and proportionally '
+        'many assets, trainings, sections and posts), then run the search serializers and '
+        'the index_documents command against a local fake MeiliSearch server. Reports '
+        'documents/sec, SQL queries, HTTP requests and peak RSS for each N as JSON. '
+        'Needs the dev dependencies.'
+    )
+
+    def add_arguments(self, parser):  # noqa: D102
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10, 100],
+            help='Numbers of films to seed, one benchmark run for each.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Path of the JSON file to write the results to, printed if not given.',
+        )
+        # Used internally: each size is benchmarked by a process of its own
+        parser.add_argument('--run', type=int, help=argparse.SUPPRESS)
+
+    def _seed(self, size: int) -> None:
+        # factory_boy is a dev dependency, only needed when the benchmark runs
+        try:
+            from common.tests.factories.blog import PostFactory
+            from common.tests.factories.films import AssetFactory, FilmFactory
+            from common.tests.factories.training import (
+                ChapterFactory,
+                SectionFactory,
+                TrainingFactory,
+            )
+        except ImportError as e:
+            raise CommandError(f'Seeding needs the dev dependencies to be installed: {e}') from e
+
+        for i in range(size):
+            film = FilmFactory(is_published=True)
+            for j in range(ASSETS_PER_FILM):
+                category = AssetCategory.production_lesson if j == 0 else AssetCategory.artwork
+                asset = AssetFactory(film=film, is_published=True, category=category)
+                asset.tags.add(*TAGS[j % len(TAGS) :][:2])
+            training = TrainingFactory(is_published=True)
+            training.tags.add(TAGS[i % len(TAGS)])
+            chapter = ChapterFactory(training=training, is_published=True)
+            for j in range(SECTIONS_PER_TRAINING):
+                section = SectionFactory(chapter=chapter, is_published=True, is_free=j == 0)
+                section.tags.add(*TAGS[j % len(TAGS) :][:2])
+            PostFactory(film=film, is_published=True)
+
+    def _benchmark_serializer(self, serializer: BaseSearchSerializer) -> Dict[str, Any]:
+        documents = 0
+        with CaptureQueriesContext(connection) as queries:
+            start_t = time.perf_counter()
+            for model in serializer.models_to_index:
+                queryset = serializer.get_searchable_queryset(model)
+                documents += len(serializer.prepare_data_for_indexing(queryset))
+            seconds = time.perf_counter() - start_t
+        return {
+            'documents': documents,
+            'seconds': seconds,
+            'documents_per_second': documents / seconds if seconds else None,
+            'sql_queries': len(queries),
+        }
+
+    def _benchmark_command(self, server: FakeMeiliSearch, *args: str) -> Dict[str, Any]:
+        server.reset_counters()
+        with CaptureQueriesContext(connection) as queries:
+            start_t = time.perf_counter()
+            call_command('index_documents', *args, stdout=StringIO())
+            seconds = time.perf_counter() - start_t
+        return {
+            'documents_sent': server.documents_received,
+            'seconds': seconds,
+            'documents_per_second': server.documents_received / seconds if seconds else None,
+            'sql_queries': len(queries),
+            'http_requests': sum(server.requests.values()),
+            'http_requests_by_endpoint': dict(sorted(server.requests.items())),
+        }
+
+    def _run(self, size: int) -> Dict[str, Any]:
+        call_command('flush', interactive=False, verbosity=0)
+        start_t = time.perf_counter()
+        self._seed(size)
+        result: Dict[str, Any] = {'size': size, 'seed_seconds': time.perf_counter() - start_t}
+
+        result['serializers'] = {
+            type(serializer).__name__: self._benchmark_serializer(serializer)
+            for serializer in (MainSearchSerializer(), TrainingSearchSerializer())
+        }
+
+        with FakeMeiliSearch() as server, override_settings(
+            SEARCH_CLIENT=meilisearch.Client(server.url, 'benchmark'),
+            MEILISEARCH_API_ADDRESS=server.url,
+        ):
+            search_client.reset()
+            call_command('create_search_indexes', stdout=StringIO())
+            result['index_documents'] = self._benchmark_command(server)
+            result['index_documents_skip_unchanged'] = self._benchmark_command(
+                server, '--skip-unchanged'
+            )
+        search_client.reset()
+        result['peak_rss_kb'] = _peak_rss_kb()
+        return result
+
+    @contextmanager
+    def _test_database(self) -> Iterator[None]:
+        """Run in a new test database, like the tests, so that no real data is touched."""
+        runner = DiscoverRunner(interactive=False, verbosity=0)
+        runner.setup_test_environment()
+        old_config = runner.setup_databases()
+        try:
+            yield
+        finally:
+            runner.teardown_databases(old_config)
+            runner.teardown_test_environment()
+
+    def _run_in_subprocess(self, size: int) -> Dict[str, Any]:
+        """Benchmark the given size in a new process, so that its peak RSS is its own."""
+        process = subprocess.run(
+            [sys.executable, '-m', 'django', 'benchmark_search_indexing', '--run', str(size)],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        if process.returncode:
+            raise CommandError(f'Benchmarking with {size} films failed')
+        run: Dict[str, Any] = json.loads(process.stdout)
+        return run
+
+    def _handle_run(self, size: int) -> None:
+        # Thumbnails are not generated: the seeded image files don't exist
+        thumbnail = Mock(url='https://example.com/thumbnail.jpg')
+        with self._test_database(), patch('common.mixins.get_thumbnail', return_value=thumbnail):
+            run = self._run(size)
+        self.stdout.write(json.dumps(run))
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: D102
+        if options['run'] is not None:
+            self._handle_run(options['run'])
+            return
+
+        runs: List[Dict[str, Any]] = []
+        for size in sorted(options['sizes']):
+            self.stderr.write(f'Benchmarking with {size} films...')
+            run = self._run_in_subprocess(size)
+            runs.append(run)
+            self.stderr.write(
+                f'{size} films: '
+                f'{run["index_documents"]["documents_per_second"]:.0f} docs/sec, '
+                f'{run["index_documents"]["sql_queries"]} queries, '
+                f'{run["index_documents"]["http_requests"]} requests, '
+                f'{run["peak_rss_kb"]} KB peak RSS'
+            )
+
+        results = {
+            'commit': _git_commit(),
+            'date': datetime.datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'runs': runs,
+        }
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
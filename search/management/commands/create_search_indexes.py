@@ -1,13 +1,13 @@
 # noqa: D100
-from typing import Optional, Any, Dict, List
+from typing import Optional, Any
 import logging
 
 import meilisearch
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 
-from common.types import assert_cast
-from search import TRAINING_INDEX_UIDS, _wait_for_task, _assert_task_succeeded
+from search import ALL_INDEX_UIDS, get_index_settings, _wait_for_task, _assert_task_succeeded
+from search.aliases import get_index_uid
 from search.health_check import MeiliSearchServiceError, check_meilisearch
 
 logger = logging.getLogger(__name__)
@@ -48,44 +48,11 @@ class Command(BaseCommand):  # noqa: D101
             raise CommandError(err)
 
         # Create or update the main index, the replica indexes, and the training index
-        main_search_ranking_rules = assert_cast(dict, settings.MAIN_SEARCH['RANKING_RULES'])
-        training_search_ranking_rules = assert_cast(dict, settings.TRAINING_SEARCH['RANKING_RULES'])
-        indexes_and_ranking_rules: Dict[str, List[str]] = {
-            **main_search_ranking_rules,
-            **training_search_ranking_rules,
-        }
-        for index_uid, ranking_rules in indexes_and_ranking_rules.items():
+        for alias in ALL_INDEX_UIDS:
+            # The index may have been rebuilt under a different UID, see `IndexAlias`
+            index_uid = get_index_uid(alias)
             index = self._get_or_create_index(index_uid)
-            _assert_task_succeeded(index.update_ranking_rules(ranking_rules))
-
-            if index_uid in TRAINING_INDEX_UIDS:
-                _assert_task_succeeded(
-                    index.update_searchable_attributes(
-                        settings.TRAINING_SEARCH['SEARCHABLE_ATTRIBUTES']
-                    )
-                )
-                _assert_task_succeeded(
-                    index.update_filterable_attributes(
-                        settings.TRAINING_SEARCH['FACETING_ATTRIBUTES']
-                    )
-                )
-                _assert_task_succeeded(
-                    index.update_sortable_attributes(
-                        settings.TRAINING_SEARCH['SORTABLE_ATTRIBUTES']
-                    )
-                )
-            else:
-                _assert_task_succeeded(
-                    index.update_searchable_attributes(
-                        settings.MAIN_SEARCH['SEARCHABLE_ATTRIBUTES']
-                    )
-                )
-                _assert_task_succeeded(
-                    index.update_filterable_attributes(settings.MAIN_SEARCH['FACETING_ATTRIBUTES'])
-                )
-                _assert_task_succeeded(
-                    index.update_sortable_attributes(settings.MAIN_SEARCH['SORTABLE_ATTRIBUTES'])
-                )
+            _assert_task_succeeded(index.update_settings(get_index_settings(alias)))
 
             self.stdout.write(self.style.SUCCESS(f'Successfully updated the index "{index_uid}".'))
 
@@ -1,19 +1,134 @@
 # noqa: D100
-from typing import Any
-from typing import List, Dict
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Type, TypeVar
+import datetime
+import queue
+import time
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Q
+from django.db.models.query import QuerySet
+from django.utils import timezone
 
-from search import TRAINING_INDEX_UIDS, ALL_INDEX_UIDS, _assert_task_not_failed
+from search import (
+    MAIN_INDEX_UIDS,
+    TRAINING_INDEX_UIDS,
+    get_index_settings,
+    _assert_task_not_failed,
+    _assert_task_succeeded,
+)
+from search.aliases import (
+    abort_rebuild,
+    finish_rebuild,
+    get_new_index_uid,
+    get_write_index_uids,
+    start_rebuild,
+)
+from search.fingerprints import (
+    delete_fingerprints,
+    get_changed_documents,
+    get_fingerprint,
+    save_fingerprints,
+)
+from search.client import search_client
 from search.health_check import MeiliSearchServiceError, check_meilisearch
-from search.serializers.base import BaseSearchSerializer
+from search.indexers import _search_id
+from search.models import DocumentFingerprint, IndexWatermark
+from search.outbox import get_outbox_depth
+from search.serializers.base import BaseSearchSerializer, SearchableModel
 from search.serializers.main_search import MainSearchSerializer
 from search.serializers.training_search import TrainingSearchSerializer
 
-
-# here we just want to check that indexing tasks don't fail immediately
+# here we just want to check that settings update tasks don't fail immediately
 task_not_failed_timeout = 3  # seconds
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_MAX_PENDING_TASKS = 6
+DOCUMENTS_PAGE_SIZE = 10000
+# Outbox drains that started before a rebuild may not have written to the new indexes
+OUTBOX_CATCH_UP = datetime.timedelta(minutes=5)
+T = TypeVar('T')
+
+
+def _chunked(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class _ChunkSender:
+    """Sends chunks of documents to indexes, keeping a bounded number of unfinished tasks.
+
+    Chunks are sent from a background thread, so that the next chunk can be prepared while
+    the current one is being sent. Each chunk is sent to all the indexes concurrently.
+    Fingerprints of the sent documents are only saved once their task has succeeded,
+    by the thread that calls `save_fingerprints`.
+    """
+
+    def __init__(self, max_pending_tasks: int):
+        self.max_pending_tasks = max_pending_tasks
+        # Unfinished tasks, with the index UID and the fingerprints of their documents
+        self.pending_tasks: Deque[Tuple[Dict[str, Any], str, Dict[str, str]]] = deque()
+        self.succeeded: 'queue.SimpleQueue[Tuple[str, Dict[str, str]]]' = queue.SimpleQueue()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def _wait_for_oldest_tasks(self, count: int) -> None:
+        tasks = [self.pending_tasks.popleft() for _ in range(count)]
+        results = search_client.wait_for_tasks([task for task, _, _ in tasks])
+        errors = []
+        for task, index_uid, fingerprints in tasks:
+            status, error_code = results.get(task['uid'], ('', ''))
+            if status == 'succeeded':
+                self.succeeded.put((index_uid, fingerprints))
+            elif not status:
+                errors.append(f'Indexing task {task["uid"]} did not finish in time')
+            else:
+                errors.append(f'Indexing task {task["uid"]} {status}: {error_code}')
+        if errors:
+            raise CommandError('\n'.join(errors))
+
+    def _send(
+        self,
+        documents_by_index: Dict[str, List[Dict[str, Any]]],
+        fingerprints_by_index: Dict[str, Dict[str, str]],
+    ) -> None:
+        tasks = search_client.fan_out(
+            {
+                index_uid: partial(search_client.index(index_uid).add_documents, documents)
+                for index_uid, documents in documents_by_index.items()
+                if documents
+            }
+        )
+        for index_uid, task in tasks.items():
+            self.pending_tasks.append((task, index_uid, fingerprints_by_index[index_uid]))
+        if len(self.pending_tasks) > self.max_pending_tasks:
+            self._wait_for_oldest_tasks(len(self.pending_tasks) - self.max_pending_tasks)
+
+    def submit(
+        self,
+        documents_by_index: Dict[str, List[Dict[str, Any]]],
+        fingerprints_by_index: Dict[str, Dict[str, str]],
+    ) -> Future:
+        return self.executor.submit(self._send, documents_by_index, fingerprints_by_index)
+
+    def save_fingerprints(self) -> None:
+        """Save the fingerprints of the documents whose tasks have succeeded so far."""
+        while not self.succeeded.empty():
+            save_fingerprints(*self.succeeded.get())
+
+    def close(self) -> None:
+        """Wait for all the sent chunks to be processed, and save their fingerprints."""
+        self.executor.shutdown(wait=True)
+        try:
+            self._wait_for_oldest_tasks(len(self.pending_tasks))
+        finally:
+            self.save_fingerprints()
 
 
 class Command(BaseCommand):  # noqa: D101
@@ -21,23 +136,300 @@ class Command(BaseCommand):  # noqa: D101
         f'Add database objects to the main search index "{settings.MEILISEARCH_INDEX_UID}". '
         f'Also update replica indexes for different search results ordering. The following '
         f'models are indexed: Film, Asset, Training, Section, Post. '
-        f'Objects already present in the indexes are updated.'
+        f'Objects already present in the indexes are updated. '
+        f'Objects are read, serialized and sent in chunks, so memory usage does not grow '
+        f'with the number of objects.'
     )
 
-    def _prepare_data(self, serializer: BaseSearchSerializer) -> Any:
-        objects_to_load: List[Dict[str, Any]] = []
+    def add_arguments(self, parser):  # noqa: D102
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Number of objects to serialize and send to the indexes at once.',
+        )
+        parser.add_argument(
+            '--max-pending-tasks',
+            type=int,
+            default=DEFAULT_MAX_PENDING_TASKS,
+            help='Maximum number of unfinished MeiliSearch tasks before waiting for them.',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help=(
+                'Only send objects updated since the previous run, and delete documents of '
+                'objects that are no longer searchable (e.g. unpublished or deleted).'
+            ),
+        )
+        parser.add_argument(
+            '--skip-unchanged',
+            action='store_true',
+            help=(
+                'Do not send documents identical to the ones sent previously. '
+                'Must not be used after an index was deleted or recreated.'
+            ),
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help=(
+                'Build new indexes from scratch while the current ones keep serving searches, '
+                'then switch all of them to the new ones at once.'
+            ),
+        )
+        parser.add_argument(
+            '--keep-old',
+            action='store_true',
+            help='With --rebuild, do not delete the previous indexes after switching.',
+        )
+
+    def _iter_chunks(
+        self, serializer: BaseSearchSerializer, querysets: Dict[Type[SearchableModel], QuerySet]
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Read objects with a server-side cursor and serialize them in chunks."""
+        chunk_size = self.chunk_size
+        for model, queryset in querysets.items():
+            total = queryset.count()
+            self.stdout.write(f'Indexing {total} "{model._meta.label}" objects...')
+            pks = queryset.order_by('pk').values_list('pk', flat=True).iterator(chunk_size)
+            done, start_t = 0, time.monotonic()
+            for chunk_pks in _chunked(pks, chunk_size):
+                chunk_queryset = serializer.get_searchable_queryset(model, id__in=chunk_pks)
+                documents = serializer.prepare_data_for_indexing(chunk_queryset)
+                yield documents
+                done += len(documents)
+                rate = done / max(time.monotonic() - start_t, 1e-6)
+                self.stdout.write(f'{done}/{total} "{model._meta.label}" ({rate:.0f} docs/sec)')
 
+    def _get_querysets(
+        self, serializer: BaseSearchSerializer, index_uid: str
+    ) -> Dict[Type[SearchableModel], QuerySet]:
+        """Return querysets of objects to send, only the changed ones if incremental."""
+        watermarks: Dict[str, datetime.datetime] = {}
+        if self.incremental:
+            watermarks = dict(
+                IndexWatermark.objects.filter(index_uid=index_uid).values_list(
+                    'model_label', 'date_updated'
+                )
+            )
+        querysets = {}
         for model in serializer.models_to_index:
             queryset = serializer.get_searchable_queryset(model)
-            self.stdout.write(f'Preparing {len(queryset)} "{model._meta.label}" objects...')
+            since = watermarks.get(model._meta.label_lower)
+            if since is not None:
+                updated = Q(date_updated__gt=since)
+                for relation in serializer.related_updates.get(model, []):
+                    updated |= Q(**{f'{relation}__date_updated__gt': since})
+                # A subquery, so that objects with several updated related rows are sent once
+                queryset = queryset.filter(pk__in=model.objects.filter(updated).values('pk'))
+            querysets[model] = queryset
+        return querysets
+
+    @staticmethod
+    def _get_watermark(
+        serializer: BaseSearchSerializer, model: Type[SearchableModel], queryset: QuerySet
+    ) -> Optional[datetime.datetime]:
+        """Return the latest `date_updated` of the objects and of their related rows."""
+        relations = serializer.related_updates.get(model, [])
+        fields = ['date_updated', *(f'{relation}__date_updated' for relation in relations)]
+        latest = queryset.aggregate(**{f'latest_{i}': Max(field) for i, field in enumerate(fields)})
+        return max((date for date in latest.values() if date is not None), default=None)
+
+    def _save_watermarks(
+        self, index_uid: str, watermarks: Dict[Type[SearchableModel], Optional[datetime.datetime]]
+    ) -> None:
+        for model, date_updated in watermarks.items():
+            if date_updated is None:
+                continue
+            IndexWatermark.objects.update_or_create(
+                index_uid=index_uid,
+                model_label=model._meta.label_lower,
+                defaults={'date_updated': date_updated},
+            )
+
+    def _prepare_chunk(
+        self,
+        serializer: BaseSearchSerializer,
+        index_uids: List[str],
+        documents: List[Dict[str, Any]],
+    ) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Dict[str, str]]]:
+        """Return documents to send to each index, and their fingerprints to save once sent."""
+        exclude_fields = serializer.fingerprint_exclude_fields
+        if not self.skip_unchanged:
+            fingerprints = {
+                document['search_id']: get_fingerprint(document, exclude_fields)
+                for document in documents
+            }
+            return (
+                {index_uid: documents for index_uid in index_uids},
+                {index_uid: fingerprints for index_uid in index_uids},
+            )
+        documents_by_index: Dict[str, List[Dict[str, Any]]] = {}
+        fingerprints_by_index: Dict[str, Dict[str, str]] = {}
+        for index_uid in index_uids:
+            changed, fingerprints = get_changed_documents(index_uid, documents, exclude_fields)
+            documents_by_index[index_uid] = changed
+            fingerprints_by_index[index_uid] = fingerprints
+        return documents_by_index, fingerprints_by_index
+
+    def _index(self, serializer: BaseSearchSerializer, index_uids: List[str]) -> int:
+        # Watermarks are stored once per group of replicas, under the primary index UID
+        querysets = self._get_querysets(serializer, index_uid=index_uids[0])
+        # Taken before reading, so that objects changed in the meantime are sent next time
+        new_watermarks = {
+            model: self._get_watermark(serializer, model, queryset)
+            for model, queryset in querysets.items()
+        }
+        total = self._send(serializer, index_uids, querysets)
+        self._save_watermarks(index_uids[0], new_watermarks)
+        return total
+
+    def _send(
+        self,
+        serializer: BaseSearchSerializer,
+        index_uids: List[str],
+        querysets: Dict[Type[SearchableModel], QuerySet],
+    ) -> int:
+        sender = _ChunkSender(max_pending_tasks=self.max_pending_tasks)
+        previous: Optional[Future] = None
+        total = 0
+        try:
+            for documents in self._iter_chunks(serializer, querysets):
+                documents_by_index, fingerprints_by_index = self._prepare_chunk(
+                    serializer, index_uids, documents
+                )
+                # Keep at most one chunk in flight while the next one is being prepared
+                if previous is not None:
+                    previous.result()
+                    sender.save_fingerprints()
+                previous = sender.submit(documents_by_index, fingerprints_by_index)
+                total += sum(len(documents) for documents in documents_by_index.values())
+            if previous is not None:
+                previous.result()
+        finally:
+            sender.close()
+        return total
+
+    def _get_indexed_search_ids(self, index_uid: str) -> Set[str]:
+        index = settings.SEARCH_CLIENT.get_index(index_uid)
+        search_ids: Set[str] = set()
+        offset = 0
+        while True:
+            documents = index.get_documents(
+                {
+                    'attributesToRetrieve': 'search_id',
+                    'limit': DOCUMENTS_PAGE_SIZE,
+                    'offset': offset,
+                }
+            )
+            search_ids.update(document['search_id'] for document in documents)
+            if len(documents) < DOCUMENTS_PAGE_SIZE:
+                return search_ids
+            offset += DOCUMENTS_PAGE_SIZE
+
+    def _delete_orphans(self, serializer: BaseSearchSerializer, index_uids: List[str]) -> None:
+        """Delete documents of objects that are no longer searchable, e.g. unpublished ones."""
+        expected_search_ids = {
+            _search_id(model, pk)
+            for model in serializer.models_to_index
+            for pk in serializer.get_searchable_queryset(model)
+            .values_list('pk', flat=True)
+            .iterator(self.chunk_size)
+        }
+        for index_uid in index_uids:
+            orphans = sorted(self._get_indexed_search_ids(index_uid) - expected_search_ids)
+            for chunk in _chunked(orphans, self.chunk_size):
+                task = settings.SEARCH_CLIENT.get_index(index_uid).delete_documents(chunk)
+                _assert_task_not_failed(task)
+                delete_fingerprints(index_uid, chunk)
+            self.stdout.write(f'Deleted {len(orphans)} orphaned documents from "{index_uid}"')
+
+    def _update_settings(self, index_uids: List[str], search_settings: Dict[str, Any]) -> None:
+        # There seems to be no way in MeiliSearch v0.13 to disable adding new document
+        # fields automatically to searchable attrs, so we update the settings to set them:
+        # TODO(fsiddi) Investigate if this is still the case with v0.15
+        calls = {}
+        for index_uid in index_uids:
+            index = search_client.index(index_uid)
+            calls[(index_uid, 'searchable')] = partial(
+                index.update_searchable_attributes, search_settings['SEARCHABLE_ATTRIBUTES']
+            )
+            calls[(index_uid, 'sortable')] = partial(
+                index.update_sortable_attributes, search_settings['SORTABLE_ATTRIBUTES']
+            )
+        tasks = search_client.fan_out(calls)
+        results = search_client.wait_for_tasks(tasks.values(), timeout=task_not_failed_timeout)
+        assert all(status != 'failed' for status, _ in results.values())
+        for index_uid in index_uids:
+            self.stdout.write(self.style.SUCCESS(f'Successfully updated the index "{index_uid}".'))
+
+    def _create_index(self, index_uid: str, index_settings: Dict[str, Any]) -> None:
+        task = settings.SEARCH_CLIENT.create_index(index_uid, {'primaryKey': 'search_id'})
+        _assert_task_succeeded(task)
+        index = settings.SEARCH_CLIENT.index(index_uid)
+        _assert_task_succeeded(index.update_settings(index_settings))
+        self.stdout.write(f'Created the index "{index_uid}"')
 
-            qs_values = serializer.prepare_data_for_indexing(queryset)
-            objects_to_load.extend(qs_values)
-            self.stdout.write(f'Done ({len(qs_values)} objects).')
+    def _delete_indexes(self, index_uids: List[str]) -> None:
+        for index_uid in index_uids:
+            _assert_task_not_failed(settings.SEARCH_CLIENT.index(index_uid).delete())
+            IndexWatermark.objects.filter(index_uid=index_uid).delete()
+            DocumentFingerprint.objects.filter(index_uid=index_uid).delete()
+            self.stdout.write(f'Deleted the index "{index_uid}"')
+
+    def _validate(self, serializer: BaseSearchSerializer, index_uids: List[str]) -> None:
+        """Check that the rebuilt indexes contain as many documents as expected.
+
+        Changes that are still waiting in the search outbox are allowed to make a difference.
+        """
+        expected = sum(
+            serializer.get_searchable_queryset(model).count()
+            for model in serializer.models_to_index
+        )
+        allowed_difference = get_outbox_depth()
+        for index_uid in index_uids:
+            count = settings.SEARCH_CLIENT.index(index_uid).get_stats()['numberOfDocuments']
+            if abs(count - expected) > allowed_difference:
+                raise CommandError(
+                    f'The index "{index_uid}" has {count} documents, expected {expected}'
+                )
 
-        self.stdout.write(f'{len(objects_to_load)} objects to load')
+    def _rebuild(self, groups: List[Tuple[BaseSearchSerializer, List[str]]]) -> None:
+        """Build new indexes while the current ones are still used, then switch to them."""
+        aliases = [alias for _, group_aliases in groups for alias in group_aliases]
+        shadow_index_uids = {alias: get_new_index_uid(alias) for alias in aliases}
+        for alias, index_uid in shadow_index_uids.items():
+            self._create_index(index_uid, get_index_settings(alias))
+        # From now on, changes pushed from the search outbox also go to the new indexes
+        start_rebuild(shadow_index_uids)
+        started_at = timezone.now()
+        try:
+            for serializer, group_aliases in groups:
+                index_uids = [shadow_index_uids[alias] for alias in group_aliases]
+                self._index(serializer, index_uids)
+                # Catch up with changes pushed by the outbox while it was not writing here yet
+                self._send(
+                    serializer,
+                    index_uids,
+                    {
+                        model: serializer.get_searchable_queryset(model).filter(
+                            date_updated__gte=started_at - OUTBOX_CATCH_UP
+                        )
+                        for model in serializer.models_to_index
+                    },
+                )
+                self._delete_orphans(serializer, index_uids)
+                self._validate(serializer, index_uids)
+        except BaseException:
+            self.stderr.write('Rebuild failed, deleting the new indexes')
+            self._delete_indexes(abort_rebuild(aliases))
+            raise
 
-        return objects_to_load
+        old_index_uids = finish_rebuild(aliases)
+        self.stdout.write(self.style.SUCCESS(f'Switched to the new indexes {shadow_index_uids}'))
+        if not self.keep_old:
+            self._delete_indexes(old_index_uids)
 
     def handle(self, *args: Any, **options: Any) -> None:  # noqa: D102
         try:
@@ -46,45 +438,36 @@ class Command(BaseCommand):  # noqa: D101
         except MeiliSearchServiceError as err:
             raise CommandError(err)
 
-        self.stdout.write('Preparing the data, it may take a while...')
-        data_to_load = self._prepare_data(serializer=MainSearchSerializer())
-        self.stdout.write('Preparing the training data, it may take a while...')
-        training_data_to_load = self._prepare_data(serializer=TrainingSearchSerializer())
+        self.chunk_size = options['chunk_size']
+        self.max_pending_tasks = options['max_pending_tasks']
+        self.incremental = options['incremental']
+        self.skip_unchanged = options['skip_unchanged']
+        self.keep_old = options['keep_old']
+        start_t = time.monotonic()
 
-        # Update the main index and its replicas, and the training index and its replicas
-        for index_uid in ALL_INDEX_UIDS:
-            index = settings.SEARCH_CLIENT.get_index(index_uid)
-            if index_uid in TRAINING_INDEX_UIDS:
-                response = index.add_documents(training_data_to_load)
-                _assert_task_not_failed(
-                    index.update_searchable_attributes(
-                        settings.TRAINING_SEARCH['SEARCHABLE_ATTRIBUTES']
-                    ),
-                    timeout=task_not_failed_timeout,
-                )
-                _assert_task_not_failed(
-                    index.update_sortable_attributes(
-                        settings.TRAINING_SEARCH['SORTABLE_ATTRIBUTES']
-                    ),
-                    timeout=task_not_failed_timeout,
-                )
-            else:
-                response = index.add_documents(data_to_load)
-                # There seems to be no way in MeiliSearch v0.13 to disable adding new document
-                # fields automatically to searchable attrs, so we update the settings to set them:
-                # TODO(fsiddi) Investigate if this is still the case with v0.15
-                _assert_task_not_failed(
-                    index.update_searchable_attributes(
-                        settings.MAIN_SEARCH['SEARCHABLE_ATTRIBUTES']
-                    ),
-                    timeout=task_not_failed_timeout,
-                )
-                _assert_task_not_failed(
-                    index.update_sortable_attributes(settings.MAIN_SEARCH['SORTABLE_ATTRIBUTES']),
-                    timeout=task_not_failed_timeout,
-                )
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'Successfully updated the index "{index_uid}". ' f'Task ID: {response["uid"]}.'
-                )
+        if options['rebuild']:
+            if self.incremental or self.skip_unchanged:
+                raise CommandError('--rebuild always sends all the documents')
+            self._rebuild(
+                [
+                    (MainSearchSerializer(), MAIN_INDEX_UIDS),
+                    (TrainingSearchSerializer(), TRAINING_INDEX_UIDS),
+                ]
             )
+            self.stdout.write(f'Done in {time.monotonic() - start_t:.1f}s')
+            return
+
+        # Update the main index and its replicas, and the training index and its replicas
+        for serializer, aliases, search_settings in (
+            (MainSearchSerializer(), MAIN_INDEX_UIDS, settings.MAIN_SEARCH),
+            (TrainingSearchSerializer(), TRAINING_INDEX_UIDS, settings.TRAINING_SEARCH),
+        ):
+            # Also writes to the indexes being rebuilt, if any
+            index_uids = get_write_index_uids(aliases)
+            total = self._index(serializer, index_uids)
+            if self.incremental:
+                self._delete_orphans(serializer, index_uids)
+            self._update_settings(index_uids, search_settings)
+            self.stdout.write(f'{total} documents sent in total to {index_uids}')
+
+        self.stdout.write(f'Done in {time.monotonic() - start_t:.1f}s')
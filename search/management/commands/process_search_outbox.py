@@ -0,0 +1,68 @@
+# noqa: D100
+from typing import Any
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from search import outbox
+from search.client import search_client
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):  # noqa: D101
+    help = (
+        'Push pending changes of searchable objects from the search outbox to the search '
+        'indexes. Repeated changes of the same object are merged, and documents are sent to '
+        'each index in batches.'
+    )
+
+    def add_arguments(self, parser):  # noqa: D102
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=outbox.DEFAULT_BATCH_SIZE,
+            help='Maximum number of outbox entries to process at once.',
+        )
+        parser.add_argument(
+            '--forever',
+            action='store_true',
+            help='Keep running, polling the outbox for new entries.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when the outbox is empty (with --forever).',
+        )
+
+    def _drain(self, batch_size: int) -> int:
+        total = 0
+        while True:
+            processed = outbox.drain(batch_size=batch_size)
+            total += processed
+            if processed < batch_size:
+                return total
+
+    def handle(self, *args: Any, **options: Any) -> None:  # noqa: D102
+        batch_size = options['batch_size']
+        while True:
+            try:
+                processed = self._drain(batch_size)
+            except Exception:
+                if not options['forever']:
+                    raise
+                logger.exception('Failed to drain the search outbox, will retry')
+                processed = 0
+            if processed or options['verbosity'] > 1:
+                logger.info(
+                    'Processed %s outbox entries, outbox depth: %s, lag: %s, client: %s',
+                    processed,
+                    outbox.get_outbox_depth(),
+                    outbox.get_outbox_lag(),
+                    dict(search_client.counters),
+                )
+            if not options['forever']:
+                return
+            time.sleep(options['interval'])
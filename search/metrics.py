@@ -0,0 +1,5 @@
+"""Metrics of search indexing sampled by `write_stats`, see `stats.metrics`."""
+from search.outbox import get_outbox_depth
+from stats.metrics import Metric, register
+
+register(Metric('search_outbox_depth', 'Search Outbox Depth', count=get_outbox_depth))
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.9 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchOutboxEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=64)),
+                ('object_id', models.PositiveIntegerField()),
+                ('operation', models.CharField(choices=[('index', 'Index'), ('delete', 'Delete')], default='index', max_length=6)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'search outbox entries',
+                'ordering': ['id'],
+            },
+        ),
+    ]
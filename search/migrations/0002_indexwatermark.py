@@ -0,0 +1,26 @@
+# Generated by Django 3.2.9 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexWatermark',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index_uid', models.CharField(max_length=64)),
+                ('model_label', models.CharField(max_length=64)),
+                ('date_updated', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='indexwatermark',
+            constraint=models.UniqueConstraint(fields=('index_uid', 'model_label'), name='unique_watermark_per_index_and_model'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.9 on 2026-10-18 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_indexwatermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentFingerprint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index_uid', models.CharField(max_length=64)),
+                ('search_id', models.CharField(max_length=64)),
+                ('fingerprint', models.CharField(max_length=40)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='documentfingerprint',
+            constraint=models.UniqueConstraint(fields=('index_uid', 'search_id'), name='unique_fingerprint_per_index_and_document'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.9 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0003_documentfingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexAlias',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=64, unique=True)),
+                ('index_uid', models.CharField(max_length=64)),
+                ('shadow_index_uid', models.CharField(blank=True, default='', max_length=64)),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'index aliases',
+            },
+        ),
+    ]
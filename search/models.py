@@ -0,0 +1,91 @@
+from django.db import models
+
+
+class OutboxOperation(models.TextChoices):
+    index = 'index', 'Index'
+    delete = 'delete', 'Delete'
+
+
+class SearchOutboxEntry(models.Model):
+    """A pending change to a searchable object, waiting to be pushed to the search indexes.
+
+    Signals only write these rows, which costs a single INSERT per save.
+    Entries are drained in batches by the `process_search_outbox` command,
+    see `search.outbox.drain`.
+    """
+
+    class Meta:
+        ordering = ['id']
+        verbose_name_plural = 'search outbox entries'
+
+    # Lowercase model label, e.g. "films.asset"
+    model_label = models.CharField(max_length=64)
+    object_id = models.PositiveIntegerField()
+    operation = models.CharField(
+        choices=OutboxOperation.choices, max_length=6, default=OutboxOperation.index
+    )
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f'{self.operation} {self.model_label} #{self.object_id}'
+
+
+class IndexWatermark(models.Model):
+    """The latest `date_updated` of a model's objects sent to an index by `index_documents`.
+
+    Used by `index_documents --incremental` to only send the objects changed since then.
+    """
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['index_uid', 'model_label'], name='unique_watermark_per_index_and_model'
+            )
+        ]
+
+    index_uid = models.CharField(max_length=64)
+    # Lowercase model label, e.g. "films.asset"
+    model_label = models.CharField(max_length=64)
+    date_updated = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f'{self.index_uid} {self.model_label} @ {self.date_updated}'
+
+
+class DocumentFingerprint(models.Model):
+    """A hash of the document last sent to an index, used to skip sending unchanged ones."""
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['index_uid', 'search_id'], name='unique_fingerprint_per_index_and_document'
+            )
+        ]
+
+    index_uid = models.CharField(max_length=64)
+    search_id = models.CharField(max_length=64)
+    fingerprint = models.CharField(max_length=40)
+
+    def __str__(self) -> str:
+        return f'{self.index_uid} {self.search_id}: {self.fingerprint}'
+
+
+class IndexAlias(models.Model):
+    """Points the index UID used in the settings to the MeiliSearch index currently serving it.
+
+    MeiliSearch v0.25 can't rename or swap indexes, so `index_documents --rebuild` builds new
+    indexes under different UIDs and then re-points the aliases to them. While a rebuild is
+    in progress, `shadow_index_uid` is the index being built, which also receives all writes.
+    Without a row, the alias is the UID of the index itself.
+    """
+
+    class Meta:
+        verbose_name_plural = 'index aliases'
+
+    alias = models.CharField(max_length=64, unique=True)
+    index_uid = models.CharField(max_length=64)
+    shadow_index_uid = models.CharField(max_length=64, blank=True, default='')
+    date_updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f'{self.alias} -> {self.index_uid}'
@@ -0,0 +1,107 @@
+"""A durable queue of pending search index changes.
+
+Saving or deleting a searchable object only records a (model, pk, operation) row in the
+outbox table, in the same transaction as the change itself. The outbox is then drained in
+batches (see the `process_search_outbox` command): repeated changes to the same object are
+merged, and all the resulting documents are sent to each index in a single call.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Type
+import datetime
+import logging
+
+from django.apps import apps
+from django.db import transaction
+from django.utils import timezone
+
+from search.client import search_client
+from search.indexers import INDEXERS, _search_id
+from search.models import OutboxOperation, SearchOutboxEntry
+from search.serializers.base import SearchableModel
+
+log = logging.getLogger(__name__)
+DEFAULT_BATCH_SIZE = 500
+
+
+def enqueue(
+    changes: Iterable[Tuple[Type[SearchableModel], int]],
+    operation: OutboxOperation = OutboxOperation.index,
+) -> None:
+    """Record pending changes of the given objects with a single INSERT."""
+    SearchOutboxEntry.objects.bulk_create(
+        [
+            SearchOutboxEntry(
+                model_label=model._meta.label_lower, object_id=pk, operation=operation
+            )
+            for model, pk in changes
+        ]
+    )
+
+
+def get_outbox_depth() -> int:
+    """Return the number of changes waiting to be pushed to the search indexes."""
+    return SearchOutboxEntry.objects.count()
+
+
+def get_outbox_lag() -> Optional[datetime.timedelta]:
+    """Return the age of the oldest pending change, if any."""
+    oldest = SearchOutboxEntry.objects.order_by('id').values_list('date_created', flat=True)
+    date_created = oldest.first()
+    if date_created is None:
+        return None
+    return timezone.now() - date_created
+
+
+def _merge(entries: List[SearchOutboxEntry]) -> Dict[Tuple[str, str], Set[int]]:
+    """Collapse repeated changes of the same object, the latest operation wins."""
+    latest: Dict[Tuple[str, int], str] = {}
+    for entry in entries:  # entries are ordered by ID, so later ones overwrite earlier ones
+        latest[(entry.model_label, entry.object_id)] = entry.operation
+
+    merged: Dict[Tuple[str, str], Set[int]] = {}
+    for (model_label, object_id), operation in latest.items():
+        merged.setdefault((model_label, operation), set()).add(object_id)
+    return merged
+
+
+def drain(batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Push a batch of pending changes to all the search indexes.
+
+    Entries are locked with SKIP LOCKED, so several drainers can run at the same time.
+    If communication with the search service fails, the transaction is rolled back
+    and the entries stay in the outbox to be retried later. While the search client's
+    circuit breaker is open, nothing is sent and no entries are processed.
+
+    Returns:
+        The number of outbox entries that were processed.
+    """
+    if not search_client.is_available():
+        log.warning('Not draining the search outbox: search service unavailable')
+        return 0
+
+    with transaction.atomic():
+        entries = list(SearchOutboxEntry.objects.select_for_update(skip_locked=True)[:batch_size])
+        if not entries:
+            return 0
+        changes = _merge(entries)
+
+        for indexer in INDEXERS:
+            documents, search_ids_to_remove = [], []
+            for (model_label, operation), pks in changes.items():
+                model = apps.get_model(model_label)
+                if operation == OutboxOperation.delete:
+                    search_ids_to_remove.extend(_search_id(model, pk) for pk in sorted(pks))
+                    continue
+                to_add, to_remove = indexer.prepare_changes(model, pks)
+                documents.extend(to_add)
+                search_ids_to_remove.extend(to_remove)
+            indexer.add_documents(documents)
+            indexer.remove_documents(search_ids_to_remove)
+            log.info(
+                'Added %s and removed %s documents in %s',
+                len(documents),
+                len(search_ids_to_remove),
+                indexer.index_uids,
+            )
+
+        SearchOutboxEntry.objects.filter(id__in=[entry.id for entry in entries]).delete()
+    return len(entries)
@@ -0,0 +1,110 @@
+"""An in-memory cache of search results, shared by all the threads of a process.
+
+Entries are evicted when they are older than the TTL, or when the cache is full, starting
+with the least recently used one. Identical queries arriving while the first one is still
+being computed wait for its result instead of also querying MeiliSearch.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Optional, Tuple, TypeVar
+import threading
+import time
+
+DEFAULT_MAX_SIZE = 2000
+DEFAULT_TTL = 60  # seconds
+COALESCE_TIMEOUT = 10  # seconds
+T = TypeVar('T')
+
+
+class _Pending(Generic[T]):
+    """The result of a computation that other threads may be waiting for."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class QueryCache(Generic[T]):
+    """A size-bounded LRU cache with a TTL, coalescing concurrent computations of a key."""
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MAX_SIZE,
+        ttl: float = DEFAULT_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Configure the cache limits, a clock can be given for testing."""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: 'OrderedDict[str, Tuple[float, T]]' = OrderedDict()
+        self._pending: Dict[str, _Pending[T]] = {}
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Remove all the entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.coalesced = 0
+
+    def get_or_compute(self, key: str, compute: Callable[[], T]) -> Tuple[T, str]:
+        """Return a cached value for the given key, computing it if necessary.
+
+        Returns:
+            The value, and how it was obtained: 'hit', 'miss' or 'coalesced'.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if self.clock() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value, 'hit'
+                del self._entries[key]
+            pending = self._pending.get(key)
+            is_leader = pending is None
+            if pending is None:
+                pending = self._pending[key] = _Pending()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            if not pending.done.wait(COALESCE_TIMEOUT):
+                raise TimeoutError(f'Timed out waiting for a concurrent query: {key}')
+            if pending.error is not None:
+                raise pending.error
+            return pending.value, 'coalesced'  # type: ignore[return-value]
+
+        try:
+            value = compute()
+        except BaseException as err:
+            pending.error = err
+            raise
+        else:
+            pending.value = value
+            with self._lock:
+                self._entries[key] = (self.clock() + self.ttl, value)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            return value, 'miss'
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.done.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the cache size and its hit counters."""
+        requests = self.hits + self.misses + self.coalesced
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_ratio': (self.hits + self.coalesced) / requests if requests else None,
+        }
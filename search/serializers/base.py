@@ -2,20 +2,19 @@ from abc import ABC
 from html.parser import HTMLParser
 from html import unescape
 from io import StringIO
-from typing import Optional, Any, Type, Dict, Union, Callable, List, TYPE_CHECKING
+from typing import Optional, Any, Type, Dict, Union, Callable, List, Iterable
 import json
 
+from django.conf import settings
 from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models.expressions import Value
 from django.db.models.fields import CharField
+from django.db.models.fields.files import FieldFile
 from django.db.models.functions.text import Concat
-from django.db.models.query import QuerySet
-
-if TYPE_CHECKING:
-    # ValuesQuerySet has long been removed from Django, but it is required by mypy
-    from django.db.models.query import ValuesQuerySet
+from django.db.models.query import QuerySet, Prefetch
 
 from blog.models import Post
+from common.mixins import prefetch_thumbnails
 from films.models import Film, Asset
 from training.models import Training, Section
 
@@ -55,36 +54,88 @@ class BaseSearchSerializer(ABC):
         additional_fields: For each model, a dict with additional fields to be added
             to each instance; the values of the fields are lambda functions, taking the
             instance as their only argument and returning the additional field's value.
+        select_related, prefetch_related: For each model, a list of relations that
+            additional fields need, loaded for the whole batch of objects at once.
+            Additional fields must only access these relations, so that serializing
+            a batch takes the same number of queries regardless of its size.
+        related_updates: For each model, relations to rows whose changes also change the
+            model's documents, e.g. the film of an asset, which gives it its `film_title`.
+            Their `date_updated` is checked along with the model's own one when only
+            the documents changed since the previous indexing are sent.
+        fingerprint_exclude_fields: Fields that are not searched, sorted, filtered or displayed,
+            ignored when checking whether a document has changed since it was last sent.
     """
 
     models_to_index: List[Type[SearchableModel]]
     filter_params: Dict[Type[SearchableModel], Dict[str, Any]]
     annotations: Dict[Type[SearchableModel], Dict[str, Any]]
     additional_fields: Dict[Type[SearchableModel], Dict[str, Callable[[Any], Any]]]
+    select_related: Dict[Type[SearchableModel], List[str]] = {
+        Asset: ['film', 'collection', 'static_asset'],
+        Section: ['chapter__training'],
+    }
+    prefetch_related: Dict[Type[SearchableModel], List[Union[str, Prefetch]]] = {}
+    related_updates: Dict[Type[SearchableModel], List[str]] = {
+        Asset: ['film', 'collection', 'static_asset'],
+        Training: ['chapters__sections'],
+        Section: ['chapter', 'chapter__training'],
+        Post: ['film'],
+    }
+    fingerprint_exclude_fields: List[str] = ['view_count']
 
     def get_searchable_queryset(
         self, model: Type[SearchableModel], **filter_params: Any
     ) -> 'QuerySet[SearchableModel]':
         """Only returns the model's objects that should be available in search."""
-        filters = self.filter_params.get(model, {})
-        filters.update(**filter_params)
+        # Copy the class-level filters: updating them in place would leak into later queries
+        filters = {**self.filter_params.get(model, {}), **filter_params}
         return model.objects.filter(**filters)
 
     def prepare_data_for_indexing(
         self, queryset: 'QuerySet[SearchableModel]'
     ) -> List[Dict[str, Any]]:
-        """Serializes objects for search, adding all the necessary additional fields."""
+        """Serializes objects for search, adding all the necessary additional fields.
+
+        Objects are fetched with a single query, and all the relations that additional
+        fields need are loaded for the whole queryset at once.
+        """
         model = queryset.model
 
         queryset = self._add_common_annotations(queryset)
         queryset = queryset.annotate(**self.annotations.get(model, {}))
-        qs_values = queryset.values()
-        for instance_dict, instance in zip(qs_values, queryset):
+        queryset = queryset.select_related(*self.select_related.get(model, []))
+        queryset = queryset.prefetch_related(*self.prefetch_related.get(model, []))
+        annotation_names = list(queryset.query.annotations)
+
+        instances = list(queryset)
+        thumbnail_owners = [self._get_thumbnail_owner(instance) for instance in instances]
+        prefetch_thumbnails(
+            (owner.thumbnail for owner in thumbnail_owners if owner), settings.THUMBNAIL_SIZE_S
+        )
+
+        documents = []
+        for instance in instances:
+            instance_dict = self._get_values(instance, annotation_names)
             instance_dict = self._set_common_additional_fields(instance_dict, instance)
             for key, func in self.additional_fields.get(model, {}).items():
                 instance_dict[key] = func(instance)
-
-        return self._serialize_data(qs_values)
+            documents.append(instance_dict)
+
+        return self._serialize_data(documents)
+
+    def _get_values(
+        self, instance: SearchableModel, annotation_names: Iterable[str]
+    ) -> Dict[str, Any]:
+        """Returns the same dict as `QuerySet.values()` would, for a single fetched instance."""
+        values = {}
+        for field in instance._meta.concrete_fields:
+            value = field.value_from_object(instance)
+            if isinstance(value, FieldFile):
+                value = value.name
+            values[field.attname] = value
+        for name in annotation_names:
+            values[name] = getattr(instance, name)
+        return values
 
     def _add_common_annotations(
         self, queryset: 'QuerySet[SearchableModel]'
@@ -107,26 +158,27 @@ class BaseSearchSerializer(ABC):
         if hasattr(instance, 'description'):
             instance_dict['description'] = self.clean_html(instance.description)
 
-        if isinstance(instance, Asset):
-            instance_dict['thumbnail_url'] = (
-                '' if not instance.static_asset else instance.static_asset.thumbnail_s_url
-            )
-        elif isinstance(instance, Section):
-            instance_dict['thumbnail_url'] = instance.chapter.training.thumbnail_s_url or ''
-        else:
-            instance_dict['thumbnail_url'] = instance.thumbnail_s_url or ''
+        thumbnail_owner = self._get_thumbnail_owner(instance)
+        thumbnail_url = thumbnail_owner.thumbnail_s_url if thumbnail_owner else None
+        instance_dict['thumbnail_url'] = thumbnail_url or ''
         return instance_dict
 
-    def _serialize_data(
-        self, qs_values: 'ValuesQuerySet[SearchableModel, Any]'
-    ) -> List[Dict[str, Any]]:
-        """Turns values queryset into a list of objects that can be added to a search index.
+    def _get_thumbnail_owner(self, instance: SearchableModel) -> Optional[Any]:
+        """Returns the object whose thumbnail is shown for the instance in search results."""
+        if isinstance(instance, Asset):
+            return instance.static_asset
+        if isinstance(instance, Section):
+            return instance.chapter.training
+        return instance
+
+    def _serialize_data(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Turns a list of values dicts into a list of objects that can be added to an index.
 
         The Index.add_documents method expects a list of objects, not a single object.
         Datetime values have to be serialized with DjangoJSONEncoder.
         """
         serialized_data: List[Dict[str, Any]] = json.loads(
-            json.dumps(list(qs_values), cls=DjangoJSONEncoder)
+            json.dumps(documents, cls=DjangoJSONEncoder)
         )
         return serialized_data
 
@@ -145,3 +197,18 @@ class BaseSearchSerializer(ABC):
         if not tag:
             return tag
         return tag.replace('-', ' ').replace('_', ' ')
+
+    @classmethod
+    def get_sections_tags(cls, training: Training) -> List[str]:
+        """Return unique names of tags of all sections of a training, sorted.
+
+        Expects `chapters__sections__tags` to be prefetched.
+        """
+        return sorted(
+            {
+                tag.name
+                for chapter in training.chapters.all()
+                for section in chapter.sections.all()
+                for tag in section.tags.all()
+            }
+        )
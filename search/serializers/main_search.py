@@ -4,7 +4,6 @@ import datetime as dt
 from django.db.models.expressions import F, Value, Case, When
 from django.db.models.fields import CharField
 from django.db.models.query import QuerySet
-from taggit.models import Tag
 
 from blog.models import Post
 from films.models import Film, Asset
@@ -73,10 +72,7 @@ class MainSearchSerializer(BaseSearchSerializer):
         Asset: {'tags': lambda instance: [tag.name for tag in instance.tags.all()]},
         Training: {
             'tags': lambda instance: [tag.name for tag in instance.tags.all()],
-            'secondary_tags': lambda instance: [
-                tag.name
-                for tag in Tag.objects.filter(section__chapter__training__pk=instance.pk).distinct()
-            ],
+            'secondary_tags': BaseSearchSerializer.get_sections_tags,
         },
         Section: {
             'tags': lambda instance: [tag.name for tag in instance.tags.all()],
@@ -90,6 +86,11 @@ class MainSearchSerializer(BaseSearchSerializer):
         },
         Post: {'description': lambda instance: '' if not instance.excerpt else instance.excerpt},
     }
+    prefetch_related = {
+        Asset: ['tags'],
+        Training: ['tags', 'chapters__sections__tags'],
+        Section: ['tags', 'chapter__training__tags'],
+    }
 
     def get_searchable_queryset(
         self, model: Type[SearchableModel], **filter_params: Any
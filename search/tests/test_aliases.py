@@ -0,0 +1,60 @@
+from unittest.mock import call, patch
+
+from django.test import TestCase
+
+from blog.models import Post
+from common.tests.factories.helpers import generate_file_path
+from common.tests.factories.users import UserFactory
+from search import MAIN_INDEX_UIDS, outbox
+from search.aliases import (
+    abort_rebuild,
+    finish_rebuild,
+    get_index_uids,
+    get_write_index_uids,
+    start_rebuild,
+)
+
+
+class TestIndexAliases(TestCase):
+    def test_aliases_without_rebuilds_are_index_uids(self):
+        self.assertEqual(get_index_uids(MAIN_INDEX_UIDS), MAIN_INDEX_UIDS)
+        self.assertEqual(get_write_index_uids(MAIN_INDEX_UIDS), MAIN_INDEX_UIDS)
+
+    def test_rebuild_writes_to_both_and_then_switches(self):
+        alias = MAIN_INDEX_UIDS[0]
+        start_rebuild({alias: f'{alias}__new'})
+
+        self.assertEqual(get_index_uids([alias]), [alias])
+        self.assertEqual(get_write_index_uids([alias]), [alias, f'{alias}__new'])
+        with self.assertRaises(ValueError):
+            start_rebuild({alias: f'{alias}__newer'})
+
+        self.assertEqual(finish_rebuild([alias]), [alias])
+        self.assertEqual(get_index_uids([alias]), [f'{alias}__new'])
+        self.assertEqual(get_write_index_uids([alias]), [f'{alias}__new'])
+
+    def test_aborted_rebuild(self):
+        alias = MAIN_INDEX_UIDS[0]
+        start_rebuild({alias: f'{alias}__new'})
+
+        self.assertEqual(abort_rebuild([alias]), [f'{alias}__new'])
+        self.assertEqual(get_write_index_uids([alias]), [alias])
+
+    @patch('search.client.SearchClient.is_available', return_value=True)
+    @patch('django.conf.settings.SEARCH_CLIENT')
+    def test_outbox_writes_to_indexes_being_rebuilt(self, search_client_mock, is_available_mock):
+        start_rebuild({alias: f'{alias}__new' for alias in MAIN_INDEX_UIDS})
+        Post.objects.create(
+            author=UserFactory(),
+            title='Strawberry Fields Forever',
+            category='Announcement',
+            content='# Hot news',
+            thumbnail=generate_file_path(),
+            is_published=True,
+        )
+
+        outbox.drain()
+
+        for alias in MAIN_INDEX_UIDS:
+            self.assertIn(call(alias), search_client_mock.index.call_args_list)
+            self.assertIn(call(f'{alias}__new'), search_client_mock.index.call_args_list)
@@ -0,0 +1,120 @@
+from unittest.mock import Mock, patch
+import unittest
+
+from meilisearch.errors import MeiliSearchCommunicationError, MeiliSearchTimeoutError
+
+from search import ALL_INDEX_UIDS
+from search.client import CircuitOpenError, SearchClient
+
+
+class FakeClock:
+    now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@patch('django.conf.settings.SEARCH_CLIENT')
+class TestSearchClient(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.client = SearchClient(
+            failure_threshold=2, health_ttl=10, min_backoff=1, max_backoff=4, clock=self.clock
+        )
+
+    def _fail(self):
+        raise MeiliSearchCommunicationError('Connection refused')
+
+    def test_health_is_cached(self, search_client_mock):
+        search_client_mock.get_indexes.return_value = [Mock(uid=uid) for uid in ALL_INDEX_UIDS]
+
+        self.assertTrue(self.client.is_available())
+        self.assertTrue(self.client.is_available())
+        self.clock.now += 11
+        self.assertTrue(self.client.is_available())
+
+        self.assertEqual(search_client_mock.health.call_count, 2)
+        search_client_mock.get_indexes.assert_called_once()
+
+    def test_missing_indexes_mean_unavailable(self, search_client_mock):
+        search_client_mock.get_indexes.return_value = [Mock(uid=ALL_INDEX_UIDS[0])]
+
+        self.assertFalse(self.client.is_available())
+        self.assertFalse(self.client.is_open)
+
+    def test_circuit_trips_after_consecutive_failures(self, search_client_mock):
+        with self.assertRaises(MeiliSearchCommunicationError):
+            self.client.call(self._fail)
+        self.assertFalse(self.client.is_open)
+        with self.assertRaises(MeiliSearchCommunicationError):
+            self.client.call(self._fail)
+        self.assertTrue(self.client.is_open)
+
+        func = Mock()
+        with self.assertRaises(CircuitOpenError):
+            self.client.call(func)
+        func.assert_not_called()
+        self.assertFalse(self.client.is_available())
+        search_client_mock.health.assert_not_called()
+        self.assertEqual(self.client.counters['tripped'], 1)
+        self.assertEqual(self.client.counters['blocked'], 2)
+
+    def test_timeouts_trip_the_circuit(self, search_client_mock):
+        search_client_mock.health.side_effect = MeiliSearchTimeoutError('Read timed out')
+
+        self.assertFalse(self.client.is_available())
+        self.assertFalse(self.client.is_open)
+        self.assertFalse(self.client.is_available())
+        self.assertTrue(self.client.is_open)
+
+        self.assertFalse(self.client.is_available())
+        self.assertEqual(search_client_mock.health.call_count, 2)
+        self.assertEqual(self.client.counters['tripped'], 1)
+
+    def test_probes_back_off_exponentially(self, search_client_mock):
+        for _ in range(2):
+            with self.assertRaises(MeiliSearchCommunicationError):
+                self.client.call(self._fail)
+
+        # Each failed probe doubles the time until the next one
+        for backoff in (1, 2, 4, 4):
+            self.clock.now += backoff - 0.5
+            with self.assertRaises(CircuitOpenError):
+                self.client.call(self._fail)
+            self.clock.now += 0.5
+            with self.assertRaises(MeiliSearchCommunicationError):
+                self.client.call(self._fail)
+        self.assertEqual(self.client.counters['probes'], 4)
+
+        self.clock.now += 4
+        self.assertEqual(self.client.call(lambda: 'ok'), 'ok')
+        self.assertFalse(self.client.is_open)
+        self.assertEqual(self.client.counters['tripped'], 1)
+
+    def test_fan_out_makes_all_calls_before_raising(self, search_client_mock):
+        succeeded = Mock(return_value={'uid': 2})
+
+        with self.assertRaises(MeiliSearchCommunicationError):
+            self.client.fan_out({'studio': self._fail, 'studio_date_asc': succeeded})
+
+        succeeded.assert_called_once()
+        self.assertEqual(self.client.fan_out({'a': lambda: 1, 'b': lambda: 2}), {'a': 1, 'b': 2})
+
+    @patch('search.client.time.sleep')
+    def test_only_newest_unfinished_task_is_polled(self, sleep_mock, search_client_mock):
+        statuses = {1: ['succeeded'], 2: ['failed'], 3: ['enqueued', 'processing', 'succeeded']}
+
+        def get_task(uid):
+            status = statuses[uid].pop(0)
+            error = {'code': 'invalid_document_id'} if status == 'failed' else {}
+            return {'uid': uid, 'status': status, 'error': error}
+
+        with patch.object(self.client, 'get_task', side_effect=get_task) as get_task_mock:
+            results = self.client.wait_for_tasks([{'uid': 1}, {'uid': 2}, {'uid': 3}])
+
+        self.assertEqual(
+            results,
+            {1: ('succeeded', ''), 2: ('failed', 'invalid_document_id'), 3: ('succeeded', '')},
+        )
+        self.assertEqual(get_task_mock.call_count, 5)
+        self.assertEqual(sleep_mock.call_count, 2)
@@ -0,0 +1,25 @@
+import unittest
+
+import meilisearch
+
+from search.benchmarks.fake_meilisearch import FakeMeiliSearch
+
+
+class TestFakeMeiliSearch(unittest.TestCase):
+    def test_client_round_trip(self):
+        with FakeMeiliSearch() as server:
+            client = meilisearch.Client(server.url, 'benchmark')
+            client.create_index('studio', {'primaryKey': 'search_id'})
+            index = client.index('studio')
+
+            task = index.add_documents([{'search_id': 'film_1'}, {'search_id': 'film_2'}])
+            index.update_searchable_attributes(['name'])
+            index.delete_documents(['film_1'])
+
+            self.assertEqual(client.get_task(task['uid'])['status'], 'succeeded')
+            self.assertEqual([i.uid for i in client.get_indexes()], ['studio'])
+            self.assertEqual(index.get_documents({'limit': 10}), [{'search_id': 'film_2'}])
+            self.assertEqual(index.get_stats()['numberOfDocuments'], 1)
+            self.assertEqual(server.documents_received, 2)
+            self.assertEqual(server.requests['POST indexes/*/documents'], 1)
+            self.assertEqual(server.requests['GET tasks/*'], 1)
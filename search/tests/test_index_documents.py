@@ -0,0 +1,119 @@
+from io import StringIO
+from unittest.mock import Mock, patch
+import unittest
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test.testcases import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+import meilisearch
+
+from common.tests.factories.films import AssetFactory
+from films.models import Asset, Film
+from search import MAIN_INDEX_UIDS
+from search.benchmarks.fake_meilisearch import FakeMeiliSearch
+from search.client import search_client
+from search.management.commands.index_documents import _ChunkSender
+
+
+def _task_results(*results):
+    def wait_for_tasks(tasks, timeout=None):
+        return {task['uid']: result for task, result in zip(tasks, results)}
+
+    return wait_for_tasks
+
+
+@patch('search.management.commands.index_documents.save_fingerprints')
+@patch('search.management.commands.index_documents.search_client')
+class TestChunkSender(unittest.TestCase):
+    def _send(self, search_client_mock, *results):
+        search_client_mock.fan_out.return_value = {'studio': {'uid': 1}}
+        search_client_mock.wait_for_tasks.side_effect = _task_results(*results)
+        sender = _ChunkSender(max_pending_tasks=0)
+        try:
+            sender.submit(
+                {'studio': [{'search_id': 'film_1'}]}, {'studio': {'film_1': 'fingerprint'}}
+            ).result()
+        finally:
+            sender.close()
+
+    def test_fingerprints_of_succeeded_tasks_are_saved(
+        self, search_client_mock, save_fingerprints_mock
+    ):
+        self._send(search_client_mock, ('succeeded', ''))
+
+        save_fingerprints_mock.assert_called_once_with('studio', {'film_1': 'fingerprint'})
+
+    def test_failed_tasks_raise(self, search_client_mock, save_fingerprints_mock):
+        with self.assertRaisesRegex(CommandError, 'failed: invalid_document'):
+            self._send(search_client_mock, ('failed', 'invalid_document'))
+
+        save_fingerprints_mock.assert_not_called()
+
+    def test_unfinished_tasks_raise(self, search_client_mock, save_fingerprints_mock):
+        with self.assertRaisesRegex(CommandError, 'did not finish in time'):
+            self._send(search_client_mock, ('', ''))
+
+        save_fingerprints_mock.assert_not_called()
+
+
+@patch('common.mixins.get_thumbnail', Mock(return_value=Mock(url='https://example.com/t.jpg')))
+class TestIndexDocuments(TestCase):
+    def setUp(self):
+        self.server = FakeMeiliSearch().__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        settings_override = override_settings(
+            SEARCH_CLIENT=meilisearch.Client(self.server.url, 'test'),
+            MEILISEARCH_API_ADDRESS=self.server.url,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        search_client.reset()
+        self.addCleanup(search_client.reset)
+        call_command('create_search_indexes', stdout=StringIO())
+
+        self.asset = AssetFactory()
+        self.other_asset = AssetFactory()
+
+    def _index(self, *args):
+        call_command('index_documents', *args, stdout=StringIO())
+
+    def _clear_indexes(self):
+        for index in self.server.indexes.values():
+            index.documents.clear()
+
+    def _search_ids(self, index_uid):
+        return set(self.server.indexes[index_uid].documents)
+
+    def test_incremental_sends_objects_with_updated_related_rows(self):
+        self._index('--incremental')
+        self.assertIn(f'asset_{self.other_asset.pk}', self._search_ids(MAIN_INDEX_UIDS[0]))
+        self._clear_indexes()
+
+        self._index('--incremental')
+        self.assertEqual(self._search_ids(MAIN_INDEX_UIDS[0]), set())
+
+        Film.objects.filter(pk=self.asset.film_id).update(
+            title='Sprite Fright', date_updated=timezone.now()
+        )
+        self._index('--incremental')
+
+        for index_uid in MAIN_INDEX_UIDS:
+            self.assertEqual(
+                self._search_ids(index_uid),
+                {f'film_{self.asset.film_id}', f'asset_{self.asset.pk}'},
+            )
+        document = self.server.indexes[MAIN_INDEX_UIDS[0]].documents[f'asset_{self.asset.pk}']
+        self.assertEqual(document['film_title'], 'Sprite Fright')
+
+    def test_incremental_deletes_orphaned_documents(self):
+        self._index('--incremental')
+
+        Asset.objects.filter(pk=self.asset.pk).update(is_published=False)
+        self._index('--incremental')
+
+        for index_uid in MAIN_INDEX_UIDS:
+            search_ids = self._search_ids(index_uid)
+            self.assertNotIn(f'asset_{self.asset.pk}', search_ids)
+            self.assertIn(f'asset_{self.other_asset.pk}', search_ids)
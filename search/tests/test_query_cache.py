@@ -0,0 +1,74 @@
+from unittest.mock import Mock
+import threading
+import time
+import unittest
+
+from search.query_cache import QueryCache
+
+
+class FakeClock:
+    now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = QueryCache(max_size=2, ttl=60, clock=self.clock)
+
+    def test_hit_and_expiry(self):
+        compute = Mock(return_value={'hits': []})
+
+        self.assertEqual(self.cache.get_or_compute('a', compute), ({'hits': []}, 'miss'))
+        self.assertEqual(self.cache.get_or_compute('a', compute), ({'hits': []}, 'hit'))
+        self.clock.now += 61
+        self.assertEqual(self.cache.get_or_compute('a', compute), ({'hits': []}, 'miss'))
+
+        self.assertEqual(compute.call_count, 2)
+        self.assertEqual(self.cache.get_stats()['hit_ratio'], 1 / 3)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.get_or_compute('a', lambda: 1)
+        self.cache.get_or_compute('b', lambda: 2)
+        self.cache.get_or_compute('a', lambda: 1)
+        self.cache.get_or_compute('c', lambda: 3)
+
+        self.assertEqual(self.cache.get_or_compute('a', lambda: 0), (1, 'hit'))
+        self.assertEqual(self.cache.get_or_compute('b', lambda: 0), (0, 'miss'))
+
+    def test_errors_are_not_cached(self):
+        with self.assertRaises(ValueError):
+            self.cache.get_or_compute('a', Mock(side_effect=ValueError))
+
+        self.assertEqual(self.cache.get_or_compute('a', lambda: 1), (1, 'miss'))
+
+    def test_concurrent_identical_queries_are_coalesced(self):
+        started, release = threading.Event(), threading.Event()
+        results = []
+
+        def _slow_search():
+            started.set()
+            release.wait()
+            return 'result'
+
+        compute = Mock(side_effect=_slow_search)
+
+        leader = threading.Thread(
+            target=lambda: results.append(self.cache.get_or_compute('a', compute))
+        )
+        leader.start()
+        started.wait()
+        follower = threading.Thread(
+            target=lambda: results.append(self.cache.get_or_compute('a', compute))
+        )
+        follower.start()
+        while self.cache.coalesced == 0:
+            time.sleep(0.001)
+        release.set()
+        leader.join()
+        follower.join()
+
+        compute.assert_called_once()
+        self.assertCountEqual(results, [('result', 'miss'), ('result', 'coalesced')])
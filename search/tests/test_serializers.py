@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.db import connection
+from django.test.testcases import TestCase
+from django.test.utils import CaptureQueriesContext
+from sorl.thumbnail import default
+from sorl.thumbnail.images import serialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from blog.models import Post
+from common.mixins import _cacheable_get_thumnbnail, get_thumbnail_file
+from common.tests.factories.blog import PostFactory
+from common.tests.factories.films import AssetFactory, FilmFactory
+from common.tests.factories.training import SectionFactory, TrainingFactory, ChapterFactory
+from films.models import AssetCategory, Film
+from static_assets.models import StaticAsset
+from search.serializers.main_search import MainSearchSerializer
+from search.serializers.training_search import TrainingSearchSerializer
+from training.models import Training
+
+
+class TestBulkSerialization(TestCase):
+    def _create_searchable_objects(self, count: int) -> None:
+        for _ in range(count):
+            FilmFactory(is_published=True)
+            asset = AssetFactory(is_published=True, category=AssetCategory.production_lesson)
+            asset.tags.add('rigging', 'animation')
+            training = TrainingFactory(is_published=True)
+            training.tags.add('modeling')
+            chapter = ChapterFactory(training=training, is_published=True)
+            for _ in range(2):
+                section = SectionFactory(chapter=chapter, is_published=True)
+                section.tags.add('sculpting', 'uv_mapping')
+            PostFactory(is_published=True)
+
+    def _store_thumbnails(self) -> None:
+        """Record the thumbnails of all images as generated, as viewing their pages would."""
+        for model in (Film, StaticAsset, Training, Post):
+            for obj in model.objects.exclude(thumbnail=''):
+                thumbnail = get_thumbnail_file(
+                    obj.thumbnail, settings.THUMBNAIL_SIZE_S, crop=settings.THUMBNAIL_CROP_MODE
+                )
+                thumbnail.set_size((400, 225))
+                KVStore.objects.get_or_create(
+                    key=add_prefix(thumbnail.key, 'image'),
+                    defaults={'value': serialize_image_file(thumbnail)},
+                )
+
+    def _clear_thumbnail_caches(self) -> None:
+        default.kvstore.cache.clear()
+        _cacheable_get_thumnbnail.cache_clear()
+
+    def _count_queries(self, serializer):
+        self._store_thumbnails()
+        counts = {}
+        for model in serializer.models_to_index:
+            queryset = serializer.get_searchable_queryset(model)
+            self._clear_thumbnail_caches()
+            with CaptureQueriesContext(connection) as context:
+                documents = serializer.prepare_data_for_indexing(queryset)
+            counts[model] = (len(context.captured_queries), len(documents))
+        return counts
+
+    def test_number_of_queries_does_not_depend_on_batch_size(self):
+        for serializer in (MainSearchSerializer(), TrainingSearchSerializer()):
+            self._create_searchable_objects(1)
+            small_batch = self._count_queries(serializer)
+
+            self._create_searchable_objects(9)
+            large_batch = self._count_queries(serializer)
+
+            for model in serializer.models_to_index:
+                small_queries, small_documents = small_batch[model]
+                large_queries, large_documents = large_batch[model]
+                self.assertGreater(large_documents, small_documents, model)
+                self.assertEqual(small_queries, large_queries, model)
+
+    def test_training_documents(self):
+        training = TrainingFactory(is_published=True)
+        training.tags.add('modeling')
+        chapter = ChapterFactory(training=training)
+        SectionFactory(chapter=chapter, is_free=True).tags.add('sculpting', 'uv_mapping')
+        SectionFactory(chapter=chapter, is_free=True).tags.add('sculpting')
+        self._store_thumbnails()
+        self._clear_thumbnail_caches()
+        queryset = TrainingSearchSerializer().get_searchable_queryset(type(training))
+
+        documents = TrainingSearchSerializer().prepare_data_for_indexing(queryset)
+
+        self.assertEqual(len(documents), 1)
+        document = documents[0]
+        self.assertEqual(document['search_id'], f'training_{training.pk}')
+        self.assertEqual(document['tags'], ['modeling'])
+        self.assertEqual(document['secondary_tags'], ['sculpting', 'uv mapping'])
+        self.assertTrue(document['is_free'])
+        thumbnail = get_thumbnail_file(
+            training.thumbnail, settings.THUMBNAIL_SIZE_S, crop=settings.THUMBNAIL_CROP_MODE
+        )
+        self.assertEqual(document['thumbnail_url'], thumbnail.url)
+        self.assertEqual(document['thumbnail'], training.thumbnail.name)
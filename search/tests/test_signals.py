@@ -8,8 +8,16 @@ from common.tests.factories.films import FilmFactory
 from common.tests.factories.helpers import generate_file_path, catch_signal
 from common.tests.factories.users import UserFactory
 from films.models import Film, FilmStatus
+from search import outbox, MAIN_INDEX_UIDS
+from search.health_check import MeiliSearchServiceError
+from search.models import DocumentFingerprint, SearchOutboxEntry, OutboxOperation
 
 
+def _all_tasks_succeeded(search_client, tasks, timeout=None):
+    return {task['uid']: ('succeeded', '') for task in tasks}
+
+
+@patch('search.client.SearchClient.wait_for_tasks', _all_tasks_succeeded)
 class TestBlogPostIndexing(TestCase):
     @classmethod
     def setUpTestData(cls) -> None:
@@ -22,23 +30,106 @@ class TestBlogPostIndexing(TestCase):
             'thumbnail': generate_file_path(),
         }
 
-    @patch('search.signals.check_meilisearch')
-    @patch('django.conf.settings.SEARCH_CLIENT')
-    def test_unpublished_posts_trigger_signal_but_are_not_indexed(
-        self, search_client_mock, check_meilisearch_mock
-    ):
+    def test_unpublished_posts_trigger_signal_and_are_queued(self):
         with catch_signal(post_save, sender=Post) as handler:
-            Post.objects.create(**self.post_data, is_published=False)
+            post = Post.objects.create(**self.post_data, is_published=False)
             handler.assert_called()
-            check_meilisearch_mock.assert_called_once()
-            search_client_mock.assert_not_called()
 
-    @patch('search.signals.check_meilisearch')
+        self.assertEqual(
+            list(SearchOutboxEntry.objects.values_list('model_label', 'object_id', 'operation')),
+            [('blog.post', post.pk, 'index')],
+        )
+
+    @patch('search.client.SearchClient.is_available', return_value=True)
+    @patch('django.conf.settings.SEARCH_CLIENT')
+    def test_unpublished_posts_are_not_indexed(self, search_client_mock, is_available_mock):
+        post = Post.objects.create(**self.post_data, is_published=False)
+
+        outbox.drain()
+
+        is_available_mock.assert_called_once()
+        search_client_mock.index.return_value.add_documents.assert_not_called()
+        search_client_mock.index.return_value.delete_documents.assert_called_with(
+            [f'post_{post.pk}']
+        )
+        self.assertEqual(SearchOutboxEntry.objects.count(), 0)
+
+    @patch('search.client.SearchClient.is_available', return_value=True)
+    @patch('django.conf.settings.SEARCH_CLIENT')
+    def test_new_published_posts_are_indexed(self, search_client_mock, is_available_mock):
+        Post.objects.create(**self.post_data, is_published=True)
+        search_client_mock.index.return_value.add_documents.assert_not_called()
+
+        outbox.drain()
+
+        is_available_mock.assert_called_once()
+        search_client_mock.index.return_value.add_documents.assert_called()
+        self.assertEqual(SearchOutboxEntry.objects.count(), 0)
+
+    @patch('search.client.SearchClient.is_available', return_value=True)
+    @patch('django.conf.settings.SEARCH_CLIENT')
+    def test_repeated_changes_are_merged(self, search_client_mock, is_available_mock):
+        post = Post.objects.create(**self.post_data, is_published=True)
+        for _ in range(3):
+            post.save()
+        self.assertEqual(SearchOutboxEntry.objects.count(), 4)
+
+        outbox.drain()
+
+        add_documents = search_client_mock.index.return_value.add_documents
+        # One call per main index, each with a single document
+        self.assertEqual(add_documents.call_count, len(MAIN_INDEX_UIDS))
+        for call in add_documents.call_args_list:
+            self.assertEqual(len(call.args[0]), 1)
+        self.assertEqual(SearchOutboxEntry.objects.count(), 0)
+
+    @patch('search.client.SearchClient.is_available', return_value=True)
+    @patch('django.conf.settings.SEARCH_CLIENT')
+    def test_unchanged_documents_are_not_sent_again(self, search_client_mock, is_available_mock):
+        post = Post.objects.create(**self.post_data, is_published=True)
+        outbox.drain()
+        add_documents = search_client_mock.index.return_value.add_documents
+        self.assertEqual(add_documents.call_count, len(MAIN_INDEX_UIDS))
+
+        outbox.enqueue([(Post, post.pk)])
+        outbox.drain()
+        self.assertEqual(add_documents.call_count, len(MAIN_INDEX_UIDS))
+
+        post.title = 'Penny Lane'
+        post.save()
+        outbox.drain()
+        self.assertEqual(add_documents.call_count, 2 * len(MAIN_INDEX_UIDS))
+
+    @patch('search.client.SearchClient.is_available', return_value=True)
     @patch('django.conf.settings.SEARCH_CLIENT')
-    def test_new_published_posts_are_indexed(self, search_client_mock, check_meilisearch_mock):
+    def test_outbox_is_kept_when_search_service_fails(self, search_client_mock, is_available_mock):
         Post.objects.create(**self.post_data, is_published=True)
-        check_meilisearch_mock.assert_called_once()
-        search_client_mock.get_index.return_value.add_documents.assert_called()
+        search_client_mock.index.return_value.add_documents.side_effect = Exception('Boom')
+
+        with self.assertRaises(Exception):
+            outbox.drain()
+
+        self.assertEqual(outbox.get_outbox_depth(), 1)
+
+    @patch('search.client.SearchClient.is_available', return_value=True)
+    @patch('django.conf.settings.SEARCH_CLIENT')
+    def test_documents_of_failed_tasks_are_sent_again(self, search_client_mock, is_available_mock):
+        Post.objects.create(**self.post_data, is_published=True)
+        add_documents = search_client_mock.index.return_value.add_documents
+
+        with patch(
+            'search.client.SearchClient.wait_for_tasks',
+            lambda _, tasks, timeout=None: {task['uid']: ('failed', 'internal') for task in tasks},
+        ):
+            with self.assertRaises(MeiliSearchServiceError):
+                outbox.drain()
+        self.assertEqual(outbox.get_outbox_depth(), 1)
+        self.assertFalse(DocumentFingerprint.objects.exists())
+
+        outbox.drain()
+
+        self.assertEqual(add_documents.call_count, 2 * len(MAIN_INDEX_UIDS))
+        self.assertEqual(outbox.get_outbox_depth(), 0)
 
 
 class TestPostDeleteSignal(TestCase):
@@ -72,3 +163,8 @@ class TestPostDeleteSignal(TestCase):
         with catch_signal(pre_delete, sender=Film) as handler:
             film.delete()
             handler.assert_called()
+
+        self.assertEqual(
+            SearchOutboxEntry.objects.last().operation,
+            OutboxOperation.delete,
+        )
@@ -0,0 +1,97 @@
+from unittest.mock import patch
+import json
+import threading
+
+from django.test import TestCase
+from django.urls import reverse
+from meilisearch.errors import MeiliSearchTimeoutError
+
+from common.tests.factories.users import UserFactory
+from search import MAIN_INDEX_UIDS
+from search.client import search_client
+from search.views import _normalize_query, search_results_cache
+
+
+@patch('django.conf.settings.SEARCH_CLIENT')
+class TestSearchAPI(TestCase):
+    def setUp(self):
+        search_results_cache.clear()
+        search_client.reset()
+        self.url = reverse('search-api', kwargs={'index_uid': MAIN_INDEX_UIDS[0]})
+
+    def _search(self, body):
+        return self.client.post(self.url, json.dumps(body), content_type='application/json')
+
+    def test_equivalent_queries_are_served_from_cache(self, search_client_mock):
+        index_search = search_client_mock.index.return_value.search
+        index_search.return_value = {'hits': [], 'facetsDistribution': {'model': {'film': 1}}}
+
+        response = self._search({'q': 'Spring ', 'facetsDistribution': ['model', 'media_type']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Search-Cache'], 'miss')
+        self.assertEqual(response.json(), index_search.return_value)
+
+        response = self._search({'q': ' spring', 'facetsDistribution': ['media_type', 'model']})
+        self.assertEqual(response['X-Search-Cache'], 'hit')
+        self.assertEqual(response.json(), index_search.return_value)
+
+        index_search.assert_called_once_with(
+            'spring', {'facetsDistribution': ['media_type', 'model']}
+        )
+
+    def test_timeouts_mean_unavailable(self, search_client_mock):
+        search_client_mock.index.return_value.search.side_effect = MeiliSearchTimeoutError(
+            'Read timed out'
+        )
+
+        response = self._search({'q': 'spring'})
+
+        self.assertEqual(response.status_code, 503)
+
+    @patch('search.query_cache.COALESCE_TIMEOUT', 0.01)
+    def test_timed_out_coalesced_query_means_unavailable(self, search_client_mock):
+        started, release = threading.Event(), threading.Event()
+
+        def _slow_search():
+            started.set()
+            release.wait()
+            return {'hits': []}
+
+        key = json.dumps(_normalize_query(MAIN_INDEX_UIDS[0], {'q': 'spring'}), sort_keys=True)
+        leader = threading.Thread(
+            target=search_results_cache.get_or_compute, args=(key, _slow_search)
+        )
+        leader.start()
+        started.wait()
+        try:
+            response = self._search({'q': 'spring'})
+        finally:
+            release.set()
+            leader.join()
+
+        self.assertEqual(response.status_code, 503)
+        search_client_mock.index.assert_not_called()
+
+    def test_unknown_index(self, search_client_mock):
+        response = self.client.post(
+            reverse('search-api', kwargs={'index_uid': 'users'}), '{}', 'application/json'
+        )
+
+        self.assertEqual(response.status_code, 404)
+        search_client_mock.index.assert_not_called()
+
+    def test_unknown_parameters(self, search_client_mock):
+        response = self._search({'q': 'spring', 'delete': True})
+
+        self.assertEqual(response.status_code, 400)
+        search_client_mock.index.assert_not_called()
+
+    def test_stats_are_only_visible_to_staff(self, search_client_mock):
+        url = reverse('search-api-stats')
+        self.client.force_login(UserFactory())
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(UserFactory(is_staff=True))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['cache']['hits'], 0)
@@ -1,7 +1,9 @@
 from django.urls.conf import path
 
-from search.views import search
+from search.views import search, search_api, search_api_stats
 
 urlpatterns = [
     path('', search, name='search'),
+    path('api/indexes/<str:index_uid>/search', search_api, name='search-api'),
+    path('api/stats', search_api_stats, name='search-api-stats'),
 ]
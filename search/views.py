@@ -1,10 +1,113 @@
+import json
+from typing import Any, Dict
+
 from django.http.request import HttpRequest
-from django.http.response import HttpResponse
+from django.http.response import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import render
-from django.views.decorators.http import require_safe
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, require_safe
+import meilisearch
+
+from search import ALL_INDEX_UIDS
+from search.aliases import get_index_uid
+from search.client import search_client
+from search.health_check import MeiliSearchServiceError
+from search.query_cache import QueryCache
+
+MAX_LIMIT = 1000
+# Search parameters accepted by MeiliSearch v0.25, only these are passed on
+SEARCH_PARAMS = {
+    'offset',
+    'limit',
+    'filter',
+    'facetsDistribution',
+    'attributesToRetrieve',
+    'attributesToCrop',
+    'cropLength',
+    'attributesToHighlight',
+    'matches',
+    'sort',
+}
+# Parameters which are lists of field names, the order of which doesn't matter
+UNORDERED_PARAMS = {'facetsDistribution', 'attributesToRetrieve', 'attributesToHighlight'}
+
+search_results_cache: QueryCache[Dict[str, Any]] = QueryCache()
 
 
 @require_safe
 def search(request: HttpRequest) -> HttpResponse:
     """"""
     return render(request, 'search/search.html', {})
+
+
+def _normalize_query(index_uid: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    """Bring equivalent search requests to the same form, so that they share a cache entry.
+
+    Raises:
+        ValueError if the request contains unknown or invalid parameters.
+    """
+    unknown = set(body) - SEARCH_PARAMS - {'q'}
+    if unknown:
+        raise ValueError(f'Unknown search parameters: {sorted(unknown)}')
+    q = body.get('q') or ''
+    if not isinstance(q, str):
+        raise ValueError('"q" must be a string')
+    params = {key: value for key, value in body.items() if key != 'q' and value is not None}
+    for key in UNORDERED_PARAMS & params.keys():
+        if not isinstance(params[key], list):
+            raise ValueError(f'"{key}" must be a list')
+        params[key] = sorted(set(params[key]))
+    if 'limit' in params:
+        params['limit'] = min(int(params['limit']), MAX_LIMIT)
+    if 'offset' in params:
+        params['offset'] = max(int(params['offset']), 0)
+    return {'index_uid': index_uid, 'q': ' '.join(q.split()).lower(), 'params': params}
+
+
+@csrf_exempt
+@require_POST
+def search_api(request: HttpRequest, index_uid: str) -> HttpResponse:
+    """Proxy a search request to MeiliSearch, caching the results (including facets).
+
+    The request and response bodies are the same as the ones of MeiliSearch's
+    `POST /indexes/{index_uid}/search`, so this view can be used as the host of a JS client.
+    The `X-Search-Cache` response header tells whether the result came from the cache.
+    """
+    if index_uid not in ALL_INDEX_UIDS:
+        return JsonResponse({'message': f'Index {index_uid} not found'}, status=404)
+    try:
+        query = _normalize_query(index_uid, json.loads(request.body or '{}'))
+    except (ValueError, TypeError, AttributeError) as err:
+        return HttpResponseBadRequest(str(err))
+
+    def _search() -> Dict[str, Any]:
+        index = search_client.index(get_index_uid(index_uid))
+        return search_client.call(index.search, query['q'], query['params'])
+
+    key = json.dumps(query, sort_keys=True)
+    try:
+        result, cache_status = search_results_cache.get_or_compute(key, _search)
+    except (
+        MeiliSearchServiceError,
+        meilisearch.errors.MeiliSearchCommunicationError,
+        meilisearch.errors.MeiliSearchTimeoutError,
+        # Raised when a concurrent identical query takes too long
+        TimeoutError,
+    ):
+        return JsonResponse({'message': 'Search is temporarily unavailable'}, status=503)
+    except meilisearch.errors.MeiliSearchApiError as err:
+        return JsonResponse({'message': err.message}, status=err.status_code)
+
+    response = JsonResponse(result)
+    response['X-Search-Cache'] = cache_status
+    return response
+
+
+@require_safe
+def search_api_stats(request: HttpRequest) -> HttpResponse:
+    """Return the search results cache hit ratio and size, only to staff."""
+    if not request.user.is_staff:
+        return JsonResponse({'message': 'Forbidden'}, status=403)
+    return JsonResponse(
+        {'cache': search_results_cache.get_stats(), 'client': dict(search_client.counters)}
+    )
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.9 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+from common.upload_paths import get_source_hash
+
+
+def _fill_source_hashes(apps, schema_editor):
+    for model_name in ('StaticAsset', 'VideoVariation'):
+        model = apps.get_model('static_assets', model_name)
+        to_update = []
+        for instance in model.objects.exclude(source='').only('pk', 'source').iterator():
+            instance.source_hash = get_source_hash(instance.source.name)
+            if instance.source_hash:
+                to_update.append(instance)
+        model.objects.bulk_update(to_update, fields=['source_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('static_assets', '0012_allow_blank_license'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='staticasset',
+            name='source_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='videovariation',
+            name='source_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=32),
+        ),
+        migrations.RunPython(_fill_source_hashes, reverse_code=migrations.RunPython.noop),
+    ]
@@ -14,7 +14,7 @@ from django.utils.text import slugify
 import looper.model_mixins
 
 from common import mixins
-from common.upload_paths import get_upload_to_hashed_path
+from common.upload_paths import get_source_hash, get_upload_to_hashed_path
 from static_assets.models import License
 from static_assets.tasks import create_video_processing_job, create_video_transcribing_job
 import common.storage
@@ -28,6 +28,17 @@ def _get_default_license_id() -> Optional[int]:
     return cc_by.pk if cc_by else None
 
 
+def _sync_source_hash(instance: models.Model) -> None:
+    """Update the hash of a saved instance's source path, if it has changed.
+
+    Names of new uploads only become hashed paths while the instance is being saved.
+    """
+    source_hash = get_source_hash(instance.source.name)
+    if source_hash != instance.source_hash:
+        instance.source_hash = source_hash
+        type(instance).objects.filter(pk=instance.pk).update(source_hash=source_hash)
+
+
 class StaticAssetFileTypeChoices(models.TextChoices):
     file = 'file', 'File'
     image = 'image', 'Image'
@@ -50,6 +61,8 @@ class StaticAsset(
         blank=True,
         max_length=256,
     )
+    # Hash in the path of the source, to look up static assets by their path in CDN logs etc
+    source_hash = models.CharField(max_length=32, blank=True, db_index=True, editable=False)
     source_type = models.CharField(
         choices=StaticAssetFileTypeChoices.choices,
         max_length=5,
@@ -173,6 +186,7 @@ class StaticAsset(
         created = self.pk is None
         self.full_clean()
         self.save_and_record_changes(*args, **kwargs)
+        _sync_source_hash(self)
         if not created:
             return
         # Create related tables for video or image
@@ -317,12 +331,18 @@ class VideoVariation(models.Model):
     width = models.PositiveIntegerField(blank=True, null=True)
     resolution_label = models.CharField(max_length=32, blank=True)
     source = models.FileField(upload_to=get_upload_to_hashed_path, blank=True, max_length=256)
+    source_hash = models.CharField(max_length=32, blank=True, db_index=True, editable=False)
     size_bytes = models.BigIntegerField(editable=False)
     content_type = models.CharField(max_length=256, blank=True)
 
     def __str__(self) -> str:
         return f"Video variation for {self.video.static_asset.original_filename}"
 
+    def save(self, *args, **kwargs):
+        """Save the variation, then its source hash, which is only known once it's saved."""
+        super().save(*args, **kwargs)
+        _sync_source_hash(self)
+
     @property
     def content_disposition(self) -> Optional[str]:
         """Try to get a human-readable file name for Content-Disposition header."""
@@ -118,3 +118,23 @@ class TestStaticAssetModel(TestCase):
         self.assertEqual(res.status_code, 302)
         self.assertTrue('path/to/video-variation-1080p.mp4' in res['Location'])
         self.assertFalse('login' in res['Location'])
+
+    @patch('static_assets.views.is_free_static_asset', Mock(return_value=True))
+    def test_source_hash_used_in_download_url(self):
+        source_hash = '60aaaae7629fdb4d40621e677c029cc0'
+        video_variation = VideoVariationFactory(
+            source=f'60/{source_hash}/{source_hash}-1080p.mp4',
+            video=StaticAssetFactory(
+                source_type='video', source=f'60/{source_hash}/{source_hash}.mp4'
+            ).video,
+        )
+        static_asset = video_variation.video.static_asset
+
+        self.assertEqual(static_asset.source_hash, source_hash)
+        self.assertEqual(video_variation.source_hash, source_hash)
+        self.assertEqual(StaticAssetFactory(source='path/to/file.blend').source_hash, '')
+
+        self.client.force_login(UserFactory())
+        res = self.client.get(static_asset.download_url)
+        self.assertEqual(res.status_code, 302)
+        self.assertTrue(f'{source_hash}-1080p.mp4' in res['Location'])
@@ -16,6 +16,7 @@ from django.views.decorators.csrf import csrf_exempt
 import requests
 
 from common.storage import get_s3_url
+from common.upload_paths import get_source_hash
 from common.queries import has_active_subscription, is_free_static_asset
 from static_assets.models.progress import UserVideoProgress
 from static_assets.models import Video, VideoTrack, StaticAsset
@@ -104,10 +105,16 @@ def video_track_view(request, pk: int, path: str):
 @require_GET
 def download_view(request, source: str):
     """Redirect to a storage URL of the given source file, if found in static assets."""
+    # Filter by the indexed hash of the source path first, if it's a hashed one
+    source_hash = get_source_hash(source)
     try:
-        static_asset = get_object_or_404(StaticAsset, source=source)
+        static_asset = get_object_or_404(StaticAsset, source_hash=source_hash, source=source)
     except Http404:
-        static_asset = get_object_or_404(StaticAsset, video__variations__source=source)
+        static_asset = get_object_or_404(
+            StaticAsset,
+            video__variations__source_hash=source_hash,
+            video__variations__source=source,
+        )
     can_dowload = has_active_subscription(request.user) or is_free_static_asset(static_asset.pk)
     if not can_dowload:
         raise Http404()
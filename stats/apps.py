@@ -1,5 +1,10 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 
 class StatsConfig(AppConfig):
     name = 'stats'
+
+    def ready(self) -> None:
+        # Register the metrics declared by the apps, see stats.metrics
+        autodiscover_modules('metrics')
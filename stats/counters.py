@@ -0,0 +1,92 @@
+"""Apply increments to the view and download counters of static assets."""
+from datetime import date
+from typing import Iterable, Mapping, Tuple, Union
+import itertools
+
+from django.db import connection
+
+BATCH_SIZE = 500
+COUNTER_FIELDS = {'view_count', 'download_count'}
+
+
+def increment_counters(
+    to_field: str, deltas: Union[Mapping[int, int], Iterable[Tuple[int, int]]]
+) -> int:
+    """Add the given deltas to a counter field of static assets, by static asset ID.
+
+    Counters are incremented by the database, as with `F(to_field) + delta`, with a single
+    `UPDATE ... FROM (VALUES ...)` per batch of static assets, so increments made at the same
+    time by other processes are not lost, and the rows don't have to be loaded first.
+    IDs of static assets that don't exist are ignored.
+
+    Returns:
+        The number of updated static assets.
+    """
+    from static_assets.models import StaticAsset
+
+    assert to_field in COUNTER_FIELDS, f'{to_field} is not a counter field'
+    if isinstance(deltas, Mapping):
+        deltas = deltas.items()
+    # Sorted, so that concurrent updates lock the rows in the same order
+    deltas = sorted((int(pk), int(delta)) for pk, delta in deltas if delta)
+
+    table = connection.ops.quote_name(StaticAsset._meta.db_table)
+    column = connection.ops.quote_name(StaticAsset._meta.get_field(to_field).column)
+    updated = 0
+    with connection.cursor() as cursor:
+        deltas_iter = iter(deltas)
+        while True:
+            batch = list(itertools.islice(deltas_iter, BATCH_SIZE))
+            if not batch:
+                break
+            placeholders = ', '.join(['(%s, %s)'] * len(batch))
+            cursor.execute(
+                f"""
+                UPDATE {table} AS static_asset SET {column} = static_asset.{column} + v.delta
+                FROM (VALUES {placeholders}) AS v (id, delta)
+                WHERE static_asset.id = v.id
+                """,
+                list(itertools.chain.from_iterable(batch)),
+            )
+            updated += cursor.rowcount
+    return updated
+
+
+def increment_daily_counts(to_field: str, deltas: Iterable[Tuple[int, date, int]]) -> int:
+    """Add the given deltas to the daily counts of static assets, by static asset ID and day.
+
+    Daily counts that don't exist yet are created, with a single `INSERT ... ON CONFLICT`
+    per batch, so increments made at the same time by other processes are not lost.
+
+    Returns:
+        The number of inserted or updated daily counts.
+    """
+    from stats.models import StaticAssetDailyCount
+
+    assert to_field in COUNTER_FIELDS, f'{to_field} is not a counter field'
+    deltas = sorted((int(pk), day, int(delta)) for pk, day, delta in deltas if delta)
+
+    quote_name = connection.ops.quote_name
+    table = quote_name(StaticAssetDailyCount._meta.db_table)
+    column = quote_name(StaticAssetDailyCount._meta.get_field(to_field).column)
+    (other_field,) = COUNTER_FIELDS - {to_field}
+    other_column = quote_name(StaticAssetDailyCount._meta.get_field(other_field).column)
+    updated = 0
+    with connection.cursor() as cursor:
+        deltas_iter = iter(deltas)
+        while True:
+            batch = list(itertools.islice(deltas_iter, BATCH_SIZE))
+            if not batch:
+                break
+            placeholders = ', '.join(['(%s, %s, %s, 0)'] * len(batch))
+            cursor.execute(
+                f"""
+                INSERT INTO {table} AS daily_count
+                (static_asset_id, date, {column}, {other_column}) VALUES {placeholders}
+                ON CONFLICT (static_asset_id, date)
+                DO UPDATE SET {column} = daily_count.{column} + EXCLUDED.{column}
+                """,
+                list(itertools.chain.from_iterable(batch)),
+            )
+            updated += cursor.rowcount
+    return updated
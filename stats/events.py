@@ -0,0 +1,273 @@
+"""Buffered recording of static asset views and downloads.
+
+Instead of an INSERT on every request, events are appended to an in-process buffer, where
+repeated events of the same visitor are merged, and a background thread inserts them in large
+batches every FLUSH_INTERVAL seconds, or as soon as FLUSH_SIZE events are waiting.
+Events carry the time of the visit, which records are dated with, however late they are inserted.
+
+Every event is also appended to a spool file before it is buffered, so that events which
+were not inserted yet survive a crash of the process. Each process holds an exclusive lock
+on its spool files, and the first process to record an event after a crash replays the
+spool files that nobody holds a lock on anymore. Spool files are not fsync'ed: events are
+safe from a crash of the process, not from a crash of the whole machine.
+"""
+from pathlib import Path
+from typing import Any, Dict, IO, Iterable, List, NamedTuple, Optional, Tuple
+import atexit
+import datetime
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+log = logging.getLogger(__name__)
+FLUSH_SIZE = 1000
+FLUSH_INTERVAL = 5  # seconds
+BATCH_SIZE = 1000
+
+
+class Event(NamedTuple):
+    """A view or a download of a static asset, by a user or an anonymous IP address."""
+
+    model_name: str
+    static_asset_id: int
+    user_id: Optional[int]
+    ip_address: Optional[str]
+    # POSIX time of the visit, missing from events spooled by older versions
+    timestamp: Optional[float] = None
+
+    @property
+    def key(self) -> Tuple[str, int, Optional[int], Optional[str]]:
+        """Identify the event without its time: repeated visits of a visitor share their key."""
+        return self.model_name, self.static_asset_id, self.user_id, self.ip_address
+
+    @property
+    def date_created(self) -> datetime.datetime:
+        """Return the time of the visit, or now if it's unknown."""
+        if self.timestamp is None:
+            return timezone.now()
+        return datetime.datetime.fromtimestamp(self.timestamp, tz=datetime.timezone.utc)
+
+
+def insert_events(events: Iterable[Event]) -> None:
+    """Insert the events, ignoring the ones of visitors already recorded for a static asset."""
+    by_model: Dict[str, List[Event]] = {}
+    for event in events:
+        by_model.setdefault(event.model_name, []).append(event)
+    for model_name, model_events in by_model.items():
+        model = apps.get_model('stats', model_name)
+        model.objects.bulk_create(
+            [
+                model(
+                    static_asset_id=event.static_asset_id,
+                    user_id=event.user_id,
+                    ip_address=event.ip_address,
+                    date_created=event.date_created,
+                )
+                for event in model_events
+            ],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+class _Spool:
+    """An append-only file of events, locked by the process writing to it."""
+
+    def __init__(self, path: Path, file: IO[str]):  # noqa: D107
+        self.path = path
+        self.file = file
+
+    @classmethod
+    def create(cls, spool_dir: Path) -> '_Spool':
+        path = spool_dir / f'{uuid.uuid4().hex}.spool'
+        file = open(path, 'a+')
+        fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return cls(path, file)
+
+    @classmethod
+    def claim_orphan(cls, path: Path) -> Optional['_Spool']:
+        """Lock a spool file of a process that has stopped, or return None if it's in use."""
+        try:
+            file = open(path, 'a+')
+        except FileNotFoundError:  # replayed by another process in the meantime
+            return None
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            file.close()
+            return None
+        if not path.exists():  # replayed and deleted before we got the lock
+            file.close()
+            return None
+        return cls(path, file)
+
+    def append(self, event: Event) -> None:
+        self.file.write(json.dumps(event) + '\n')
+        self.file.flush()
+
+    def read(self) -> List[Event]:
+        self.file.seek(0)
+        events = []
+        for line in self.file:
+            try:
+                events.append(Event(*json.loads(line)))
+            except (ValueError, TypeError):  # a partly written line, when the process crashed
+                log.warning('Skipping a malformed line in %s: %r', self.path, line)
+        return events
+
+    def delete(self) -> None:
+        self.path.unlink()
+        self.file.close()
+
+
+class EventBuffer:
+    """Buffers events in memory and in a spool file, and inserts them in the background."""
+
+    def __init__(
+        self,
+        flush_size: int = FLUSH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        spool_dir: Optional[Path] = None,
+        background: bool = True,
+    ):
+        """Configure the buffer, it is started on the first recorded event.
+
+        Without `background`, events are only inserted by calling `flush`.
+        """
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.spool_dir = spool_dir
+        self.background = background
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid: Optional[int] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        # Buffered events by their key, only the first visit of a visitor is kept
+        self._events: Dict[Tuple[Any, ...], Event] = {}
+        self._spool: Optional[_Spool] = None
+        # Spool files of the buffered events, deleted once the events are inserted
+        self._pending_spools: List[_Spool] = []
+        self.counters = {'recorded': 0, 'duplicates': 0, 'flushes': 0, 'flushed': 0, 'failures': 0}
+        self.last_flush_seconds: Optional[float] = None
+        self.max_flush_seconds: Optional[float] = None
+        self.last_flush_at: Optional[float] = None
+
+    def _start(self) -> None:
+        """Open a spool file, replay orphaned ones and start the flusher thread.
+
+        Called with the lock held, also in a child process forked after it was started.
+        """
+        self._reset()
+        self._pid = os.getpid()
+        spool_dir = Path(self.spool_dir or settings.STATS_EVENTS_SPOOL_DIR)
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        for path in sorted(spool_dir.glob('*.spool')):
+            orphan = _Spool.claim_orphan(path)
+            if orphan is None:
+                continue
+            events = orphan.read()
+            log.info('Replaying %s events from %s', len(events), path)
+            for event in events:
+                self._events.setdefault(event.key, event)
+            self._pending_spools.append(orphan)
+        self._spool = _Spool.create(spool_dir)
+        self._pending_spools.append(self._spool)
+        if self.background:
+            thread = threading.Thread(target=self._run, name='stats-event-flusher', daemon=True)
+            thread.start()
+            atexit.register(self.flush)
+        if self._events:
+            self._wake.set()
+
+    def record(self, event: Event) -> None:
+        """Buffer an event, unless the same one is already waiting to be inserted."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+            self.counters['recorded'] += 1
+            if event.key in self._events:
+                self.counters['duplicates'] += 1
+                return
+            self._spool.append(event)
+            self._events[event.key] = event
+            if len(self._events) >= self.flush_size:
+                self._wake.set()
+
+    def flush(self) -> int:
+        """Insert all the buffered events now, returning how many were inserted."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._events or self._pid != os.getpid():
+                    return 0
+                events, self._events = self._events, {}
+                spools, self._pending_spools = self._pending_spools, []
+                # New events go to a new spool file, the current one is deleted after the flush
+                self._spool = _Spool.create(self._spool.path.parent)
+                self._pending_spools.append(self._spool)
+
+            start_t = time.monotonic()
+            try:
+                close_old_connections()
+                insert_events(events.values())
+            except Exception:
+                with self._lock:
+                    self.counters['failures'] += 1
+                    # Keep the events and their spool files around for the next flush
+                    self._events = {**self._events, **events}
+                    self._pending_spools = spools + self._pending_spools
+                raise
+            seconds = time.monotonic() - start_t
+            for spool in spools:
+                spool.delete()
+            with self._lock:
+                self.counters['flushes'] += 1
+                self.counters['flushed'] += len(events)
+                self.last_flush_seconds = seconds
+                self.max_flush_seconds = max(seconds, self.max_flush_seconds or 0)
+                self.last_flush_at = time.time()
+            return len(events)
+
+    def _run(self) -> None:
+        pid = os.getpid()
+        while self._pid == pid:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                log.exception('Unable to insert %s buffered events', len(self._events))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the buffer size, event counters and flush latencies."""
+        return {
+            'pid': self._pid,
+            'buffer_size': len(self._events),
+            'spool_files': len(self._pending_spools),
+            **self.counters,
+            'last_flush_seconds': self.last_flush_seconds,
+            'max_flush_seconds': self.max_flush_seconds,
+            'last_flush_at': self.last_flush_at,
+        }
+
+
+event_buffer = EventBuffer()
+
+
+def record_event(event: Event) -> None:
+    """Record a view or a download, buffered unless STATS_EVENTS_BUFFERED is off."""
+    if settings.STATS_EVENTS_BUFFERED:
+        event_buffer.record(event)
+    else:
+        insert_events([event])
@@ -1,11 +1,13 @@
 """Add download counts from CloudFront logs imported into postgresql."""
 # from pprint import pprint
+from collections import defaultdict
+from typing import Dict, Set
 import logging
 
 from django.core.management.base import BaseCommand
-from django.db.models import Q
 
-from static_assets.models.static_assets import StaticAsset
+from static_assets.models.static_assets import StaticAsset, VideoVariation
+from stats.counters import increment_counters
 
 logger = logging.getLogger('write_stats')
 logger.setLevel(logging.WARNING)
@@ -14,6 +16,19 @@ logger.setLevel(logging.WARNING)
 class Command(BaseCommand):
     """Do subj."""
 
+    def _get_source_hash_to_static_asset_ids(self) -> Dict[str, Set[int]]:
+        """Map hashes of source paths of static assets and their video variations to their IDs."""
+        source_hash_to_ids = defaultdict(set)
+        for source_hash, static_asset_id in StaticAsset.objects.exclude(source_hash='').values_list(
+            'source_hash', 'pk'
+        ):
+            source_hash_to_ids[source_hash].add(static_asset_id)
+        for source_hash, static_asset_id in VideoVariation.objects.exclude(
+            source_hash=''
+        ).values_list('source_hash', 'video__static_asset_id'):
+            source_hash_to_ids[source_hash].add(static_asset_id)
+        return source_hash_to_ids
+
     def _read_source_downloads(self):
         source_hash_to_count = {}
         with open('cf_source_download_counts.csv', 'r') as f:
@@ -23,58 +38,31 @@ class Command(BaseCommand):
                     count = int(line.split(';')[1].strip().replace('"', ''))
                 except ValueError:
                     logger.warning('Unable to parse %s', line)
+                    continue
                 if source_hash not in source_hash_to_count:
                     source_hash_to_count[source_hash] = count
                 else:
                     source_hash_to_count[source_hash] += count
-        total = len(source_hash_to_count)
-
-        seen_count = 0
-        for source_hash in sorted(source_hash_to_count.keys()):
-            try:
-                count = source_hash_to_count[source_hash]
-                try:
-                    static_asset_q = StaticAsset.objects.filter(
-                        Q(source__icontains=source_hash)
-                        | Q(video__variations__source__icontains=source_hash)
-                    )
-                    static_asset = static_asset_q.get()
-                    self._add_count(static_asset, count, source_hash)
-                except StaticAsset.DoesNotExist:
-                    pass
-                except StaticAsset.MultipleObjectsReturned:
-                    logger.error('Found multiple for %s: %s', source_hash, static_asset_q.all())
-                    for static_asset in static_asset_q:
-                        self._add_count(static_asset, count, source_hash)
 
-                seen_count += 1
-                if not seen_count % 500:
-                    logger.warning('%s%% (%s/%s)', int(seen_count / total * 100), seen_count, total)
-                    self._update()
-            except Exception:
-                logger.exception('Stopped at %s', source_hash)
-                raise
-
-        self._update()
-
-    def _add_count(self, static_asset, count, source_hash):
-        logger.info(
-            '%s: %s download_count %s -> %s',
-            source_hash,
-            static_asset,
-            static_asset.download_count,
-            static_asset.download_count + count,
-        )
-        static_asset.download_count += count
-        self.to_update.append(static_asset)
+        source_hash_to_ids = self._get_source_hash_to_static_asset_ids()
+        static_asset_id_to_count = defaultdict(int)
+        for source_hash, count in sorted(source_hash_to_count.items()):
+            static_asset_ids = source_hash_to_ids.get(source_hash)
+            if not static_asset_ids:
+                continue
+            if len(static_asset_ids) > 1:
+                logger.error('Found multiple for %s: %s', source_hash, sorted(static_asset_ids))
+            for static_asset_id in static_asset_ids:
+                static_asset_id_to_count[static_asset_id] += count
 
-    def _update(self):
-        StaticAsset.objects.bulk_update(
-            self.to_update, fields={'date_updated', 'download_count'}, batch_size=500
+        updated = increment_counters('download_count', static_asset_id_to_count)
+        logger.warning(
+            'Added %s downloads of %s source hashes to %s static assets',
+            sum(static_asset_id_to_count.values()),
+            len(source_hash_to_count),
+            updated,
         )
-        self.to_update = []
 
     def handle(self, *args, **options):
         """Do subj."""
-        self.to_update = []
         self._read_source_downloads()
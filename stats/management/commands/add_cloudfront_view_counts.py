@@ -1,12 +1,13 @@
 """Aggregate views/downloads from CloudFront logs imported into postgresql."""
 # from pprint import pprint
+from collections import defaultdict
 import logging
 
 from django.core.management.base import BaseCommand
 
-from static_assets.models.static_assets import StaticAsset
-from training.models.sections import Section
 from films.models.assets import Asset
+from stats.counters import increment_counters
+from training.models.sections import Section
 
 logger = logging.getLogger('write_stats')
 logger.setLevel(logging.DEBUG)
@@ -30,29 +31,18 @@ class Command(BaseCommand):
                     count = int(line.split(';')[1].strip().replace('"', ''))
                 except ValueError:
                     logger.warning('Unable to parse %s', line)
+                    continue
                 if asset_id not in asset_id_to_count:
                     asset_id_to_count[asset_id] = count
                 else:
                     asset_id_to_count[asset_id] += count
 
-        to_update = []
-        for asset_id, count in asset_id_to_count.items():
-            asset_q = Asset.objects.filter(pk=asset_id)
-            if not asset_q.exists():
-                continue
-            asset = asset_q.get()
-            static_asset = asset.static_asset
-            logger.info(
-                '%s: %s view_count %s -> %s',
-                asset_id,
-                static_asset,
-                static_asset.view_count,
-                static_asset.view_count + count,
-            )
-            static_asset.view_count += count
-            to_update.append(static_asset)
-
-        self._update(to_update)
+        static_asset_id_to_count = defaultdict(int)
+        for asset_id, static_asset_id in Asset.objects.filter(
+            pk__in=list(asset_id_to_count)
+        ).values_list('pk', 'static_asset_id'):
+            static_asset_id_to_count[static_asset_id] += asset_id_to_count[asset_id]
+        self._update(static_asset_id_to_count)
 
     def _read_training_section_view_counts(self):
         section_slug_to_count = {}
@@ -64,36 +54,26 @@ class Command(BaseCommand):
                     count = int(line.split(';')[1].strip().replace('"', ''))
                 except ValueError:
                     logger.warning('Unable to parse %s', line)
+                    continue
                 if section_slug not in section_slug_to_count:
                     section_slug_to_count[section_slug] = count
                 else:
                     section_slug_to_count[section_slug] += count
 
-        to_update = []
-        for section_slug, count in section_slug_to_count.items():
-            section_q = Section.objects.filter(slug=section_slug)
-            if not section_q.exists():
-                continue
-            section = section_q.get()
-            static_asset = section.static_asset
-            if not static_asset:
+        static_asset_id_to_count = defaultdict(int)
+        for section_slug, static_asset_id in Section.objects.filter(
+            slug__in=list(section_slug_to_count)
+        ).values_list('slug', 'static_asset_id'):
+            if not static_asset_id:
                 logger.warning('%s: no static asset', section_slug)
                 continue
-            logger.info(
-                '%s: %s view_count %s -> %s',
-                section_slug,
-                static_asset,
-                static_asset.view_count,
-                static_asset.view_count + count,
-            )
-            static_asset.view_count += count
-            to_update.append(static_asset)
-
-        self._update(to_update)
+            static_asset_id_to_count[static_asset_id] += section_slug_to_count[section_slug]
+        self._update(static_asset_id_to_count)
 
-    def _update(self, to_update):
-        StaticAsset.objects.bulk_update(
-            to_update, fields={'date_updated', 'view_count'}, batch_size=500
+    def _update(self, static_asset_id_to_count):
+        updated = increment_counters('view_count', static_asset_id_to_count)
+        logger.info(
+            'Added %s views to %s static assets', sum(static_asset_id_to_count.values()), updated
         )
 
     def handle(self, *args, **options):
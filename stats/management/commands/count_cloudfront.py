@@ -1,5 +1,6 @@
 """Aggregate views/downloads from CloudFront logs imported into postgresql."""
 # from pprint import pprint
+from datetime import date
 import logging
 
 from django.conf import settings
@@ -7,6 +8,8 @@ from django.core.management.base import BaseCommand
 from django.utils.text import slugify
 import psycopg2
 
+from stats import visitor_sketches
+
 logger = logging.getLogger('write_stats')
 logger.setLevel(logging.DEBUG)
 TABLE_NAME = 'cflogs'
@@ -20,7 +23,10 @@ film_asset_id = """
 split_part(
     split_part(split_part(csreferer, '.org/', 2), '?asset=', 2), '&', 1) as film_asset_id
 """
-common_filters = """
+# Filled in by the command: lets Postgres skip the partitions outside of the given dates
+date_filter = "and date >= '{since}' and date < '{until}'"
+common_filters = f"""
+{date_filter}
 and cs_method = 'GET'
 and csreferer not like '%studio.local%'
 and sc_status = 200
@@ -79,6 +85,43 @@ def _cf_field_to_table(value: str) -> str:
 class Command(BaseCommand):
     """Do subj."""
 
+    def add_arguments(self, parser):
+        """Add command options."""
+        parser.add_argument(
+            '--since',
+            type=date.fromisoformat,
+            metavar='YYYY-MM-DD',
+            help='Only count the logs of this date or later.',
+        )
+        parser.add_argument(
+            '--until',
+            type=date.fromisoformat,
+            metavar='YYYY-MM-DD',
+            help='Only count the logs before this date.',
+        )
+        parser.add_argument(
+            '--from-sketches',
+            action='store_true',
+            help=(
+                'Merge the unique visitor sketches built by import_cloudfront_logs instead of '
+                'querying the raw logs. Much faster, but counts are estimates, see '
+                'stats.hyperloglog for their error bound.'
+            ),
+        )
+
+    def _fetch(self, q: str, kind: str):
+        """Return (key, count) of unique visitors, by largest count first."""
+        if self.from_sketches:
+            logger.info('Merging %s sketches', kind)
+            counts = visitor_sketches.get_unique_visitor_counts(
+                self.cursor, kind, self.since, self.until
+            )
+            return sorted(counts.items(), key=lambda item: item[1], reverse=True)
+        q = q.format(since=self.since, until=self.until)
+        logger.info('Running the following q: %s', q)
+        self.cursor.execute(q)
+        return self.cursor.fetchall()
+
     def _connect(self):
         dbname = settings.DATABASES['default']['NAME']
         user = settings.DATABASES['default']['USER']
@@ -87,37 +130,32 @@ class Command(BaseCommand):
         self.cursor = self.connection.cursor()
 
     def _write_film_asset_view_counts(self):
-        logger.info('Running the following q: %s', asset_visits_q)
-        self.cursor.execute(asset_visits_q)
-
+        res = self._fetch(asset_visits_q, visitor_sketches.ASSET_VIEWS)
         with open('cf_film_asset_view_counts.csv', 'w+') as f:
-            res = self.cursor.fetchall()
             logger.info('Writing results into %s', f.name)
             for pk, view_count in res:
                 f.write(f'"{pk}";"{view_count}"\n')
 
     def _write_training_section_view_counts(self):
-        logger.info('Running the following q: %s', section_visits_q)
-        self.cursor.execute(section_visits_q)
-
+        res = self._fetch(section_visits_q, visitor_sketches.SECTION_VIEWS)
         with open('cf_training_section_view_counts.csv', 'w+') as f:
-            res = self.cursor.fetchall()
             logger.info('Writing results into %s', f.name)
             for endpoint, view_count in res:
                 f.write(f'"{endpoint}";"{view_count}"\n')
 
     def _write_source_downloads(self):
-        logger.info('Running the following q: %s', source_downloads_q)
-        self.cursor.execute(source_downloads_q)
-
+        res = self._fetch(source_downloads_q, visitor_sketches.SOURCE_DOWNLOADS)
         with open('cf_source_download_counts.csv', 'w+') as f:
-            res = self.cursor.fetchall()
             logger.info('Writing results into %s', f.name)
             for source_hash, download_count in res:
                 f.write(f'"{source_hash}";"{download_count}"\n')
 
     def handle(self, *args, **options):
         """Do subj."""
+        # Dates come from date.fromisoformat, so they are safe to format into the queries
+        self.since = options['since'] or '-infinity'
+        self.until = options['until'] or 'infinity'
+        self.from_sketches = options['from_sketches']
         self._connect()
 
         self._write_film_asset_view_counts()
@@ -1,30 +1,48 @@
 """
 Import CloudFront logs into postgresql.
 
-Use the following command to the info about progress and ETA:
+Log files are spread across a pool of worker processes, each with its own database connection.
+Every line is split once, and its values are picked by a column projection computed from the
+`#Fields` header of the file. Rows are streamed into the table with `COPY ... FROM STDIN`,
+one `COPY` per file.
+
+Every imported file is recorded in a manifest table with its size, checksum and row count, in
+the same transaction as its rows, so that re-runs only read new or resized files. The logs
+table is partitioned by month of `date`: old partitions can be dropped with `--drop-before`,
+or detached by hand, without scanning the rest of the table.
+
+Unique visitors are counted into HyperLogLog sketches while parsing, see
+`stats.visitor_sketches`. With `--skip-raw`, only the sketches are kept.
+
+Use the following command to the info about progress, ETA and throughput of each worker:
     kill -SIGUSR1 $(ps aux | grep import_cloud | grep -v grep | awk '{print $2}')
 """
-# from pprint import pprint
-from datetime import timedelta, datetime
+from datetime import date, timedelta, datetime
+from multiprocessing import Pool
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+import collections
 import gzip
+import hashlib
 import logging
 import os
 import os.path
+import re
 import signal
 import time
 
 from django.conf import settings
-from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
 from django.utils.text import slugify
-from psycopg2.extras import execute_values
 import psycopg2
 
+from stats import visitor_sketches
+
 logger = logging.getLogger('write_stats')
 logger.setLevel(logging.DEBUG)
-User = get_user_model()
-BATCH_SIZE = 5000
 TABLE_NAME = 'cflogs'
+MANIFEST_TABLE_NAME = 'cflogs_files'
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_PATH = '../cloudfront-logs/cloudfront'
 varchar_len_max = 2000
 field_defs = {
     # contains comma-separated IPs sometimes, cannot use cidr
@@ -63,72 +81,388 @@ field_defs = {
     'x-forwarded-for': f'VARCHAR({varchar_len_max})',
     'x-host-header': f'VARCHAR({varchar_len_max})',
 }
+# Fields logged in seconds, stored in milliseconds
+seconds_fields = {'time-taken', 'time-to-first-byte'}
+# Characters that have a special meaning in COPY's text format
+copy_escapes = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
 
 
 def _cf_field_to_table(value: str) -> str:
     return slugify(value.replace('-', '_'))
 
 
+def _max_length(datatype: str) -> Optional[int]:
+    match = re.match(r'VARCHAR\((\d+)\)', datatype)
+    return int(match.group(1)) if match else None
+
+
+class Projection(NamedTuple):
+    """Which values of a split log line go into which table columns, in the same order."""
+
+    columns: List[str]
+    # For each column: index of its value in a split line, max length, is it in seconds
+    values: List[Tuple[int, Optional[int], bool]]
+    status_index: int
+    # Index of each field that the visitor sketches need, in a split line
+    sketch_fields: List[Tuple[str, int]]
+
+
+def get_projection(fields: List[str]) -> Projection:
+    """Compute the column projection of lines with the given fields, from a `#Fields` header."""
+    columns, values, sketch_fields = [], [], []
+    for index, field in enumerate(fields):
+        if field in visitor_sketches.FIELDS:
+            sketch_fields.append((field, index))
+        if field not in field_defs:
+            continue
+        columns.append(_cf_field_to_table(field))
+        values.append((index, _max_length(field_defs[field]), field in seconds_fields))
+    return Projection(
+        columns=columns,
+        values=values,
+        status_index=fields.index('sc-status'),
+        sketch_fields=sketch_fields,
+    )
+
+
+def split_line(line: bytes, projection: Projection) -> Optional[List[bytes]]:
+    """Split a log line into its values, or return None if it shouldn't be imported."""
+    parts = line.rstrip(b'\r\n').split(b'\t')
+    if parts[projection.status_index] != b'200':
+        return None
+    return parts
+
+
+def format_row(parts: List[bytes], projection: Projection, extra_values: Sequence[str] = ()) -> str:
+    """Turn the values of a log line into a row in COPY's text format.
+
+    Given extra values are appended to the row as they are.
+    """
+    row = []
+    for index, max_length, in_seconds in projection.values:
+        v = parts[index].decode()
+        if v == '-':
+            row.append('\\N')
+        elif in_seconds:
+            row.append(str(round(float(v) * 1000)))
+        elif max_length:
+            row.append(v[:max_length].translate(copy_escapes))
+        else:
+            row.append(v)
+    row.extend(extra_values)
+    return '\t'.join(row) + '\n'
+
+
+def parse_line(
+    line: bytes, projection: Projection, extra_values: Sequence[str] = ()
+) -> Optional[str]:
+    """Turn a log line into a row in COPY's text format, or None if it shouldn't be imported."""
+    parts = split_line(line, projection)
+    return None if parts is None else format_row(parts, projection, extra_values)
+
+
+def get_sketch_values(parts: List[bytes], projection: Projection) -> Dict[str, Optional[str]]:
+    """Return the values of a split log line that the visitor sketches need, by field."""
+    values = {}
+    for field, index in projection.sketch_fields:
+        v = parts[index].decode()
+        values[field] = None if v == '-' else v
+    return values
+
+
+class _RowStream:
+    """A read-only file-like object over rows, for `copy_expert` to pull from as it goes."""
+
+    def __init__(self, rows: Iterable[str]):  # noqa: D107
+        self._rows = iter(rows)
+        self._buffer = ''
+
+    def read(self, size: int = -1) -> str:
+        """Return at most `size` characters, or all of the remaining ones if it's negative."""
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            chunks.append(row)
+            length += len(row)
+        data = ''.join(chunks)
+        if size < 0:
+            self._buffer = ''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+class FileResult(NamedTuple):
+    """What a worker did with a single log file."""
+
+    worker: int
+    file_path: str
+    lines: int
+    rows: int
+    seconds: float
+    skipped: bool = False
+
+
+# Per-process database connection of the pool's workers
+_worker_connection = None
+
+
+def _get_dsn() -> str:
+    dbname = settings.DATABASES['default']['NAME']
+    user = settings.DATABASES['default']['USER']
+    password = settings.DATABASES['default']['PASSWORD']
+    return f'dbname={dbname} user={user} password={password}'
+
+
+def _init_worker(dsn: str) -> None:
+    global _worker_connection
+    # Let the main process handle the signals
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for signalnum in (signal.SIGHUP, signal.SIGUSR1, signal.SIGUSR2):
+        signal.signal(signalnum, signal.SIG_DFL)
+    _worker_connection = psycopg2.connect(dsn)
+
+
+def get_file_date(file_name: str) -> Optional[date]:
+    """Return the date of a log file from its name, e.g. E2ABC.2021-08-01-10.ab12cd34.gz."""
+    match = re.search(r'\.(\d{4}-\d{2}-\d{2})-\d{2}\.', file_name)
+    return date.fromisoformat(match.group(1)) if match else None
+
+
+def get_checksum(file_path: str) -> str:
+    """Return the SHA-1 of the given file's contents."""
+    checksum = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def _read_rows(
+    lines: Iterator[bytes],
+    projection: Projection,
+    file_id: int,
+    sketches: visitor_sketches.VisitorSketches,
+    counts: Dict[str, int],
+):
+    extra_values = (str(file_id),)
+    for line in lines:
+        counts['lines'] += 1
+        parts = split_line(line, projection)
+        if parts is None:
+            continue
+        counts['rows'] += 1
+        sketches.add(get_sketch_values(parts, projection))
+        yield format_row(parts, projection, extra_values)
+
+
+def _start_file(cursor, file_path: str, checksum: str) -> int:
+    """Record the file in the manifest, removing the rows of its previous import, if any."""
+    name = os.path.basename(file_path)
+    cursor.execute(
+        f"""
+        INSERT INTO {MANIFEST_TABLE_NAME} (name, size, checksum, row_count, date_imported)
+        VALUES (%s, %s, %s, 0, now())
+        ON CONFLICT (name) DO UPDATE
+        SET size = excluded.size, checksum = excluded.checksum, date_imported = now()
+        RETURNING id, (xmax != 0) AS is_update
+        """,
+        (name, os.path.getsize(file_path), checksum),
+    )
+    file_id, is_update = cursor.fetchone()
+    if is_update:
+        delete_q = f'DELETE FROM {TABLE_NAME} WHERE file_id = %s'
+        params = [file_id]
+        file_date = get_file_date(name)
+        if file_date:
+            # Let Postgres scan only the partitions the rows can be in
+            delete_q += ' AND date BETWEEN %s AND %s'
+            params += [file_date - timedelta(days=1), file_date + timedelta(days=1)]
+        cursor.execute(delete_q, params)
+    return file_id
+
+
+def import_file(
+    file_path: str,
+    imported_checksum: Optional[str] = None,
+    keep_raw: bool = True,
+    connection=None,
+) -> FileResult:
+    """Copy the rows of a single gzipped log file into the table, in a single transaction.
+
+    The file is skipped if its checksum is the same as the given checksum of its last import.
+    The manifest and the unique visitor sketches are updated in the same transaction,
+    so that a file is either fully imported and recorded, or not at all.
+    Only the sketches are updated if `keep_raw` is False.
+    """
+    connection = connection or _worker_connection
+    start_t = time.perf_counter()
+    counts = {'lines': 0, 'rows': 0}
+    checksum = get_checksum(file_path)
+    if checksum == imported_checksum:
+        return FileResult(os.getpid(), file_path, 0, 0, time.perf_counter() - start_t, True)
+
+    with gzip.open(file_path, 'r') as f, connection.cursor() as cursor:
+        lines = iter(f)
+        projection = None
+        for line in lines:
+            if line.startswith(b'#Fields'):
+                projection = get_projection(line.decode().split()[1:])
+                break
+        try:
+            file_id = _start_file(cursor, file_path, checksum)
+            if projection is not None:
+                sketches = visitor_sketches.VisitorSketches()
+                rows = _read_rows(lines, projection, file_id, sketches, counts)
+                if keep_raw:
+                    columns = ','.join(projection.columns + ['file_id'])
+                    copy_q = f'COPY {TABLE_NAME} ({columns}) FROM STDIN'
+                    cursor.copy_expert(copy_q, _RowStream(rows))
+                else:
+                    collections.deque(rows, maxlen=0)
+                sketches.save(cursor)
+            cursor.execute(
+                f'UPDATE {MANIFEST_TABLE_NAME} SET row_count = %s WHERE id = %s',
+                (counts['rows'], file_id),
+            )
+        except Exception:
+            connection.rollback()
+            logger.exception('Stopped at %s:%s', file_path, counts['lines'])
+            raise
+    connection.commit()
+    return FileResult(
+        worker=os.getpid(),
+        file_path=file_path,
+        lines=counts['lines'],
+        rows=counts['rows'],
+        seconds=time.perf_counter() - start_t,
+    )
+
+
+def _import_task(task: Tuple[str, Optional[str], bool]) -> FileResult:
+    return import_file(*task)
+
+
+def get_tasks(
+    path: str,
+    imported: Dict[str, Tuple[int, str]],
+    drop_before: Optional[date] = None,
+    keep_raw: bool = True,
+) -> Tuple[List[Tuple[str, Optional[str], bool]], Set[date], int]:
+    """Return the `import_file` arguments of the files to import, and the months they cover.
+
+    Files with the same name and size as in the manifest are not read at all, only new and
+    resized files are checksummed by `import_file`. Files are imported again regardless of
+    their size when their manifest checksum is cleared.
+    The number of unchanged files that were left out is returned as well.
+    """
+    tasks = []
+    months = set()
+    unchanged = 0
+    for _file in sorted(os.listdir(path)):
+        file_path = os.path.join(path, _file)
+        file_date = get_file_date(_file)
+        if file_date and drop_before and file_date < drop_before:
+            continue
+        imported_size, imported_checksum = imported.get(_file, (None, None))
+        if imported_checksum and imported_size == os.path.getsize(file_path):
+            unchanged += 1
+            continue
+        tasks.append((file_path, imported_checksum, keep_raw))
+        if file_date:
+            # Hourly files of the last day of a month can contain lines of the next one
+            months.update({_month_start(file_date), _next_month(file_date)})
+    return tasks, months, unchanged
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(day: date) -> date:
+    return (_month_start(day) + timedelta(days=32)).replace(day=1)
+
+
 class Command(BaseCommand):
     """Do subj."""
 
     files_handled = 0
-    table_fields = None
-    insert_q = None
-    data = []
+    files_skipped = 0
 
-    def _handle_line(self, line):
-        if line.startswith(b'#Version') or line.startswith(b'#Fields'):
-            return
-        values = {field: line.split(b'\t')[self.fields.index(field)] for field in self.fields}
-        status = values['sc-status']
-        if status != b'200':
-            return
+    def add_arguments(self, parser):
+        """Add command options."""
+        parser.add_argument('--path', default=DEFAULT_PATH, help='Directory with the log files.')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Number of worker processes, defaults to the number of CPUs.',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help=(
+                'Drop the imported logs, the manifest and the unique visitor sketches, '
+                'then import all the files again.'
+            ),
+        )
+        parser.add_argument(
+            '--skip-raw',
+            action='store_true',
+            help=(
+                'Only build the unique visitor sketches, without copying the log lines into '
+                f'{TABLE_NAME}. The counts of `count_cloudfront --from-sketches` are then '
+                'the only ones available.'
+            ),
+        )
+        parser.add_argument(
+            '--drop-before',
+            type=date.fromisoformat,
+            metavar='YYYY-MM-DD',
+            help=(
+                'Drop the monthly partitions with logs older than the given date. '
+                'Their files stay in the manifest, so they are not imported again.'
+            ),
+        )
 
-        q_values = []
-        for k in self.fields:
-            if k not in field_defs:
-                continue
-            v = values[k].decode()
-            if v in ('-', '-\n'):
-                v = None
-            elif k in ('time-taken', 'time-to-first-byte'):
-                v = float(v) + 1000
-            else:
-                v = v[:varchar_len_max]
-            q_values.append(v)
-        self.data.append(q_values)
-
-        if len(self.data) > BATCH_SIZE:
-            assert all(
-                len(_) == len(self.table_fields) for _ in self.data
-            ), f'{len(self.data[0])} == {len(self.table_fields)}'
-            # pprint(self.data)
-            execute_values(self.cursor, self.insert_q, self.data)
-            self.connection.commit()
-            self.data = []
-
-    def _handle_gz(self, file_path):
-        self.line_count = 0
-        with gzip.open(file_path, 'r') as f:
-            for line in f:
-                if line.startswith(b'#Fields'):
-                    if not self.table_fields:
-                        self.fields = line.decode().split()[1:]
-                        self.table_fields = [
-                            _cf_field_to_table(f) for f in self.fields if f in field_defs
-                        ]
-                        # placeholders = ','.join(['%s'] * len(self.table_fields))
-                        self.insert_q = (
-                            f"INSERT INTO cflogs ({','.join(self.table_fields)}) VALUES %s"
-                        )
-                    continue
-                self._handle_line(line)
-                self.line_count += 1
+    def _record(self, result: FileResult):
         self.files_handled += 1
+        if result.skipped:
+            self.files_skipped += 1
+            return
+        worker = self.workers.setdefault(
+            result.worker, {'files': 0, 'lines': 0, 'rows': 0, 'seconds': 0.0}
+        )
+        worker['files'] += 1
+        worker['lines'] += result.lines
+        worker['rows'] += result.rows
+        worker['seconds'] += result.seconds
 
     def _print_summary(self):
-        logger.info('Files handled: %s/%s', self.files_handled, self.files_total)
+        logger.info(
+            'Files handled: %s/%s, %s unchanged since the last import',
+            self.files_handled,
+            self.files_total,
+            self.files_skipped,
+        )
+        for pid, worker in sorted(self.workers.items()):
+            logger.info(
+                'Worker %s: %s files, %s lines, %s rows, %.0f lines/s, %.0f rows/s',
+                pid,
+                worker['files'],
+                worker['lines'],
+                worker['rows'],
+                worker['lines'] / worker['seconds'] if worker['seconds'] else 0,
+                worker['rows'] / worker['seconds'] if worker['seconds'] else 0,
+            )
+        elapsed = time.time() - self.start_t
+        total_rows = sum(worker['rows'] for worker in self.workers.values())
+        logger.info(
+            'Total: %s rows in %.0fs, %.0f rows/s', total_rows, elapsed, total_rows / elapsed
+        )
         try:
             eta = timedelta(
                 seconds=(
@@ -145,33 +479,126 @@ class Command(BaseCommand):
         except Exception:
             pass
 
-    def _drop_table(self):
-        self.cursor.execute(f"DROP TABLE IF EXISTS {TABLE_NAME};")
+    def _drop_tables(self):
+        self.cursor.execute(
+            f"DROP TABLE IF EXISTS {TABLE_NAME}, {MANIFEST_TABLE_NAME}, "
+            f"{visitor_sketches.SKETCHES_TABLE_NAME};"
+        )
         self.connection.commit()
 
-    def _create_table(self):
-        dbname = settings.DATABASES['default']['NAME']
-        user = settings.DATABASES['default']['USER']
-        password = settings.DATABASES['default']['PASSWORD']
-        self.connection = psycopg2.connect(f'dbname={dbname} user={user} password={password}')
+    def _create_tables(self, rebuild: bool):
+        self.connection = psycopg2.connect(_get_dsn())
         self.cursor = self.connection.cursor()
 
-        self._drop_table()
+        self.cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", (TABLE_NAME,))
+        row = self.cursor.fetchone()
+        if rebuild or (row and row[0] != 'p'):
+            # Tables imported without a manifest cannot be resumed, start over
+            self._drop_tables()
 
         fields = ','.join(
             [_cf_field_to_table(name) + ' ' + datatype for name, datatype in field_defs.items()]
+            + ['file_id integer']
+        )
+        self.cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {TABLE_NAME} ({fields}) PARTITION BY RANGE (date);"
+        )
+        # Lines without a date, or with a date outside of the monthly partitions
+        self.cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {TABLE_NAME}_default PARTITION OF {TABLE_NAME} DEFAULT;"
+        )
+        self.cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE_NAME} (
+                id serial PRIMARY KEY,
+                name VARCHAR(256) NOT NULL UNIQUE,
+                size bigint NOT NULL,
+                checksum CHAR(40) NOT NULL,
+                row_count bigint NOT NULL,
+                date_imported timestamp with time zone NOT NULL
+            );
+            """
+        )
+        self.cursor.execute(
+            "SELECT to_regclass(%s) IS NULL", (visitor_sketches.SKETCHES_TABLE_NAME,)
+        )
+        if self.cursor.fetchone()[0]:
+            # Files imported before there were sketches must be imported again to build them
+            self.cursor.execute(f"UPDATE {MANIFEST_TABLE_NAME} SET checksum = '';")
+        self.cursor.execute(visitor_sketches.SKETCHES_TABLE_DEF)
+        self.connection.commit()
+
+    def _get_partitions(self) -> Dict[date, str]:
+        """Return names of the monthly partitions by the first day of their month."""
+        self.cursor.execute(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+            JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+            WHERE parent.relname = %s
+            """,
+            (TABLE_NAME,),
         )
-        table_def = f"CREATE TABLE {TABLE_NAME} ({fields});"
-        self.cursor.execute(table_def)
+        partitions = {}
+        for (name,) in self.cursor.fetchall():
+            match = re.fullmatch(rf'{TABLE_NAME}_(\d{{4}})_(\d{{2}})', name)
+            if match:
+                partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+        return partitions
+
+    def _create_partitions(self, months: Set[date]):
+        """Create the missing monthly partitions, moving their rows out of the default one.
+
+        Postgres refuses to add a partition while the default partition has rows that belong
+        in it, so the partition is filled with those rows before it is attached.
+        """
+        existing = self._get_partitions()
+        for month in sorted(months - set(existing)):
+            name = f'{TABLE_NAME}_{month:%Y_%m}'
+            bounds = (month, _next_month(month))
+            self.cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE_NAME} INCLUDING DEFAULTS);')
+            self.cursor.execute(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {TABLE_NAME}_default WHERE date >= %s AND date < %s RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved;
+                """,
+                bounds,
+            )
+            self.cursor.execute(
+                f'ALTER TABLE {TABLE_NAME} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s);',
+                bounds,
+            )
         self.connection.commit()
 
+    def _drop_partitions(self, before: date):
+        for month, name in sorted(self._get_partitions().items()):
+            if _next_month(month) <= before:
+                logger.info('Dropping %s', name)
+                self.cursor.execute(f'DROP TABLE {name};')
+        self.connection.commit()
+
+    def _get_imported(self) -> Dict[str, Tuple[int, str]]:
+        """Return sizes and checksums of the files in the manifest, by their name."""
+        self.cursor.execute(f'SELECT name, size, checksum FROM {MANIFEST_TABLE_NAME}')
+        return {name: (size, checksum) for name, size, checksum in self.cursor.fetchall()}
+
     def handle(self, *args, **options):
         """Do subj."""
-        self._create_table()
+        self._create_tables(rebuild=options['rebuild'])
+        if options['drop_before']:
+            self._drop_partitions(options['drop_before'])
 
-        path = '../cloudfront-logs/cloudfront'
-        all_files = sorted(os.listdir(path))
-        self.files_total = len(all_files)
+        tasks, months, self.files_skipped = get_tasks(
+            str(options['path']),
+            self._get_imported(),
+            drop_before=options['drop_before'],
+            keep_raw=not options['skip_raw'],
+        )
+        self._create_partitions(months)
+        self.files_total = len(tasks)
+        self.workers = {}
 
         def receiveSignal(signalNumber, frame):
             self._print_summary()
@@ -182,14 +609,14 @@ class Command(BaseCommand):
         signal.signal(signal.SIGUSR2, receiveSignal)
 
         self.start_t = time.time()
-        for _file in all_files:
+        with Pool(options['workers'], initializer=_init_worker, initargs=(_get_dsn(),)) as pool:
             try:
-                file_path = os.path.join(str(path), _file)
-                self._handle_gz(file_path)
+                for result in pool.imap_unordered(_import_task, tasks):
+                    self._record(result)
             except KeyboardInterrupt:
-                self._print_summary()
-                break
+                pool.terminate()
             except Exception:
-                logger.exception('Stopped at %s:%s', file_path, self.line_count)
+                pool.terminate()
                 self._print_summary()
                 raise
+        self._print_summary()
@@ -0,0 +1,46 @@
+from io import StringIO
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from common.tests.factories.static_assets import StaticAssetFactory, VideoVariationFactory
+from static_assets.models import StaticAsset
+
+
+class AddCloudFrontDownloadCountsCommandTest(TestCase):
+    def _call_command(self, csv: str):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                with open('cf_source_download_counts.csv', 'w') as f:
+                    f.write(csv)
+                call_command('add_cloudfront_download_counts', stdout=StringIO())
+            finally:
+                os.chdir(cwd)
+
+    def test_command(self):
+        file_hash, video_hash = 'a' * 32, 'b' * 32
+        static_asset = StaticAssetFactory(
+            source_type='file', source=f'aa/{file_hash}/{file_hash}.blend'
+        )
+        video_static_asset = StaticAssetFactory(
+            source_type='video', source=f'bb/{video_hash}/{video_hash}.mp4'
+        )
+        VideoVariationFactory(
+            video=video_static_asset.video, source=f'bb/{video_hash}/{video_hash}-1080p.mp4'
+        )
+        other_static_asset = StaticAssetFactory(source_type='file', source='legacy/file.blend')
+
+        with self.assertNumQueries(3):
+            self._call_command(
+                f'"{file_hash}";"3"\n"{video_hash}";"5"\n"{file_hash}";"1"\n"{"c" * 32}";"7"\n'
+            )
+
+        counts = dict(StaticAsset.objects.values_list('pk', 'download_count'))
+        self.assertEqual(counts[static_asset.pk], 4)
+        # Counted once, even though both the video and its variation have the hash
+        self.assertEqual(counts[video_static_asset.pk], 5)
+        self.assertEqual(counts[other_static_asset.pk], 0)
@@ -0,0 +1,159 @@
+from datetime import date
+from unittest.mock import MagicMock, patch
+import gzip
+import os
+import tempfile
+import unittest
+
+from stats.management.commands.import_cloudfront_logs import (
+    Command,
+    _RowStream,
+    get_checksum,
+    get_file_date,
+    get_projection,
+    get_tasks,
+    import_file,
+    parse_line,
+)
+
+FIELDS = (
+    'date time x-edge-location sc-bytes c-ip cs-method cs(Host) cs-uri-stem sc-status '
+    'cs(Referer) cs(User-Agent) cs-uri-query cs(Cookie) x-edge-result-type ssl-cipher '
+    'time-taken'
+).split()
+LINE = (
+    b'2021-08-01\t10:10:10\tAMS50-C1\t1024\t127.0.0.1\tGET\texample.cloudfront.net\t'
+    b'/__/ab/abcd.mp4\t200\thttps://studio.blender.org/films/\tMozilla/5.0\t-\t-\tHit\t'
+    b'TLS_AES_128_GCM_SHA256\t0.125\n'
+)
+
+
+class ImportCloudFrontLogsTest(unittest.TestCase):
+    def setUp(self):
+        self.projection = get_projection(FIELDS)
+
+    def test_projection_skips_unknown_fields(self):
+        self.assertNotIn('ssl_cipher', self.projection.columns)
+        self.assertEqual(self.projection.columns[:3], ['date', 'time', 'x_edge_location'])
+        self.assertEqual(len(self.projection.columns), len(FIELDS) - 1)
+        self.assertEqual(self.projection.status_index, 8)
+
+    def test_parse_line(self):
+        row = parse_line(LINE, self.projection)
+
+        values = row.rstrip('\n').split('\t')
+        self.assertEqual(len(values), len(self.projection.columns))
+        self.assertEqual(values[7], '/__/ab/abcd.mp4')
+        # Missing values are NULLs, times in seconds are stored in milliseconds
+        self.assertEqual(values[11:], ['\\N', '\\N', 'Hit', '125'])
+
+    def test_parse_line_skips_not_ok(self):
+        self.assertIsNone(parse_line(LINE.replace(b'\t200\t', b'\t404\t'), self.projection))
+
+    def test_parse_line_escapes_and_truncates(self):
+        line = LINE.replace(b'/__/ab/abcd.mp4', b'/a\\b' + b'c' * 300)
+
+        values = parse_line(line, self.projection).split('\t')
+
+        self.assertEqual(len(values[7]), 256 + 1)
+        self.assertTrue(values[7].startswith('/a\\\\bccc'))
+
+    def test_row_stream(self):
+        stream = _RowStream(['abc\n', 'de\n', 'f\n'])
+
+        self.assertEqual(stream.read(5), 'abc\nd')
+        self.assertEqual(stream.read(5), 'e\nf\n')
+        self.assertEqual(stream.read(5), '')
+
+    def test_get_file_date(self):
+        self.assertEqual(get_file_date('E1ABC.2021-08-01-10.ab12cd34.gz'), date(2021, 8, 1))
+        self.assertIsNone(get_file_date('notes.txt'))
+
+    def _import_file(self, imported_checksum=None, file_id_updated=False):
+        copied = []
+        connection = MagicMock()
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.copy_expert.side_effect = lambda q, f: copied.append((q, f.read()))
+        cursor.fetchone.return_value = (7, file_id_updated)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, 'E1.2021-08-01-10.abcd.gz')
+            with gzip.open(file_path, 'wb') as f:
+                f.write(b'#Version: 1.0\n#Fields: ' + ' '.join(FIELDS).encode() + b'\n')
+                f.write(LINE + LINE.replace(b'\t200\t', b'\t304\t') + LINE)
+            if imported_checksum == 'same':
+                imported_checksum = get_checksum(file_path)
+
+            result = import_file(file_path, imported_checksum, connection=connection)
+        return result, connection, cursor, copied
+
+    def test_import_file(self):
+        result, connection, cursor, copied = self._import_file()
+
+        self.assertEqual((result.lines, result.rows, result.skipped), (3, 2, False))
+        [(copy_q, data)] = copied
+        self.assertTrue(copy_q.startswith('COPY cflogs (date,time,x_edge_location,'))
+        self.assertTrue(copy_q.endswith(',file_id) FROM STDIN'))
+        self.assertEqual(data, parse_line(LINE, self.projection, ['7']) * 2)
+        executed = [call[0][0] for call in cursor.execute.call_args_list]
+        self.assertIn('INSERT INTO cflogs_files', executed[0])
+        self.assertIn('UPDATE cflogs_files SET row_count', executed[-1])
+        self.assertEqual(cursor.execute.call_args_list[-1][0][1], (2, 7))
+        connection.commit.assert_called_once()
+
+    def test_import_changed_file_replaces_its_rows(self):
+        result, connection, cursor, copied = self._import_file('old', file_id_updated=True)
+
+        self.assertEqual(result.rows, 2)
+        delete_q, params = cursor.execute.call_args_list[1][0]
+        self.assertTrue(delete_q.startswith('DELETE FROM cflogs WHERE file_id = %s'))
+        self.assertEqual(params, [7, date(2021, 7, 31), date(2021, 8, 2)])
+
+    def test_import_unchanged_file_is_skipped(self):
+        result, connection, cursor, copied = self._import_file('same')
+
+        self.assertTrue(result.skipped)
+        self.assertEqual(copied, [])
+        connection.commit.assert_not_called()
+
+    def test_unchanged_files_are_not_read(self):
+        names = ['E1.2021-08-01-10.a.gz', 'E1.2021-08-31-23.b.gz', 'E1.2021-09-01-00.c.gz']
+        imported = {
+            names[0]: (3, 'checksum'),
+            # Resized since it was imported
+            names[1]: (2, 'checksum'),
+            # Cleared to be imported again
+            names[2]: (3, ''),
+        }
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in names:
+                with open(os.path.join(tmp_dir, name), 'wb') as f:
+                    f.write(b'abc')
+
+            with patch(
+                'stats.management.commands.import_cloudfront_logs.get_checksum'
+            ) as get_checksum_mock:
+                tasks, months, unchanged = get_tasks(tmp_dir, imported)
+
+        get_checksum_mock.assert_not_called()
+        self.assertEqual(
+            [(os.path.basename(path), checksum) for path, checksum, _ in tasks],
+            [(names[1], 'checksum'), (names[2], '')],
+        )
+        self.assertEqual(unchanged, 1)
+        self.assertEqual(months, {date(2021, 8, 1), date(2021, 9, 1), date(2021, 10, 1)})
+
+    def test_new_partitions_take_their_rows_from_the_default_one(self):
+        command = Command()
+        command.connection = MagicMock()
+        command.cursor = command.connection.cursor.return_value
+        command.cursor.fetchall.return_value = [('cflogs_2021_08',), ('cflogs_default',)]
+
+        command._create_partitions({date(2021, 8, 1), date(2021, 9, 1)})
+
+        create, move, attach = command.cursor.execute.call_args_list[1:]
+        self.assertTrue(create[0][0].startswith('CREATE TABLE cflogs_2021_09 (LIKE cflogs'))
+        self.assertIn('DELETE FROM cflogs_default', move[0][0])
+        self.assertIn('INSERT INTO cflogs_2021_09', move[0][0])
+        self.assertEqual(move[0][1], (date(2021, 9, 1), date(2021, 10, 1)))
+        self.assertIn('ATTACH PARTITION cflogs_2021_09', attach[0][0])
+        command.connection.commit.assert_called_once()
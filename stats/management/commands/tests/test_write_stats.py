@@ -9,7 +9,15 @@ from common.tests.factories.comments import CommentFactory
 from common.tests.factories.films import AssetFactory
 from common.tests.factories.static_assets import StaticAssetFactory
 from common.tests.factories.users import UserFactory
-from stats.models import Sample, StaticAssetView, StaticAssetDownload, StaticAssetCountedVisit
+from stats.metrics import registry
+from stats.models import (
+    DailySample,
+    Sample,
+    SampleChart,
+    StaticAssetView,
+    StaticAssetDownload,
+    StaticAssetCountedVisit,
+)
 
 
 class WriteStatsCommandTest(TestCase):
@@ -18,9 +26,11 @@ class WriteStatsCommandTest(TestCase):
 
         call_command('write_stats', stdout=out)
 
-        self.assertEqual(Sample.objects.count(), 6)
+        self.assertEqual(Sample.objects.count(), len(registry))
         sample = Sample.objects.first()
         self.assertEqual(sample.value, 0)
+        self.assertEqual(DailySample.objects.count(), len(registry))
+        self.assertEqual(SampleChart.objects.count(), len(registry))
 
     def test_command(self):
         # some comments
@@ -57,7 +67,7 @@ class WriteStatsCommandTest(TestCase):
         out = StringIO()
         call_command('write_stats', stdout=out)
 
-        self.assertEqual(Sample.objects.count(), 6)
+        self.assertEqual(Sample.objects.count(), len(registry))
         blog_posts_count_sample = Sample.objects.get(slug='blog_posts_count')
         comments_count_sample = Sample.objects.get(slug='comments_count')
         film_assets_count_sample = Sample.objects.get(slug='film_assets_count')
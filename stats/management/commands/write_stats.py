@@ -1,77 +1,37 @@
 """Write stats data."""
+from datetime import timedelta
 import logging
 
-from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
-from comments.models import Comment
-from films.models import Asset
+from stats.metrics import collect_metrics
 from stats.models import Sample, StaticAssetView, StaticAssetDownload
-from blog.models import Post
+from stats.samples import add_to_daily_samples, update_charts
 
 logger = logging.getLogger('write_stats')
 logger.setLevel(logging.DEBUG)
-User = get_user_model()
 
 
 class Command(BaseCommand):
     """Write stats data."""
 
-    def _get_comments_count(self):
-        return Comment.objects.filter(date_deleted__isnull=True).count()
-
-    def _get_film_assets_count(self):
-        return Asset.objects.filter(is_published=True).count()
-
-    def _get_blog_posts_count(self):
-        return Post.objects.filter(is_published=True).count()
-
-    def _get_users_total_count(self):
-        return User.objects.filter(is_active=True).count()
-
-    def _get_users_subscribers_count(self):
-        return User.objects.filter(is_active=True, groups__name='subscriber').distinct().count()
-
-    def _get_users_demo_count(self):
-        return User.objects.filter(is_active=True, groups__name='demo').distinct().count()
+    def add_arguments(self, parser):
+        """Add the --recount option."""
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Count incremental metrics from scratch, instead of adding the changes since '
+            'they were last counted.',
+        )
 
-    def write_samples(self):
-        """Run some counting queries and write their results into Sample table."""
+    def write_samples(self, recount=False):
+        """Collect the registered metrics and write their values into Sample table."""
         timestamp = timezone.now()
-        Sample.objects.bulk_create(
-            [
-                Sample(
-                    timestamp=timestamp,
-                    slug='comments_count',
-                    value=self._get_comments_count(),
-                ),
-                Sample(
-                    timestamp=timestamp,
-                    value=self._get_film_assets_count(),
-                    slug='film_assets_count',
-                ),
-                Sample(
-                    timestamp=timestamp,
-                    slug='blog_posts_count',
-                    value=self._get_blog_posts_count(),
-                ),
-                Sample(
-                    timestamp=timestamp,
-                    slug='users_total_count',
-                    value=self._get_users_total_count(),
-                ),
-                Sample(
-                    timestamp=timestamp,
-                    slug='users_subscribers_count',
-                    value=self._get_users_subscribers_count(),
-                ),
-                Sample(
-                    timestamp=timestamp,
-                    slug='users_demo_count',
-                    value=self._get_users_demo_count(),
-                ),
-            ]
+        values = collect_metrics(recount=recount, now=timestamp)
+        return Sample.objects.bulk_create(
+            [Sample(timestamp=timestamp, slug=slug, value=value) for slug, value in values.items()]
         )
 
     def write_static_asset_counts(self):
@@ -79,7 +39,33 @@ class Command(BaseCommand):
         StaticAssetView.update_counters(to_field='view_count')
         StaticAssetDownload.update_counters(to_field='download_count')
 
+    def write_static_asset_daily_counts(self):
+        """Calculate daily view and download counts, delete counted records past retention."""
+        StaticAssetView.update_daily_counts(to_field='view_count')
+        StaticAssetDownload.update_daily_counts(to_field='download_count')
+
+        retention_days = settings.STATS_VISITS_RETENTION_DAYS
+        if retention_days is None:
+            return
+        before = timezone.now() - timedelta(days=retention_days)
+        for model, to_field in (
+            (StaticAssetView, 'view_count'),
+            (StaticAssetDownload, 'download_count'),
+        ):
+            deleted = model.delete_counted(to_field, before)
+            if deleted:
+                logger.info(
+                    'Deleted %s %s records created before %s', deleted, model.__name__, before
+                )
+
+    def write_charts(self, samples):
+        """Add the samples to their daily summaries and serialize their charts again."""
+        add_to_daily_samples(samples)
+        update_charts(sample.slug for sample in samples)
+
     def handle(self, *args, **options):
         """Write various stats."""
-        self.write_samples()
+        samples = self.write_samples(recount=options['recount'])
+        self.write_charts(samples)
         self.write_static_asset_counts()
+        self.write_static_asset_daily_counts()
@@ -0,0 +1,138 @@
+"""A registry of the metrics sampled by `write_stats`.
+
+Apps declare their metrics in a `metrics` module, which is imported when the stats app is
+ready, by registering instances of one of these classes:
+
+* `Metric` is counted from scratch every time it is sampled, for cheap counts;
+* `DeltaMetric` adds the rows added and subtracts the rows removed since it was last sampled,
+  for tables that record when their rows were added and removed;
+* `SignalCounterMetric` is incremented by signal receivers of the app declaring it.
+
+The last two are `IncrementalMetric`s: their values are stored in `MetricCounter`, and are
+counted from scratch every STATS_METRICS_RECOUNT_HOURS to correct for the changes they can
+miss, e.g. rows deleted without a trace, or signals that weren't sent.
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from stats.models import MetricCounter
+
+log = logging.getLogger(__name__)
+
+# Counts rows changed after the first and until the second of given times
+CountSince = Callable[[datetime, datetime], int]
+
+
+class Metric:
+    """A number sampled by `write_stats`, counted from scratch every time."""
+
+    def __init__(self, slug: str, label: str, count: Callable[[], int]):
+        """Declare a metric, `count` returns its current value."""
+        self.slug = slug
+        self.label = label
+        self._count = count
+
+    def count(self) -> int:
+        """Count the current value from scratch."""
+        return self._count()
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.slug!r})'
+
+
+class IncrementalMetric(Metric, ABC):
+    """A metric updated from its value when last sampled, and only recounted now and then."""
+
+    @abstractmethod
+    def get_value(self, value: int, since: datetime, until: datetime) -> int:
+        """Return the current value, given the value at the time it was last sampled."""
+
+
+class DeltaMetric(IncrementalMetric):
+    """A count of rows, updated with the numbers of rows added and removed since last sampled."""
+
+    def __init__(
+        self,
+        slug: str,
+        label: str,
+        count: Callable[[], int],
+        added: CountSince,
+        removed: Optional[CountSince] = None,
+    ):
+        """Declare a metric, `added` and `removed` count the rows changed between two times."""
+        super().__init__(slug, label, count)
+        self._added = added
+        self._removed = removed
+
+    def get_value(self, value: int, since: datetime, until: datetime) -> int:
+        """Return the previous value plus the rows added and minus the rows removed since."""
+        value += self._added(since, until)
+        if self._removed:
+            value -= self._removed(since, until)
+        return value
+
+
+class SignalCounterMetric(IncrementalMetric):
+    """A count kept up to date by signal receivers calling `increment`."""
+
+    def get_value(self, value: int, since: datetime, until: datetime) -> int:
+        """Return the counter as is, the receivers have already updated it."""
+        return value
+
+    def increment(self, delta: int = 1) -> None:
+        """Add the given delta to the counter, which is ignored until the metric is counted."""
+        if delta:
+            MetricCounter.objects.filter(slug=self.slug).update(value=F('value') + delta)
+
+
+registry: Dict[str, Metric] = {}
+
+
+def register(metric: Metric) -> Metric:
+    """Add a metric to the ones sampled by `write_stats`."""
+    if metric.slug in registry:
+        raise ImproperlyConfigured(f'Metric {metric.slug} is already registered')
+    registry[metric.slug] = metric
+    return metric
+
+
+def collect_metrics(
+    metrics: Optional[Iterable[Metric]] = None,
+    recount: bool = False,
+    now: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """Return the current values of the given metrics, all the registered ones by default.
+
+    Incremental metrics are counted from scratch when they were never counted before, when
+    they were last counted more than STATS_METRICS_RECOUNT_HOURS ago, or with `recount`.
+    """
+    now = now or timezone.now()
+    recount_before = now - timedelta(hours=settings.STATS_METRICS_RECOUNT_HOURS)
+    values = {}
+    for metric in registry.values() if metrics is None else metrics:
+        if not isinstance(metric, IncrementalMetric):
+            values[metric.slug] = metric.count()
+            continue
+
+        with transaction.atomic():
+            # Lock the counter, so that concurrent calls cannot add the same changes twice
+            counter = MetricCounter.objects.select_for_update().filter(slug=metric.slug).first()
+            if counter and not recount and counter.date_recounted > recount_before:
+                counter.value = metric.get_value(counter.value, counter.date_counted, now)
+            else:
+                value = metric.count()
+                if counter and counter.value != value:
+                    log.warning('Recounted %s: %s instead of %s', metric.slug, value, counter.value)
+                counter = MetricCounter(slug=metric.slug, value=value, date_recounted=now)
+            counter.date_counted = now
+            counter.save()
+        values[metric.slug] = max(counter.value, 0)
+    return values
@@ -0,0 +1,60 @@
+# Generated by Django 3.2.9 on 2026-10-18 13:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('static_assets', '0013_add_source_hash'),
+        ('stats', '0004_staticassetcountedvisit'),
+    ]
+
+    operations = [
+        # Added without a default first, so that existing records are left without a date
+        migrations.AddField(
+            model_name='staticassetdownload',
+            name='date_created',
+            field=models.DateTimeField(db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='staticassetview',
+            name='date_created',
+            field=models.DateTimeField(db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='staticassetdownload',
+            name='date_created',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, null=True),
+        ),
+        migrations.AlterField(
+            model_name='staticassetview',
+            name='date_created',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, null=True),
+        ),
+        migrations.AlterField(
+            model_name='staticassetcountedvisit',
+            name='field',
+            field=models.CharField(choices=[('view_count', 'View Count'), ('download_count', 'Download Count'), ('daily_view_count', 'Daily View Count'), ('daily_download_count', 'Daily Download Count')], max_length=20, primary_key=True, serialize=False),
+        ),
+        migrations.CreateModel(
+            name='StaticAssetDailyCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('view_count', models.PositiveIntegerField(default=0)),
+                ('download_count', models.PositiveIntegerField(default=0)),
+                ('static_asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_counts', to='static_assets.staticasset')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='staticassetdailycount',
+            index=models.Index(fields=['date', 'static_asset'], name='stats_stati_date_76d36c_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='staticassetdailycount',
+            constraint=models.UniqueConstraint(fields=('static_asset', 'date'), name='stats_staticassetdailycount_uniq_key'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 3.2.9 on 2026-10-18 14:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def _fill_daily_samples(apps, schema_editor):
+    schema_editor.execute(
+        """
+        INSERT INTO stats_dailysample (
+            slug, date, min_value, max_value, value_sum, sample_count, last_value, last_timestamp
+        )
+        SELECT
+            slug,
+            (timestamp AT TIME ZONE %s)::date AS date,
+            MIN(value),
+            MAX(value),
+            SUM(value),
+            COUNT(*),
+            (ARRAY_AGG(value ORDER BY timestamp DESC))[1],
+            MAX(timestamp)
+        FROM stats
+        WHERE slug IS NOT NULL
+        GROUP BY slug, date
+        """,
+        [settings.TIME_ZONE],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0005_staticassetdailycount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySample',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField()),
+                ('date', models.DateField()),
+                ('min_value', models.PositiveIntegerField()),
+                ('max_value', models.PositiveIntegerField()),
+                ('value_sum', models.PositiveBigIntegerField()),
+                ('sample_count', models.PositiveIntegerField()),
+                ('last_value', models.PositiveIntegerField()),
+                ('last_timestamp', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SampleChart',
+            fields=[
+                ('slug', models.SlugField(primary_key=True, serialize=False)),
+                ('datasets', models.TextField()),
+                ('current_value', models.PositiveIntegerField()),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailysample',
+            constraint=models.UniqueConstraint(fields=('slug', 'date'), name='stats_dailysample_uniq_key'),
+        ),
+        # Charts are serialized the next time write_stats runs
+        migrations.RunPython(_fill_daily_samples, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.9 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0006_dailysample_samplechart'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricCounter',
+            fields=[
+                ('slug', models.SlugField(primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField()),
+                ('date_counted', models.DateTimeField()),
+                ('date_recounted', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -1,8 +1,17 @@
+from datetime import datetime
+from typing import Optional, Tuple
+import time
+
 from django.db import models, transaction
+from django.db.models.functions import TruncDate
 from django.http import HttpRequest
+from django.utils import timezone
 
 from looper.utils import clean_ip_address
 
+from stats.counters import increment_counters, increment_daily_counts
+from stats.events import Event, record_event
+
 
 class _StaticAssetVisitMixin(models.Model):
     class Meta:
@@ -33,54 +42,104 @@ class _StaticAssetVisitMixin(models.Model):
     static_asset = models.ForeignKey(
         'static_assets.StaticAsset', null=False, on_delete=models.CASCADE
     )
+    # Null for the records created before they were counted by day
+    date_created = models.DateTimeField(default=timezone.now, null=True, db_index=True)
 
     @classmethod
     def create_from_request(cls, request: HttpRequest, static_asset_id: int):
-        """Create a new record for the given StaticAsset ID based on the given request."""
+        """Create a new record for the given StaticAsset ID based on the given request.
+
+        The record is buffered and inserted in the background, see `stats.events`.
+        """
         if static_asset_id is None:
             return
         ip_address = clean_ip_address(request) if request.user.is_anonymous else None
         user_id = request.user.pk if request.user.is_authenticated else None
-        cls.objects.bulk_create(
-            [cls(ip_address=ip_address, user_id=user_id, static_asset_id=static_asset_id)],
-            ignore_conflicts=True,
+        record_event(Event(cls._meta.model_name, static_asset_id, user_id, ip_address, time.time()))
+
+    @classmethod
+    def _get_uncounted(cls, counted_field: str) -> Tuple[models.QuerySet, Optional[int]]:
+        """Lock the last ID counted in the given field, return the records created since.
+
+        Only records that exist now are returned: later ones are left for the next call.
+        Must be called in a transaction, the new last counted ID is stored by `_set_counted`.
+        """
+        # Lock the last counted ID, so that concurrent calls cannot count the same records
+        last_seen = (
+            StaticAssetCountedVisit.objects.select_for_update().filter(field=counted_field).first()
+        )
+        last_seen_id = last_seen.last_seen_id if last_seen else 0
+        new_records = cls.objects.filter(id__gt=last_seen_id)
+        max_id = new_records.aggregate(max_id=models.Max('pk')).get('max_id')
+        if max_id is None:
+            return new_records, None
+        return new_records.filter(id__lte=max_id), max_id
+
+    @staticmethod
+    def _set_counted(counted_field: str, max_id: int) -> None:
+        # Update the last seen ID to make sure next count starts after the counted records
+        StaticAssetCountedVisit.objects.update_or_create(
+            field=counted_field, defaults={'last_seen_id': max_id}
         )
 
     @classmethod
     @transaction.atomic
     def update_counters(cls, to_field: str):
-        from static_assets.models import StaticAsset
+        """Add the records created since the last call to the given counter of static assets."""
+        new_records, max_id = cls._get_uncounted(to_field)
+        if max_id is None:  # nothing to to
+            return
 
-        last_seen = StaticAssetCountedVisit.objects.filter(field=to_field).first()
-        last_seen_id = last_seen.last_seen_id if last_seen else 0
-        static_asset_id_count = (
-            cls.objects.filter(id__gt=last_seen_id)
-            .values('static_asset_id')
-            .annotate(count=models.Count('static_asset_id'))
+        static_asset_id_count = new_records.values_list('static_asset_id').annotate(
+            count=models.Count('static_asset_id')
         )
-        if not static_asset_id_count:  # nothing to to
+        increment_counters(to_field, static_asset_id_count)
+        cls._set_counted(to_field, max_id)
+
+    @classmethod
+    @transaction.atomic
+    def update_daily_counts(cls, to_field: str):
+        """Add the records created since the last call to the given daily counts."""
+        counted_field = f'daily_{to_field}'
+        new_records, max_id = cls._get_uncounted(counted_field)
+        if max_id is None:
             return
 
-        all_static_asset_ids = {_['static_asset_id'] for _ in static_asset_id_count}
-        affected_static_assets = {
-            _.pk: _ for _ in StaticAsset.objects.filter(id__in=all_static_asset_ids)
-        }
-        to_update = []
-        for row in static_asset_id_count:
-            static_asset_id = row['static_asset_id']
-            count = row['count']
-            static_asset = affected_static_assets[static_asset_id]
-            setattr(static_asset, to_field, getattr(static_asset, to_field) + count)
-            to_update.append(static_asset)
-        StaticAsset.objects.bulk_update(
-            to_update, batch_size=500, fields={to_field, 'date_updated'}
+        static_asset_id_day_count = (
+            new_records.filter(date_created__isnull=False)
+            .annotate(day=TruncDate('date_created'))
+            .values_list('static_asset_id', 'day')
+            .annotate(count=models.Count('static_asset_id'))
         )
+        increment_daily_counts(to_field, static_asset_id_day_count)
+        cls._set_counted(counted_field, max_id)
 
-        # Update the last seen ID to make sure next count starts from it
-        max_id = cls.objects.aggregate(max_id=models.Max('pk')).get('max_id')
-        StaticAssetCountedVisit.objects.update_or_create(
-            field=to_field, defaults={'last_seen_id': max_id}
+    @classmethod
+    def delete_counted(cls, to_field: str, before: datetime, batch_size: int = 10000) -> int:
+        """Delete the records created before the given time, once they are counted.
+
+        Records are only deleted after they were added to both the given counter and to the
+        daily counts, in batches, so that the tables are not locked for long.
+        Visitors of a static asset whose records were deleted are counted again on their
+        next visit.
+
+        Returns:
+            The number of deleted records.
+        """
+        last_seen_ids = list(
+            StaticAssetCountedVisit.objects.filter(
+                field__in=(to_field, f'daily_{to_field}')
+            ).values_list('last_seen_id', flat=True)
         )
+        if len(last_seen_ids) < 2:
+            return 0
+        to_delete = cls.objects.filter(id__lte=min(last_seen_ids), date_created__lt=before)
+        deleted = 0
+        while True:
+            batch = list(to_delete.values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                return deleted
+            deleted += cls.objects.filter(pk__in=batch).delete()[0]
 
     def __str__(self) -> str:
         ip_address_f = f', IP {self.ip_address}' if self.ip_address else ''
@@ -104,6 +163,58 @@ class Sample(models.Model):
     legacy_id = models.SlugField(null=True, blank=True)
 
 
+class DailySample(models.Model):
+    """Store the minimum, maximum, average and last values of a sample slug on a given day."""
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('slug', 'date'), name='stats_dailysample_uniq_key'),
+        ]
+
+    slug = models.SlugField()
+    date = models.DateField()
+    min_value = models.PositiveIntegerField()
+    max_value = models.PositiveIntegerField()
+    # Sum and number of the values, so that samples can be added without reading them again
+    value_sum = models.PositiveBigIntegerField()
+    sample_count = models.PositiveIntegerField()
+    last_value = models.PositiveIntegerField()
+    last_timestamp = models.DateTimeField()
+
+    @property
+    def avg_value(self) -> float:
+        """Return the average of the values sampled on this day."""
+        return self.value_sum / self.sample_count
+
+    def __str__(self) -> str:
+        return f'{self.__class__.__name__} {self.slug} on {self.date}'
+
+
+class SampleChart(models.Model):
+    """Store the chart data of a sample slug, serialized to JSON when the samples are written."""
+
+    slug = models.SlugField(primary_key=True)
+    datasets = models.TextField()
+    current_value = models.PositiveIntegerField()
+    date_updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f'{self.__class__.__name__} {self.slug}'
+
+
+class MetricCounter(models.Model):
+    """Store the value of an incremental metric, see `stats.metrics`."""
+
+    slug = models.SlugField(primary_key=True)
+    # Can briefly be negative, when decremented by a change that wasn't counted yet
+    value = models.BigIntegerField()
+    date_counted = models.DateTimeField()
+    date_recounted = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f'{self.__class__.__name__} {self.slug}'
+
+
 class StaticAssetView(_StaticAssetVisitMixin, models.Model):
     pass
 
@@ -118,8 +229,34 @@ class StaticAssetCountedVisit(models.Model):
     class _Field(models.TextChoices):
         view_count = 'view_count'
         download_count = 'download_count'
+        daily_view_count = 'daily_view_count'
+        daily_download_count = 'daily_download_count'
 
     field = models.CharField(
         null=False, blank=False, max_length=20, choices=_Field.choices, primary_key=True
     )
     last_seen_id = models.PositiveIntegerField(null=False, blank=False)
+
+
+class StaticAssetDailyCount(models.Model):
+    """Store numbers of unique visits/downloads of a static asset created on a given day."""
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('static_asset', 'date'), name='stats_staticassetdailycount_uniq_key'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=('date', 'static_asset')),
+        ]
+
+    static_asset = models.ForeignKey(
+        'static_assets.StaticAsset', on_delete=models.CASCADE, related_name='daily_counts'
+    )
+    date = models.DateField()
+    view_count = models.PositiveIntegerField(default=0)
+    download_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f'{self.__class__.__name__} #{self.static_asset_id} on {self.date}'
@@ -0,0 +1,110 @@
+"""Daily summaries of samples and the chart data built from them.
+
+Every time `write_stats` writes samples, they are added to the summaries of their day, and
+the charts of their slugs are serialized again from at most CHART_DAYS summaries, so that the
+stats dashboard only has to read one row, no matter how many samples there are.
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.utils import timezone
+
+from stats.metrics import registry
+from stats.models import DailySample, Sample, SampleChart
+
+CHART_DAYS = 365
+DEFAULT_CHART_SLUG = 'users_subscribers_count'
+
+
+def get_label(slug: str) -> str:
+    """Return a human-readable name of the given sample slug."""
+    metric = registry.get(slug)
+    return metric.label if metric else slug.replace('_', ' ').title()
+
+
+def add_to_daily_samples(samples: Iterable[Sample]) -> None:
+    """Add the given samples to the summaries of their slug and day."""
+    # A single upsert cannot update the same row twice: merge the samples of a slug and day first
+    rows: Dict[Tuple[str, date], list] = {}
+    for sample in samples:
+        key = (sample.slug, timezone.localdate(sample.timestamp))
+        value = sample.value
+        # Minimum, maximum, sum, count, last value and its timestamp
+        row = rows.get(key)
+        if row is None:
+            rows[key] = [value, value, value, 1, value, sample.timestamp]
+            continue
+        row[0] = min(row[0], value)
+        row[1] = max(row[1], value)
+        row[2] += value
+        row[3] += 1
+        if sample.timestamp >= row[5]:
+            row[4], row[5] = value, sample.timestamp
+    if not rows:
+        return
+
+    table = connection.ops.quote_name(DailySample._meta.db_table)
+    placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s)'] * len(rows))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} AS daily_sample (
+                slug, date, min_value, max_value, value_sum, sample_count, last_value,
+                last_timestamp
+            ) VALUES {placeholders}
+            ON CONFLICT (slug, date) DO UPDATE SET
+                min_value = LEAST(daily_sample.min_value, EXCLUDED.min_value),
+                max_value = GREATEST(daily_sample.max_value, EXCLUDED.max_value),
+                value_sum = daily_sample.value_sum + EXCLUDED.value_sum,
+                sample_count = daily_sample.sample_count + EXCLUDED.sample_count,
+                last_value = CASE
+                    WHEN EXCLUDED.last_timestamp >= daily_sample.last_timestamp
+                    THEN EXCLUDED.last_value ELSE daily_sample.last_value
+                END,
+                last_timestamp = GREATEST(daily_sample.last_timestamp, EXCLUDED.last_timestamp)
+            """,
+            [value for key, row in sorted(rows.items()) for value in (*key, *row)],
+        )
+
+
+def get_chart_datasets(slug: str, daily_samples: List[DailySample]) -> List[dict]:
+    """Return Chart.js datasets of the daily average values of a sample slug."""
+    return [
+        {
+            'type': 'line',
+            'data': [
+                {'date': daily_sample.date, 'y': round(daily_sample.avg_value)}
+                for daily_sample in daily_samples
+            ],
+            'label': get_label(slug),
+            'borderColor': 'rgb(0,183,255)',
+            'backgroundColor': 'rgba(0,183,255, 0.1)',
+            'fill': True,
+            'pointRadius': '0',
+        },
+    ]
+
+
+def update_charts(slugs: Iterable[str], today: Optional[date] = None) -> None:
+    """Serialize the charts of the given sample slugs from their last CHART_DAYS summaries."""
+    today = today or timezone.localdate()
+    for slug in sorted(set(slugs)):
+        daily_samples = list(
+            DailySample.objects.filter(
+                slug=slug, date__gt=today - timedelta(days=CHART_DAYS)
+            ).order_by('date')
+        )
+        if not daily_samples:
+            continue
+        SampleChart.objects.update_or_create(
+            slug=slug,
+            defaults={
+                'datasets': json.dumps(
+                    get_chart_datasets(slug, daily_samples), cls=DjangoJSONEncoder
+                ),
+                'current_value': daily_samples[-1].last_value,
+            },
+        )
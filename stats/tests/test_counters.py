@@ -0,0 +1,45 @@
+from django.test import TestCase
+
+from common.tests.factories.static_assets import StaticAssetFactory
+from static_assets.models import StaticAsset
+from stats.counters import increment_counters
+from stats.models import StaticAssetCountedVisit, StaticAssetView
+
+
+class IncrementCountersTest(TestCase):
+    def test_increment_counters(self):
+        static_assets = [StaticAssetFactory(view_count=10) for _ in range(3)]
+        stale_static_asset = StaticAsset.objects.get(pk=static_assets[0].pk)
+        old_date_updated = stale_static_asset.date_updated
+
+        with self.assertNumQueries(1):
+            updated = increment_counters(
+                'view_count', {static_assets[0].pk: 2, static_assets[1].pk: 5, 0: 1}
+            )
+        with self.assertNumQueries(1):
+            increment_counters('view_count', [(static_assets[0].pk, 1), (static_assets[2].pk, 0)])
+
+        self.assertEqual(updated, 2)
+        counts = dict(StaticAsset.objects.values_list('pk', 'view_count'))
+        self.assertEqual([counts[static_asset.pk] for static_asset in static_assets], [13, 15, 10])
+        # Counters are incremented in the database, not from the values loaded in Python
+        self.assertEqual(stale_static_asset.view_count, 10)
+        stale_static_asset.refresh_from_db()
+        self.assertEqual(stale_static_asset.date_updated, old_date_updated)
+
+    def test_update_counters_counts_each_record_once(self):
+        static_asset = StaticAssetFactory()
+        for ip_address in ('192.19.10.10', '192.19.10.11'):
+            StaticAssetView.objects.create(static_asset=static_asset, ip_address=ip_address)
+
+        StaticAssetView.update_counters(to_field='view_count')
+        StaticAssetView.update_counters(to_field='view_count')
+        StaticAssetView.objects.create(static_asset=static_asset, ip_address='192.19.10.12')
+        StaticAssetView.update_counters(to_field='view_count')
+
+        static_asset.refresh_from_db()
+        self.assertEqual(static_asset.view_count, 3)
+        self.assertEqual(
+            StaticAssetCountedVisit.objects.get(field='view_count').last_seen_id,
+            StaticAssetView.objects.order_by('-id').first().pk,
+        )
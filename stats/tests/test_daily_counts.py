@@ -0,0 +1,115 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.test import TestCase
+from django.utils import timezone
+
+from common.tests.factories.films import AssetFactory, FilmFactory
+from common.tests.factories.static_assets import StaticAssetFactory
+from stats.models import StaticAssetDailyCount, StaticAssetView
+from stats.trending import get_top_film_assets, get_top_static_assets
+
+
+def _noon(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, 12, tzinfo=dt_timezone.utc)
+
+
+class DailyCountsTest(TestCase):
+    def setUp(self):
+        self.static_asset = StaticAssetFactory()
+        self.day = date(2026, 10, 1)
+
+    def _create_view(self, ip_address, day):
+        return StaticAssetView.objects.create(
+            static_asset=self.static_asset, ip_address=ip_address, date_created=_noon(day)
+        )
+
+    def _get_daily_counts(self):
+        return list(
+            StaticAssetDailyCount.objects.order_by('date').values_list(
+                'static_asset_id', 'date', 'view_count', 'download_count'
+            )
+        )
+
+    def test_update_daily_counts_counts_each_record_once(self):
+        self._create_view('192.19.10.10', self.day)
+        self._create_view('192.19.10.11', self.day)
+        self._create_view('192.19.10.12', self.day + timedelta(days=1))
+        # Records created before the daily counts existed are skipped
+        StaticAssetView.objects.create(
+            static_asset=self.static_asset, ip_address='192.19.10.13', date_created=None
+        )
+
+        StaticAssetView.update_daily_counts(to_field='view_count')
+        StaticAssetView.update_daily_counts(to_field='view_count')
+        self._create_view('192.19.10.14', self.day)
+        StaticAssetView.update_daily_counts(to_field='view_count')
+
+        self.assertEqual(
+            self._get_daily_counts(),
+            [
+                (self.static_asset.pk, self.day, 3, 0),
+                (self.static_asset.pk, self.day + timedelta(days=1), 1, 0),
+            ],
+        )
+
+    def test_delete_counted_only_deletes_old_counted_records(self):
+        old_view = self._create_view('192.19.10.10', self.day)
+        self._create_view('192.19.10.11', self.day + timedelta(days=10))
+        before = _noon(self.day + timedelta(days=5))
+
+        # Not counted yet
+        self.assertEqual(StaticAssetView.delete_counted('view_count', before), 0)
+        StaticAssetView.update_counters(to_field='view_count')
+        # Not counted by day yet
+        self.assertEqual(StaticAssetView.delete_counted('view_count', before), 0)
+        StaticAssetView.update_daily_counts(to_field='view_count')
+        self._create_view('192.19.10.12', self.day)
+
+        self.assertEqual(StaticAssetView.delete_counted('view_count', before), 1)
+        self.assertFalse(StaticAssetView.objects.filter(pk=old_view.pk).exists())
+        self.assertEqual(StaticAssetView.objects.count(), 2)
+        # Counts are unchanged
+        self.static_asset.refresh_from_db()
+        self.assertEqual(self.static_asset.view_count, 2)
+        self.assertEqual(len(self._get_daily_counts()), 2)
+
+
+class TrendingTest(TestCase):
+    def test_top_assets(self):
+        film = FilmFactory()
+        today = timezone.localdate()
+        assets = [AssetFactory(film=film) for _ in range(3)]
+        other_film_asset = AssetFactory()
+        for asset, view_counts in (
+            (assets[0], [(0, 1), (3, 1)]),
+            (assets[1], [(1, 5)]),
+            (assets[2], [(20, 10)]),
+            (other_film_asset, [(0, 10)]),
+        ):
+            for days_ago, view_count in view_counts:
+                StaticAssetDailyCount.objects.create(
+                    static_asset=asset.static_asset,
+                    date=today - timedelta(days=days_ago),
+                    view_count=view_count,
+                )
+
+        top_this_week = get_top_film_assets(film, period='week')
+        top_this_month = get_top_film_assets(film, period='month')
+        top_downloads = get_top_film_assets(film, period='month', field='download_count')
+
+        self.assertEqual(
+            [(asset.pk, asset.period_count) for asset in top_this_week],
+            [(assets[1].pk, 5), (assets[0].pk, 2)],
+        )
+        self.assertEqual(
+            [asset.pk for asset in top_this_month], [assets[2].pk, assets[1].pk, assets[0].pk]
+        )
+        self.assertEqual(list(top_downloads), [])
+        self.assertEqual(
+            get_top_static_assets(today - timedelta(days=6), limit=2),
+            [(other_film_asset.static_asset_id, 10), (assets[1].static_asset_id, 5)],
+        )
+        self.assertEqual(
+            get_top_static_assets(today - timedelta(days=6), film=film, limit=1),
+            [(assets[1].static_asset_id, 5)],
+        )
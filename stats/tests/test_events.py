@@ -0,0 +1,104 @@
+from pathlib import Path
+from unittest.mock import patch
+import datetime
+import json
+import tempfile
+import time
+
+from django.test import TestCase
+
+from common.tests.factories.static_assets import StaticAssetFactory
+from stats.events import Event, EventBuffer
+from stats.models import StaticAssetDownload, StaticAssetView
+
+
+class EventBufferTest(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.spool_dir = Path(tmp_dir.name)
+        self.static_asset_id = StaticAssetFactory().pk
+
+    def _buffer(self):
+        return EventBuffer(spool_dir=self.spool_dir, background=False)
+
+    def _spooled_events(self):
+        return [
+            json.loads(line)
+            for path in self.spool_dir.glob('*.spool')
+            for line in path.read_text().splitlines()
+        ]
+
+    def test_events_are_deduplicated_and_flushed_in_one_batch(self):
+        buffer = self._buffer()
+        for ip_address in ('192.19.10.10', '192.19.10.11', '192.19.10.10'):
+            buffer.record(Event('staticassetview', self.static_asset_id, None, ip_address))
+        buffer.record(Event('staticassetdownload', self.static_asset_id, 1, None))
+
+        self.assertEqual(StaticAssetView.objects.count(), 0)
+        self.assertEqual(len(self._spooled_events()), 3)
+        self.assertEqual(buffer.get_stats()['buffer_size'], 3)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(buffer.flush(), 3)
+
+        self.assertEqual(StaticAssetView.objects.count(), 2)
+        self.assertEqual(StaticAssetDownload.objects.get().user_id, 1)
+        self.assertEqual(self._spooled_events(), [])
+        stats = buffer.get_stats()
+        self.assertEqual((stats['buffer_size'], stats['flushes'], stats['duplicates']), (0, 1, 1))
+        self.assertIsNotNone(stats['last_flush_seconds'])
+
+    def test_orphaned_spool_files_are_replayed(self):
+        events = [
+            Event('staticassetview', self.static_asset_id, None, '192.19.10.10'),
+            Event('staticassetview', self.static_asset_id, 2, None),
+        ]
+        # Spool files of running processes are locked, and not replayed
+        in_use = self._buffer()
+        in_use.record(Event('staticassetdownload', self.static_asset_id, 3, None))
+        orphan = self.spool_dir / 'orphan.spool'
+        orphan.write_text(''.join(json.dumps(event) + '\n' for event in events) + '["static')
+
+        buffer = self._buffer()
+        buffer.record(Event('staticassetview', self.static_asset_id, 4, None))
+        buffer.flush()
+
+        self.assertEqual(
+            set(StaticAssetView.objects.values_list('user_id', flat=True)), {None, 2, 4}
+        )
+        self.assertFalse(orphan.exists())
+        self.assertEqual(StaticAssetDownload.objects.count(), 0)
+        self.assertEqual(len(self._spooled_events()), 1)
+
+    def test_events_are_kept_when_flush_fails(self):
+        buffer = self._buffer()
+        buffer.record(Event('staticassetview', self.static_asset_id, None, '192.19.10.10'))
+
+        with patch('stats.events.insert_events', side_effect=Exception('Database is down')):
+            with self.assertRaises(Exception):
+                buffer.flush()
+        buffer.record(Event('staticassetview', self.static_asset_id, None, '192.19.10.11'))
+
+        self.assertEqual(len(self._spooled_events()), 2)
+        self.assertEqual(buffer.get_stats()['failures'], 1)
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(StaticAssetView.objects.count(), 2)
+        self.assertEqual(self._spooled_events(), [])
+
+    def test_records_are_dated_with_the_time_of_the_visit(self):
+        # Spooled by a previous version, without the time of the visit
+        orphan = self.spool_dir / 'orphan.spool'
+        orphan.write_text(json.dumps(['staticassetview', self.static_asset_id, 2, None]) + '\n')
+        visited_at = datetime.datetime(2022, 3, 1, 23, 59, tzinfo=datetime.timezone.utc)
+
+        buffer = self._buffer()
+        buffer.record(
+            Event('staticassetview', self.static_asset_id, 1, None, visited_at.timestamp())
+        )
+        buffer.record(Event('staticassetview', self.static_asset_id, 1, None, time.time()))
+        buffer.flush()
+
+        self.assertEqual(StaticAssetView.objects.get(user_id=1).date_created, visited_at)
+        self.assertIsNotNone(StaticAssetView.objects.get(user_id=2).date_created)
+        self.assertEqual(buffer.get_stats()['duplicates'], 1)
@@ -0,0 +1,42 @@
+import unittest
+
+from stats.hyperloglog import HyperLogLog
+
+
+def _sketch(values):
+    sketch = HyperLogLog()
+    for value in values:
+        sketch.add(str(value).encode())
+    return sketch
+
+
+class HyperLogLogTest(unittest.TestCase):
+    def test_small_counts_are_nearly_exact(self):
+        self.assertEqual(HyperLogLog().count(), 0)
+        self.assertAlmostEqual(_sketch(range(100)).count(), 100, delta=2)
+        # Duplicates are not counted
+        self.assertEqual(_sketch(list(range(50)) * 3).count(), 50)
+
+    def test_large_counts_are_within_error_bound(self):
+        count = _sketch(range(100000)).count()
+
+        # 3 standard errors of 1.6%
+        self.assertAlmostEqual(count, 100000, delta=100000 * 0.05)
+
+    def test_merge_is_union(self):
+        sketch = _sketch(range(0, 20000))
+        sketch.merge(_sketch(range(10000, 30000)))
+
+        self.assertEqual(sketch.registers, _sketch(range(30000)).registers)
+        # Merging is idempotent
+        sketch.merge(_sketch(range(10000, 30000)))
+        self.assertEqual(sketch.registers, _sketch(range(30000)).registers)
+
+    def test_serialization(self):
+        for values in ([], range(10), range(50000)):
+            sketch = _sketch(values)
+            data = sketch.to_bytes()
+
+            self.assertEqual(HyperLogLog.from_bytes(data).registers, sketch.registers)
+        self.assertEqual(len(_sketch(range(10)).to_bytes()), 2 + 10 * 3)
+        self.assertEqual(len(_sketch(range(50000)).to_bytes()), 2 + 4096)
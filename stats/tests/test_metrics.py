@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import Group
+from django.test import TestCase
+from django.utils import timezone
+
+from comments.models import Comment
+from common.tests.factories.comments import CommentFactory
+from common.tests.factories.users import UserFactory
+from stats.metrics import collect_metrics, registry
+from stats.models import MetricCounter
+
+
+class CollectMetricsTest(TestCase):
+    def test_delta_metric_adds_changes_since_last_counted(self):
+        metric = registry['comments_count']
+        comments = [CommentFactory() for _ in range(3)]
+        now = timezone.now()
+
+        self.assertEqual(collect_metrics([metric], now=now), {'comments_count': 3})
+
+        comments[0].date_deleted = now + timedelta(seconds=1)
+        comments[0].save(update_fields=['date_deleted'])
+        CommentFactory()
+
+        self.assertEqual(
+            collect_metrics([metric], now=now + timedelta(seconds=2)), {'comments_count': 3}
+        )
+        counter = MetricCounter.objects.get(slug='comments_count')
+        self.assertEqual(counter.date_recounted, now)
+
+    def test_incremental_metrics_are_recounted(self):
+        metric = registry['comments_count']
+        CommentFactory()
+        now = timezone.now()
+        collect_metrics([metric], now=now)
+        # A comment deleted without a trace is only noticed by a recount
+        Comment.objects.all().delete()
+
+        self.assertEqual(collect_metrics([metric], now=now), {'comments_count': 1})
+        self.assertEqual(collect_metrics([metric], recount=True, now=now), {'comments_count': 0})
+        CommentFactory()
+        self.assertEqual(
+            collect_metrics([metric], now=now + timedelta(days=2)), {'comments_count': 1}
+        )
+        counter = MetricCounter.objects.get(slug='comments_count')
+        self.assertEqual(counter.date_recounted, now + timedelta(days=2))
+
+    def test_signal_counter_metric_counts_group_members(self):
+        metric = registry['users_subscribers_count']
+        subscriber_group, _ = Group.objects.get_or_create(name='subscriber')
+        demo_group, _ = Group.objects.get_or_create(name='demo')
+        users = [UserFactory() for _ in range(3)]
+        users[0].groups.add(subscriber_group)
+
+        self.assertEqual(collect_metrics([metric]), {'users_subscribers_count': 1})
+
+        users[1].groups.add(subscriber_group, demo_group)
+        subscriber_group.user_set.add(users[2])
+        users[0].groups.remove(subscriber_group)
+        inactive_user = UserFactory(is_active=False)
+        inactive_user.groups.add(subscriber_group)
+
+        self.assertEqual(collect_metrics([metric]), {'users_subscribers_count': 2})
+        self.assertEqual(metric.count(), 2)
@@ -0,0 +1,91 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+
+from stats.models import DailySample, Sample, SampleChart
+from stats.samples import add_to_daily_samples, update_charts
+
+
+def _sample(slug, value, day, hour):
+    return Sample(
+        slug=slug,
+        value=value,
+        timestamp=datetime(day.year, day.month, day.day, hour, tzinfo=dt_timezone.utc),
+    )
+
+
+class DailySamplesTest(TestCase):
+    day = date(2026, 10, 1)
+
+    def test_add_to_daily_samples(self):
+        add_to_daily_samples(
+            [
+                _sample('comments_count', 10, self.day, 9),
+                _sample('comments_count', 14, self.day, 11),
+                _sample('users_total_count', 3, self.day, 9),
+            ]
+        )
+        add_to_daily_samples(
+            [
+                _sample('comments_count', 12, self.day, 10),
+                _sample('comments_count', 15, self.day + timedelta(days=1), 9),
+            ]
+        )
+
+        daily_sample = DailySample.objects.get(slug='comments_count', date=self.day)
+        self.assertEqual(
+            (
+                daily_sample.min_value,
+                daily_sample.max_value,
+                daily_sample.avg_value,
+                daily_sample.last_value,
+            ),
+            (10, 14, 12, 14),
+        )
+        self.assertEqual(DailySample.objects.filter(slug='comments_count').count(), 2)
+        self.assertEqual(DailySample.objects.get(slug='users_total_count').sample_count, 1)
+
+    def test_update_charts(self):
+        add_to_daily_samples(
+            [
+                _sample('comments_count', 10, self.day - timedelta(days=400), 9),
+                _sample('comments_count', 10, self.day, 9),
+                _sample('comments_count', 13, self.day, 10),
+                _sample('comments_count', 20, self.day + timedelta(days=1), 9),
+            ]
+        )
+
+        update_charts(['comments_count', 'comments_count', 'users_total_count'], today=self.day)
+
+        chart = SampleChart.objects.get()
+        self.assertEqual(chart.slug, 'comments_count')
+        self.assertEqual(chart.current_value, 20)
+        (dataset,) = json.loads(chart.datasets)
+        self.assertEqual(dataset['label'], 'Comments')
+        self.assertEqual(
+            dataset['data'], [{'date': '2026-10-01', 'y': 12}, {'date': '2026-10-02', 'y': 20}]
+        )
+
+
+class IndexViewTest(TestCase):
+    def test_index(self):
+        SampleChart.objects.create(slug='users_subscribers_count', datasets='[]', current_value=5)
+        SampleChart.objects.create(slug='comments_count', datasets='[]', current_value=7)
+
+        response = self.client.get(reverse('stats-index'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['current_value'], 5)
+        self.assertEqual(
+            response.context['metrics'],
+            [('comments_count', 'Comments'), ('users_subscribers_count', 'Subscribers')],
+        )
+
+        response = self.client.get(reverse('stats-index'), {'metric': 'comments_count'})
+        self.assertEqual(response.context['current_value'], 7)
+
+        response = self.client.get(reverse('stats-index'), {'metric': 'unknown'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['current_value'])
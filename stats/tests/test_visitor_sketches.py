@@ -0,0 +1,80 @@
+from datetime import date
+import unittest
+
+from stats.visitor_sketches import (
+    ASSET_VIEWS,
+    SECTION_VIEWS,
+    SOURCE_DOWNLOADS,
+    VisitorSketches,
+    get_keys,
+)
+
+
+def _values(**values):
+    return {
+        'date': '2021-08-01',
+        'c-ip': '127.0.0.1',
+        'cs(User-Agent)': 'Mozilla/5.0',
+        'cs-method': 'GET',
+        'sc-status': '200',
+        'x-edge-response-result-type': 'Hit',
+        'cs(Referer)': 'https://studio.blender.org/',
+        'cs-uri-stem': '/index.html',
+        'cs-uri-query': None,
+        **values,
+    }
+
+
+class VisitorSketchesTest(unittest.TestCase):
+    def test_get_keys_asset_views(self):
+        values = _values(**{'cs(Referer)': 'https://cloud.blender.org/p/spring/?asset=1234&a=b'})
+
+        self.assertEqual(get_keys(values), [(ASSET_VIEWS, '1234')])
+        values['cs(Referer)'] = 'https://cloud.blender.org/p/spring/?asset=undefined'
+        self.assertEqual(get_keys(values), [])
+
+    def test_get_keys_section_views(self):
+        referer = 'https://studio.blender.org/training/stylized-rendering/basics/?a=b'
+
+        self.assertEqual(
+            get_keys(_values(**{'cs(Referer)': referer})),
+            [(SECTION_VIEWS, 'training/stylized-rendering/basics/')],
+        )
+        for referer in (
+            'https://studio.blender.org/training/stylized-rendering/',
+            'https://studio.blender.org/training/stylized-rendering/chapter/1/',
+        ):
+            self.assertEqual(get_keys(_values(**{'cs(Referer)': referer})), [])
+
+    def test_get_keys_source_downloads(self):
+        values = _values(
+            **{
+                'cs-uri-stem': '/ab/abcdef0123/abcdef0123.blend',
+                'cs-uri-query': 'Expires=1627812610&Signature=abc&Key-Pair-Id=APK',
+            }
+        )
+
+        self.assertEqual(get_keys(values), [(SOURCE_DOWNLOADS, 'abcdef0123')])
+        values['cs-uri-query'] = 'Signature=abc&Expires=1627812610'
+        self.assertEqual(get_keys(values), [])
+
+    def test_get_keys_common_filters(self):
+        referer = 'https://cloud.blender.org/p/spring/?asset=1234'
+        for values in (
+            {'cs-method': 'HEAD'},
+            {'sc-status': '404'},
+            {'x-edge-response-result-type': 'Error'},
+            {'x-edge-response-result-type': None},
+            {'cs(Referer)': 'http://studio.local:8001/?asset=1234'},
+        ):
+            self.assertEqual(get_keys(_values(**{'cs(Referer)': referer, **values})), [])
+
+    def test_visitors_are_counted_once_per_day(self):
+        sketches = VisitorSketches()
+        referer = 'https://cloud.blender.org/p/spring/?asset=1234'
+        for ip in ('127.0.0.1', '127.0.0.2', '127.0.0.1'):
+            sketches.add(_values(**{'cs(Referer)': referer, 'c-ip': ip}))
+        sketches.add(_values(**{'cs(Referer)': referer, 'date': '2021-08-02'}))
+
+        self.assertEqual(sketches.sketches[ASSET_VIEWS, '1234', date(2021, 8, 1)].count(), 2)
+        self.assertEqual(sketches.sketches[ASSET_VIEWS, '1234', date(2021, 8, 2)].count(), 1)
@@ -0,0 +1,70 @@
+"""Most viewed and downloaded static assets and film assets, from their daily counts."""
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from django.db.models import QuerySet, Sum
+from django.utils import timezone
+
+from films.models import Asset, Film
+from stats.counters import COUNTER_FIELDS
+from stats.models import StaticAssetDailyCount
+
+PERIOD_DAYS = {'week': 7, 'month': 30}
+
+
+def get_period_start(period: str, today: Optional[date] = None) -> date:
+    """Return the first day of the given period, ending today: 'week' or 'month'."""
+    today = today or timezone.localdate()
+    return today - timedelta(days=PERIOD_DAYS[period] - 1)
+
+
+def get_top_static_assets(
+    since: date,
+    until: Optional[date] = None,
+    field: str = 'view_count',
+    limit: int = 10,
+    film: Optional[Film] = None,
+) -> List[Tuple[int, int]]:
+    """Return IDs and counts of the static assets with the highest counts between given days.
+
+    Args:
+        since: the first day to sum the counts of.
+        until: the last day to sum the counts of, today if not given.
+        field: which counts to sum: 'view_count' or 'download_count'.
+        limit: how many static assets to return, at most.
+        film: only return the static assets of the assets of this film.
+    """
+    assert field in COUNTER_FIELDS, f'{field} is not a counter field'
+    daily_counts = StaticAssetDailyCount.objects.filter(date__gte=since)
+    if until:
+        daily_counts = daily_counts.filter(date__lte=until)
+    if film:
+        daily_counts = daily_counts.filter(
+            static_asset_id__in=Asset.objects.filter(film=film).values('static_asset_id')
+        )
+    return list(
+        daily_counts.values_list('static_asset_id')
+        .annotate(count=Sum(field))
+        .filter(count__gt=0)
+        .order_by('-count', 'static_asset_id')[:limit]
+    )
+
+
+def get_top_film_assets(
+    film: Film, period: str = 'week', field: str = 'view_count', limit: int = 10
+) -> 'QuerySet[Asset]':
+    """Return published assets of a film most viewed or downloaded this week or month.
+
+    Assets are annotated with their `period_count`.
+    """
+    assert field in COUNTER_FIELDS, f'{field} is not a counter field'
+    return (
+        Asset.objects.filter(
+            film=film,
+            is_published=True,
+            static_asset__daily_counts__date__gte=get_period_start(period),
+        )
+        .annotate(period_count=Sum(f'static_asset__daily_counts__{field}'))
+        .filter(period_count__gt=0)
+        .order_by('-period_count', 'pk')[:limit]
+    )
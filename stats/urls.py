@@ -1,7 +1,9 @@
 from django.urls.conf import path
 
-from stats.views import index
+from stats.views import event_buffer_stats, index, render_cache_stats
 
 urlpatterns = [
     path('', index, name='stats-index'),
+    path('events', event_buffer_stats, name='stats-events'),
+    path('render-cache', render_cache_stats, name='stats-render-cache'),
 ]
@@ -1,45 +1,57 @@
 """Display samples data as charts."""
-import datetime
-import json
-
-from django.core.serializers.json import DjangoJSONEncoder
-from django.db.models import Avg, IntegerField
-from django.db.models.functions import TruncDay
+from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_safe
 
-from stats.models import Sample
+from common.render_cache import render_cache
+from stats.events import event_buffer
+from stats.models import SampleChart
+from stats.samples import DEFAULT_CHART_SLUG, get_label
 
 
-def index(request):
-    """Display stats for subscribers count."""
-    time_threshold = datetime.datetime.now() - datetime.timedelta(days=365)
-    count_per_day_q = (
-        Sample.objects.filter(timestamp__gt=time_threshold)
-        .annotate(date=TruncDay('timestamp'))
-        .values('date')
-        .annotate(y=Avg('value', output_field=IntegerField()))
-        .order_by('date')
-    )
-    subscribers = count_per_day_q.filter(slug='users_subscribers_count')
-    current_subscribers_count = subscribers.order_by('-date').first()['y']
-    # blog_posts = count_per_day_q.filter(slug='blog_posts_count')
-    chart_data = [
-        {
-            'type': 'line',
-            'data': list(subscribers),
-            'label': 'Subscribers',
-            'borderColor': 'rgb(0,183,255)',
-            'backgroundColor': 'rgba(0,183,255, 0.1)',
-            'fill': True,
-            'pointRadius': '0',
-        },
-    ]
+@require_safe
+def index(request: HttpRequest) -> HttpResponse:
+    """Display the chart of a sample slug, subscribers count by default.
+
+    Charts are serialized by `write_stats`, see `stats.samples`.
+    """
+    slug = request.GET.get('metric') or DEFAULT_CHART_SLUG
+    slugs = SampleChart.objects.order_by('slug').values_list('slug', flat=True)
+    sample_chart = SampleChart.objects.filter(slug=slug).first()
     chart = {
-        'datasets': json.dumps(chart_data, cls=DjangoJSONEncoder),
+        'datasets': sample_chart.datasets if sample_chart else '[]',
         'aggregate_by': 'day',
     }
     return render(
         request,
         'stats/index.html',
-        {'chart': chart, 'current_subscribers_count': current_subscribers_count},
+        {
+            'chart': chart,
+            'label': get_label(slug),
+            'slug': slug,
+            'current_value': sample_chart.current_value if sample_chart else None,
+            'metrics': [(metric_slug, get_label(metric_slug)) for metric_slug in slugs],
+        },
     )
+
+
+@require_safe
+def event_buffer_stats(request: HttpRequest) -> HttpResponse:
+    """Return the view and download event buffer size and flush latency, only to staff.
+
+    Every process has its own buffer: these are the ones of the process handling the request.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'message': 'Forbidden'}, status=403)
+    return JsonResponse(event_buffer.get_stats())
+
+
+@require_safe
+def render_cache_stats(request: HttpRequest) -> HttpResponse:
+    """Return the markdown render cache hits and misses, only to staff.
+
+    Counters are kept by every process: these are the ones of the process handling the request.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'message': 'Forbidden'}, status=403)
+    return JsonResponse(render_cache.get_stats())
@@ -0,0 +1,205 @@
+"""Unique visitors of film assets, training sections and downloads, as HyperLogLog sketches.
+
+Sketches are built by `import_cloudfront_logs` while it parses the log lines, one per kind,
+key (a film asset ID, a section endpoint or a source hash) and day, and stored in a table
+of their own. `count_cloudfront --from-sketches` merges them across days instead of
+sorting all the raw log lines, see `stats.hyperloglog` for the error bound of the counts.
+
+Lines are matched in the same way as the queries of `count_cloudfront` match the rows of the
+raw logs table, and a visitor is identified by the same fields.
+"""
+from collections import defaultdict
+from datetime import date
+from typing import DefaultDict, Dict, List, Optional, Tuple
+import re
+
+from psycopg2.extras import execute_values
+
+from stats.hyperloglog import HyperLogLog, hash_value
+
+SKETCHES_TABLE_NAME = 'cflogs_sketches'
+ASSET_VIEWS = 'asset'
+SECTION_VIEWS = 'section'
+SOURCE_DOWNLOADS = 'source'
+KINDS = (ASSET_VIEWS, SECTION_VIEWS, SOURCE_DOWNLOADS)
+VISITOR_FIELDS = (
+    'c-ip',
+    'cs(User-Agent)',
+    'cs-protocol',
+    'cs-protocol-version',
+    'x-forwarded-for',
+    'cs(Cookie)',
+)
+# All the fields of a log line needed to build the sketches
+FIELDS = {
+    *VISITOR_FIELDS,
+    'date',
+    'cs-method',
+    'cs(Referer)',
+    'sc-status',
+    'x-edge-response-result-type',
+    'cs-uri-stem',
+    'cs-uri-query',
+}
+SKETCHES_TABLE_DEF = f"""
+CREATE TABLE IF NOT EXISTS {SKETCHES_TABLE_NAME} (
+    kind VARCHAR(16) NOT NULL,
+    key VARCHAR(2000) NOT NULL,
+    date date NOT NULL,
+    sketch bytea NOT NULL,
+    PRIMARY KEY (kind, key, date)
+);
+"""
+_section_endpoint_re = re.compile(r'training/.*/.+', re.DOTALL)
+# LIKE '/__/%/%.%': source files are uploaded to e.g. /bd/bd2b5b1c.../bd2b5b1c....mp4
+_source_uri_stem_re = re.compile(r'/../.*/.*\..*', re.DOTALL)
+
+Key = Tuple[str, str, date]
+
+
+def _split_part(value: str, delimiter: str, n: int) -> str:
+    """Do what Postgres' split_part does."""
+    parts = value.split(delimiter)
+    return parts[n - 1] if len(parts) >= n else ''
+
+
+def get_keys(values: Dict[str, Optional[str]]) -> List[Tuple[str, str]]:
+    """Return the kinds and keys of the sketches a log line with the given values counts in.
+
+    Missing values are None, as they would be NULL in the raw logs table.
+    """
+    referer = values.get('cs(Referer)')
+    if (
+        values.get('cs-method') != 'GET'
+        or referer is None
+        or 'studio.local' in referer
+        or values.get('sc-status') != '200'
+        or values.get('x-edge-response-result-type') in (None, 'Error')
+    ):
+        return []
+
+    keys = []
+    if referer != 'https://cloud.blender.org/':
+        if '?asset=' in referer and '?asset=undefined' not in referer:
+            film_asset_id = _split_part(
+                _split_part(_split_part(referer, '.org/', 2), '?asset=', 2), '&', 1
+            )
+            keys.append((ASSET_VIEWS, film_asset_id))
+        if '/training/' in referer and not any(
+            part in referer for part in ('/chapter/', '/chapters/', '/pages/')
+        ):
+            section_endpoint = _split_part(
+                _split_part(_split_part(referer, '.org/', 2), '?', 1), '&', 1
+            )
+            if _section_endpoint_re.fullmatch(section_endpoint):
+                keys.append((SECTION_VIEWS, section_endpoint))
+
+    uri_stem = values.get('cs-uri-stem') or ''
+    uri_query = values.get('cs-uri-query') or ''
+    if (
+        _source_uri_stem_re.fullmatch(uri_stem)
+        and 'Expires' in uri_query
+        and 'Signature' in uri_query[uri_query.index('Expires') :]
+    ):
+        keys.append((SOURCE_DOWNLOADS, _split_part(uri_stem, '/', 3)))
+    return keys
+
+
+def get_visitor(values: Dict[str, Optional[str]]) -> bytes:
+    """Return what identifies the visitor of a log line."""
+    return '\t'.join(values.get(field) or '' for field in VISITOR_FIELDS).encode()
+
+
+class VisitorSketches:
+    """Sketches of the unique visitors seen in some log lines, by kind, key and day."""
+
+    def __init__(self) -> None:  # noqa: D107
+        self.sketches: DefaultDict[Key, HyperLogLog] = defaultdict(HyperLogLog)
+
+    def add(self, values: Dict[str, Optional[str]]) -> None:
+        """Count the visitor of a log line with the given values."""
+        keys = get_keys(values)
+        if not keys or not values.get('date'):
+            return
+        day = date.fromisoformat(values['date'])
+        visitor_hash = hash_value(get_visitor(values))
+        for kind, key in keys:
+            self.sketches[kind, key, day].add_hash(visitor_hash)
+
+    def save(self, cursor) -> None:
+        """Merge the sketches into the ones already stored, in the cursor's transaction.
+
+        Sketches that are not stored yet are inserted, the rest are locked, merged and updated.
+        Keys are always handled in the same order, so concurrent imports cannot deadlock.
+        """
+        keys = sorted(self.sketches)
+        if not keys:
+            return
+        inserted = execute_values(
+            cursor,
+            f"""
+            INSERT INTO {SKETCHES_TABLE_NAME} (kind, key, date, sketch) VALUES %s
+            ON CONFLICT (kind, key, date) DO NOTHING
+            RETURNING kind, key, date
+            """,
+            [(*key, self.sketches[key].to_bytes()) for key in keys],
+            fetch=True,
+        )
+        inserted_keys = {tuple(row) for row in inserted}
+        existing_keys = [key for key in keys if key not in inserted_keys]
+        if not existing_keys:
+            return
+
+        stored = execute_values(
+            cursor,
+            f"""
+            SELECT s.kind, s.key, s.date, s.sketch FROM {SKETCHES_TABLE_NAME} s
+            JOIN (VALUES %s) AS v (kind, key, date)
+            ON s.kind = v.kind AND s.key = v.key AND s.date = v.date
+            ORDER BY s.kind, s.key, s.date
+            FOR UPDATE OF s
+            """,
+            existing_keys,
+            fetch=True,
+        )
+        updated = []
+        for kind, key, day, data in stored:
+            sketch = HyperLogLog.from_bytes(data)
+            sketch.merge(self.sketches[kind, key, day])
+            updated.append((kind, key, day, sketch.to_bytes()))
+        execute_values(
+            cursor,
+            f"""
+            UPDATE {SKETCHES_TABLE_NAME} s SET sketch = v.sketch
+            FROM (VALUES %s) AS v (kind, key, date, sketch)
+            WHERE s.kind = v.kind AND s.key = v.key AND s.date = v.date
+            """,
+            updated,
+        )
+
+
+def get_unique_visitor_counts(cursor, kind: str, since: date, until: date) -> Dict[str, int]:
+    """Return estimated numbers of unique visitors by key, between the given days.
+
+    Args:
+        cursor: a cursor of the database with the sketches table.
+        kind: which visitors to count: ASSET_VIEWS, SECTION_VIEWS or SOURCE_DOWNLOADS.
+        since: the first day to count the visitors of.
+        until: the day after the last day to count the visitors of.
+    """
+    cursor.execute(
+        f"""
+        SELECT key, sketch FROM {SKETCHES_TABLE_NAME}
+        WHERE kind = %s AND date >= %s AND date < %s
+        ORDER BY key
+        """,
+        (kind, since, until),
+    )
+    merged: Dict[str, HyperLogLog] = {}
+    for key, data in cursor.fetchall():
+        sketch = HyperLogLog.from_bytes(data)
+        if key in merged:
+            merged[key].merge(sketch)
+        else:
+            merged[key] = sketch
+    return {key: sketch.count() for key, sketch in merged.items()}
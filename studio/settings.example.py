@@ -94,7 +94,11 @@ MEILISEARCH_PUBLIC_KEY = 'CHANGE_ME'
 MEILISEARCH_PRIVATE_KEY = 'CHANGE_ME'
 # Change the address to 'https://studio.blender.org/s/' in production
 MEILISEARCH_API_ADDRESS = 'http://127.0.0.1:7700/'
-SEARCH_CLIENT = meilisearch.Client(MEILISEARCH_API_ADDRESS, MEILISEARCH_PRIVATE_KEY)
+# Seconds after which a request to MeiliSearch fails, so that a hung server can't block callers
+MEILISEARCH_TIMEOUT = 5
+SEARCH_CLIENT = meilisearch.Client(
+    MEILISEARCH_API_ADDRESS, MEILISEARCH_PRIVATE_KEY, timeout=MEILISEARCH_TIMEOUT
+)
 
 AWS_ACCESS_KEY_ID = 'CHANGE_ME'
 AWS_SECRET_ACCESS_KEY = 'CHANGE_ME'
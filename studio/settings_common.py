@@ -466,7 +466,29 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10
 }
 
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    # Shared by all workers, for HTML that is expensive to render, see Comment.get_message_html
+    # and common/render_cache.py.
+    # Its table is created by "./manage.py createcachetable".
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'fragment_cache',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+# Static asset views and downloads are inserted in batches, see stats/events.py
+STATS_EVENTS_BUFFERED = True
+STATS_EVENTS_SPOOL_DIR = BASE_DIR / 'var/stats-events'
+# Hours after which incremental metrics are counted from scratch again, see stats/metrics.py
+STATS_METRICS_RECOUNT_HOURS = 24
+# Days after which view and download records are deleted, once counted. None keeps them all
+STATS_VISITS_RETENTION_DAYS = None
+
 TESTS_IN_PROGRESS = 'test' in sys.argv
 if TESTS_IN_PROGRESS:
+    STATS_EVENTS_BUFFERED = False
     STATICFILES_STORAGE = 'pipeline.storage.PipelineStorage'
     AWS_STORAGE_BUCKET_NAME = 'blender-studio-test'
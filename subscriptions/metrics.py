@@ -0,0 +1,25 @@
+"""Metrics of subscriptions sampled by `write_stats`, see `stats.metrics`."""
+from django.db.models import Sum
+
+import looper.models
+
+from stats.metrics import Metric, register
+from subscriptions.models import Team
+
+
+def _get_team_seats_count() -> int:
+    """Count the seats of teams with an active subscription, teams without a limit excluded."""
+    return (
+        Team.objects.filter(subscription__status='active').aggregate(seats=Sum('seats'))['seats']
+        or 0
+    )
+
+
+register(
+    Metric(
+        'subscriptions_active_count',
+        'Active Subscriptions',
+        count=lambda: looper.models.Subscription.objects.filter(status='active').count(),
+    )
+)
+register(Metric('team_seats_count', 'Team Seats', count=_get_team_seats_count))
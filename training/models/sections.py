@@ -52,6 +52,12 @@ class Section(
     user = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
 
     comments = models.ManyToManyField(Comment, through='SectionComment', related_name='section')
+    # Lookups that keep only the objects visible to everyone but staff
+    published_filters = {
+        'is_published': True,
+        'chapter__is_published': True,
+        'chapter__training__is_published': True,
+    }
     attachments = models.ManyToManyField(
         models_static_assets.StaticAsset, blank=True, related_name='+'
     )
@@ -106,6 +112,10 @@ class Section(
     def comment_url(self) -> str:
         return reverse('section-comment', kwargs={'section_pk': self.pk})
 
+    @property
+    def comments_url(self) -> str:
+        return reverse('section-comments', kwargs={'section_pk': self.pk})
+
     @property
     def progress_url(self) -> str:
         return reverse('section-progress', kwargs={'section_pk': self.pk})
@@ -4,8 +4,6 @@ from typing import List, Optional, Tuple, cast
 
 from django.db.models import Exists, OuterRef
 
-from comments import models
-from comments.queries import get_annotated_comments
 from training.models import chapters, sections, trainings
 import static_assets.models as models_static_assets
 
@@ -54,7 +52,6 @@ def from_slug(  # noqa: D103
         chapters.Chapter,
         sections.Section,
         Optional[Tuple[models_static_assets.Video, Optional[datetime.timedelta]]],
-        List[models.Comment],
     ]
 ]:
     try:
@@ -68,7 +65,7 @@ def from_slug(  # noqa: D103
                 )
             )
             .select_related('chapter__training', 'chapter')
-            .prefetch_related('static_asset', 'comments', 'comments__user')
+            .prefetch_related('static_asset')
             .get(chapter__training__slug=training_slug, slug=section_slug)
         )
     except sections.Section.DoesNotExist:
@@ -85,5 +82,4 @@ def from_slug(  # noqa: D103
     chapter = section.chapter
     training = chapter.training
     training_favorited = cast(bool, getattr(section, 'training_favorited'))
-    comments = get_annotated_comments(section, user_pk)
-    return training, training_favorited, chapter, section, video, comments
+    return training, training_favorited, chapter, section, video
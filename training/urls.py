@@ -1,6 +1,6 @@
 from django.urls import include, path
 
-from training.views.api.comment import comment
+from training.views.api.comment import comment, comments
 from training.views.api.favorite import favorite
 from training.views.api.progress import section_progress  # video_progress tracked in static_asset
 from training.views.home import home
@@ -19,6 +19,7 @@ urlpatterns = [
                     include(
                         [
                             path('comment/', comment, name='section-comment'),
+                            path('comments/', comments, name='section-comments'),
                             path('progress/', section_progress, name='section-progress'),
                         ]
                     ),
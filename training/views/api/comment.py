@@ -1,12 +1,16 @@
 """Comment API used in training sections."""
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.http.request import HttpRequest
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, require_safe
 
 
-from comments.views.common import comment_response
-from training.models.sections import SectionComment
+from comments.views.common import (
+    comment_response,
+    comments_page_response,
+    get_commented_object_or_404,
+)
+from training.models.sections import Section, SectionComment
 
 
 @require_POST
@@ -14,3 +18,10 @@ from training.models.sections import SectionComment
 def comment(request: HttpRequest, *, section_pk: int) -> JsonResponse:
     """Add a top-level comment or a reply to another comment under a training section."""
     return comment_response(request, SectionComment, 'section_id', section_pk)
+
+
+@require_safe
+def comments(request: HttpRequest, *, section_pk: int) -> HttpResponse:
+    """Return a page of top-level comments under a training section."""
+    section = get_commented_object_or_404(Section, request.user, section_pk)
+    return comments_page_response(request, section)
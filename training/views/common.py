@@ -2,8 +2,10 @@
 from typing import Dict, List, Literal, Union
 
 from django.contrib.auth import get_user_model
+from markupsafe import Markup
 
 from common import markdown
+from common.render_cache import render_cache
 from common.types import assert_cast
 from training.models import (
     chapters as chapters_models,
@@ -24,7 +26,9 @@ User = get_user_model()
 def training_model_to_template(training: trainings.Training, favorited: bool) -> trainings.Training:
     training.favorited = favorited
     training.type = TrainingType(training.type)
-    training.summary_rendered = markdown.render_unsafe(training.summary)
+    training.summary_rendered = Markup(
+        render_cache.get_or_render('markdown_unsafe', training.summary, markdown.render_unsafe)
+    )
     training.tags_list = set(str(tag) for tag in training.tags.all())
     training.picture_header_url = '' if not training.picture_header else training.picture_header.url
     return training
@@ -4,11 +4,12 @@ from django.http.request import HttpRequest
 from django.shortcuts import render, redirect
 from django.views.decorators.http import require_safe
 
-from comments.views.common import comments_to_template_type
+from comments.views.common import comments_page_to_template_type
 
 from stats.models import StaticAssetView
 from training import queries
 from training.models.progress import UserSectionProgress
+from training.models.sections import Section
 from training.types import SectionProgressReportingData
 from training.views.common import (
     navigation_to_template,
@@ -23,11 +24,7 @@ def section(request: HttpRequest, training_slug: str, section_slug: str) -> Http
     The redirect is here due to sections and chapters having identical URL format on the old Cloud.
     """
     filter_published = (
-        {
-            'chapter__is_published': True,
-            'chapter__training__is_published': True,
-            'is_published': True,
-        }
+        Section.published_filters
         if not request.user.is_staff and not request.user.is_superuser
         else {}
     )
@@ -40,7 +37,7 @@ def section(request: HttpRequest, training_slug: str, section_slug: str) -> Http
     if not result:
         return redirect('chapter', training_slug=training_slug, chapter_slug=section_slug)
 
-    training, training_favorited, chapter, section, maybe_video, comments = result
+    training, training_favorited, chapter, section, maybe_video = result
 
     if maybe_video is None:
         video = None
@@ -68,7 +65,7 @@ def section(request: HttpRequest, training_slug: str, section_slug: str) -> Http
         'chapter': chapter,
         'section': section,
         'video': video,
-        'comments': comments_to_template_type(comments, section.comment_url, user=request.user),
+        'comments': comments_page_to_template_type(section, request.user),
         'section_progress_reporting_data': section_progress_reporting_data,
         'navigation': navigation_to_template(*navigation, user=request.user, current=section),
     }
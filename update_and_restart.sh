@@ -24,6 +24,9 @@ if [[ $REPLY =~ ^[Yy]$ ]]
 then
     echo "Applying migrations"
     sudo -Hu $DEPLOY_USER $PYTHON_BIN manage.py migrate
+    sudo -Hu $DEPLOY_USER $PYTHON_BIN manage.py createcachetable
+    echo "Rendering the HTML of comments that have none"
+    sudo -Hu $DEPLOY_USER $PYTHON_BIN manage.py render_comments_html
     echo "Collecting static"
     sudo -Hu $DEPLOY_USER $PYTHON_BIN manage.py collectstatic --no-input
 
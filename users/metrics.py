@@ -0,0 +1,71 @@
+"""Metrics of users sampled by `write_stats`, see `stats.metrics`."""
+from typing import Optional, Set
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from stats.metrics import DeltaMetric, SignalCounterMetric, register
+
+User = get_user_model()
+
+
+def _count_group_members(group_name: str) -> int:
+    return User.objects.filter(is_active=True, groups__name=group_name).distinct().count()
+
+
+# Deactivated users are only subtracted when the metric is counted from scratch
+register(
+    DeltaMetric(
+        'users_total_count',
+        'Users',
+        count=lambda: User.objects.filter(is_active=True).count(),
+        added=lambda since, until: User.objects.filter(
+            is_active=True, date_joined__gt=since, date_joined__lte=until
+        ).count(),
+    )
+)
+# Group members, by group name
+_group_metrics = {
+    'subscriber': register(
+        SignalCounterMetric(
+            'users_subscribers_count',
+            'Subscribers',
+            count=lambda: _count_group_members('subscriber'),
+        )
+    ),
+    'demo': register(
+        SignalCounterMetric(
+            'users_demo_count',
+            'Demo Users',
+            count=lambda: _count_group_members('demo'),
+        )
+    ),
+}
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def _count_group_membership_changes(
+    sender, instance, action: str, reverse: bool, pk_set: Optional[Set[int]], **kwargs
+):
+    """Update the counters of group members when active users are added to or removed from groups.
+
+    Users are assumed to be removed only from the groups they are in, and clearing the groups
+    of a user isn't counted: both are corrected when the metrics are counted from scratch.
+    """
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    sign = 1 if action == 'post_add' else -1
+    if reverse:  # Users added to or removed from a group
+        metric = _group_metrics.get(instance.name)
+        if metric:
+            metric.increment(sign * User.objects.filter(pk__in=pk_set, is_active=True).count())
+        return
+
+    if not instance.is_active:
+        return
+    for group_name in Group.objects.filter(pk__in=pk_set).values_list('name', flat=True):
+        metric = _group_metrics.get(group_name)
+        if metric:
+            metric.increment(sign)